@@ -0,0 +1,260 @@
+"""
+Command line utility to benchmark a full sync against a synthetic local Strava API.
+
+The tap runs in a subprocess, exactly as it would in a pipeline, pointed at the
+stub server from the test suite. For every stream we report records per second,
+requests per record and time to first record, plus the peak RSS of the tap.
+
+With `--startup`, it instead times the probes an orchestrator runs all the time
+(`--about`, `--discover`) through the `tap-strava` entry point and straight
+through the SDK.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+import click
+
+from tap_strava.responses import json_loads
+from tap_strava.tests.stub_server import StubStrava
+
+# The stub endpoint backing each stream, to count requests per stream
+STREAM_ENDPOINTS = {
+    "activities": "activities",
+    "activity_kudoers": "kudos",
+    "activity_comments": "comments",
+    "activity_streams": "streams",
+}
+
+TAP_COMMAND = [
+    sys.executable,
+    "-c",
+    "from tap_strava.tap import TapStrava; TapStrava.cli()",
+]
+
+ENTRY_POINT_COMMAND = [sys.executable, "-c", "from tap_strava.cli import main; main()"]
+
+# Invocations timed by the startup benchmark
+STARTUP_PROBES = {
+    "about": ["--about"],
+    "about_json": ["--about", "--format", "json"],
+    "discover": ["--discover"],
+}
+
+
+def run_benchmark(
+    activities: int,
+    kudos_per_activity: int = 2,
+    comments_per_activity: int = 2,
+    latency: float = 0.0,
+    rate_limits: tuple = (1_000_000, 10_000_000),
+    tap_config: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Sync every stream from a fresh stub and return the measurements"""
+
+    stub = StubStrava(
+        activities=activities,
+        kudos_per_activity=kudos_per_activity,
+        comments_per_activity=comments_per_activity,
+        # Close enough together that even 100k activities are all in the past
+        activity_spacing=timedelta(minutes=15),
+        latency=latency,
+        rate_limits=rate_limits,
+    )
+    with stub, tempfile.TemporaryDirectory() as workdir:
+        config_path = os.path.join(workdir, "config.json")
+        with open(config_path, "w") as config_file:
+            json.dump(
+                {
+                    "client_id": "benchmark",
+                    "client_secret": "benchmark",
+                    "refresh_token": "benchmark",
+                    "api_url": stub.api_url,
+                    **(tap_config or {}),
+                },
+                config_file,
+            )
+
+        stderr_path = os.path.join(workdir, "stderr.log")
+        counts: Dict[str, int] = {}
+        first_record: Dict[str, float] = {}
+        last_record: Dict[str, float] = {}
+        with open(stderr_path, "wb") as stderr:
+            started = time.perf_counter()
+            process = subprocess.Popen(
+                TAP_COMMAND + ["--config", config_path],
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+            )
+            assert process.stdout is not None
+            for line in process.stdout:
+                message = json_loads(line)
+                if message["type"] != "RECORD":
+                    continue
+                stream = message["stream"]
+                now = time.perf_counter() - started
+                counts[stream] = counts.get(stream, 0) + 1
+                first_record.setdefault(stream, now)
+                last_record[stream] = now
+            process.stdout.close()
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            elapsed = time.perf_counter() - started
+
+        if process.returncode != 0:
+            with open(stderr_path) as stderr_log:
+                tail = stderr_log.read()[-2000:]
+            raise click.ClickException(f"The tap failed:\n{tail}")
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss_bytes = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    streams = {}
+    for stream, endpoint in STREAM_ENDPOINTS.items():
+        records = counts.get(stream, 0)
+        if not records and not stub.requests[endpoint]:
+            # Not selected, e.g. activity_streams unless it is configured
+            continue
+        emitting = last_record.get(stream, 0) - first_record.get(stream, 0)
+        streams[stream] = {
+            "records": records,
+            "records_per_second": records / emitting if emitting else None,
+            "requests_per_record": stub.requests[endpoint] / records
+            if records
+            else None,
+            "time_to_first_record": first_record.get(stream),
+        }
+
+    return {
+        "activities": activities,
+        "elapsed": elapsed,
+        "records_per_second": sum(counts.values()) / elapsed,
+        "requests": sum(stub.requests.values()),
+        "peak_rss_mb": rss_bytes / 2**20,
+        "streams": streams,
+    }
+
+
+def run_startup_benchmark(repeat: int = 5) -> Dict[str, Any]:
+    """Best of `repeat` wall clock times of every probe, in seconds"""
+
+    commands = {"entry_point": ENTRY_POINT_COMMAND, "sdk": TAP_COMMAND}
+    probes: Dict[str, Dict[str, float]] = {}
+    for probe, args in STARTUP_PROBES.items():
+        probes[probe] = {}
+        for name, command in commands.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                subprocess.run(command + args, check=True, capture_output=True)
+                timings.append(time.perf_counter() - started)
+            probes[probe][name] = min(timings)
+    return {"repeat": repeat, "probes": probes}
+
+
+def format_startup_result(result: Dict[str, Any]) -> List[str]:
+    lines = [f"  {'probe':<20}{'entry point (s)':>18}{'sdk (s)':>12}{'speedup':>10}"]
+    for probe, timings in result["probes"].items():
+        entry_point, sdk = timings["entry_point"], timings["sdk"]
+        lines.append(
+            f"  {probe:<20}{entry_point:>18.3f}{sdk:>12.3f}{sdk / entry_point:>9.1f}x"
+        )
+    return lines
+
+
+def format_result(result: Dict[str, Any]) -> List[str]:
+    lines = [
+        f"{result['activities']} activities: {result['elapsed']:.2f}s, "
+        f"{result['records_per_second']:.0f} records/s, "
+        f"{result['requests']} requests, peak RSS {result['peak_rss_mb']:.1f} MB",
+        f"  {'stream':<20}{'records':>10}{'records/s':>12}{'req/record':>12}{'first (s)':>12}",
+    ]
+    for stream, stats in result["streams"].items():
+        rate = stats["records_per_second"]
+        ratio = stats["requests_per_record"]
+        first = stats["time_to_first_record"]
+        lines.append(
+            f"  {stream:<20}{stats['records']:>10}"
+            f"{rate if rate is None else round(rate):>12}"
+            f"{ratio if ratio is None else round(ratio, 3):>12}"
+            f"{first if first is None else round(first, 3):>12}"
+        )
+    return lines
+
+
+@click.command()
+@click.option(
+    "--activities",
+    "-n",
+    multiple=True,
+    type=int,
+    default=[1000],
+    show_default=True,
+    help="Number of synthetic activities, repeat the option to benchmark several sizes",
+)
+@click.option("--kudos", default=2, show_default=True, help="Kudoers per activity")
+@click.option(
+    "--comments",
+    default=2,
+    show_default=True,
+    help="Comments on every other activity",
+)
+@click.option(
+    "--latency-ms",
+    default=0.0,
+    show_default=True,
+    help="Delay the stub adds to every response",
+)
+@click.option(
+    "--rate-limits",
+    default="1000000,10000000",
+    show_default=True,
+    help="15 minute and daily limits reported in the x-ratelimit headers",
+)
+@click.option(
+    "--tap-config",
+    default="{}",
+    help="Extra tap config as JSON, e.g. '{\"child_stream_workers\": 8}'",
+)
+@click.option(
+    "--startup",
+    is_flag=True,
+    help="Time the --about and --discover probes instead of a sync",
+)
+@click.option("--as-json", is_flag=True, help="Print the results as JSON lines")
+def main(
+    activities, kudos, comments, latency_ms, rate_limits, tap_config, startup, as_json
+):
+    """Benchmark a full sync against a synthetic local Strava API"""
+
+    if startup:
+        result = run_startup_benchmark()
+        if as_json:
+            click.echo(json.dumps(result))
+        else:
+            click.echo("\n".join(format_startup_result(result)))
+        return
+
+    short_limit, daily_limit = (int(v) for v in rate_limits.split(","))
+    for count in activities:
+        result = run_benchmark(
+            count,
+            kudos_per_activity=kudos,
+            comments_per_activity=comments,
+            latency=latency_ms / 1000,
+            rate_limits=(short_limit, daily_limit),
+            tap_config=json.loads(tap_config),
+        )
+        if as_json:
+            click.echo(json.dumps(result))
+        else:
+            click.echo("\n".join(format_result(result)))
+
+
+if __name__ == "__main__":
+    main()
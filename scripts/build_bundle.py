@@ -0,0 +1,98 @@
+"""
+Command line utility to prebuild what `tap-strava --about/--version/--discover` print.
+
+Each invocation runs through the SDK in a subprocess, exactly as the tap would
+without a bundle, and its output is saved to `tap_strava/bundle.json` along with
+a fingerprint of what it was built from. The bundle is generated as part of the
+release, right before `poetry build`, and isn't committed. A stale or missing
+bundle is ignored by the tap, it then simply answers through the SDK.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+from pathlib import Path
+
+import click
+
+from tap_strava.cli import ACTIVITY_STREAMS_SETTING, BUNDLE_PATH, source_fingerprint
+
+SDK_COMMAND = [
+    sys.executable,
+    "-c",
+    "from tap_strava.tap import TapStrava; TapStrava.cli()",
+]
+
+# Bundle key and the arguments whose output it holds
+INVOCATIONS = {
+    "version": ["--version"],
+    "about_text": ["--about"],
+    "about_json": ["--about", "--format", "json"],
+    "about_markdown": ["--about", "--format", "markdown"],
+    "catalog": ["--discover"],
+}
+
+
+def _sdk_output(args: List[str]) -> str:
+    # Settings in the environment would leak into the bundled output
+    env = {k: v for k, v in os.environ.items() if not k.startswith("TAP_STRAVA_")}
+    result = subprocess.run(SDK_COMMAND + args, capture_output=True, text=True, env=env)
+    if result.returncode:
+        raise click.ClickException(
+            f"tap-strava {' '.join(args)} failed:\n{result.stderr[-2000:]}"
+        )
+    return result.stdout
+
+
+def build_bundle() -> Dict[str, str]:
+    bundle = {"fingerprint": source_fingerprint()}
+    for key, args in INVOCATIONS.items():
+        bundle[key] = _sdk_output(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = os.path.join(tmp, "config.json")
+        with open(config_path, "w") as config_file:
+            json.dump({ACTIVITY_STREAMS_SETTING: ["time"]}, config_file)
+        bundle["catalog_activity_streams"] = _sdk_output(
+            ["--discover", "--config", config_path]
+        )
+    return bundle
+
+
+@click.command()
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=BUNDLE_PATH,
+    show_default=True,
+    help="Where to write the bundle",
+)
+@click.option(
+    "--check",
+    is_flag=True,
+    help="Only check that the bundle matches the sources, exit 1 if it doesn't",
+)
+def main(output, check):
+    """Prebuild the output of tap-strava --about, --version and --discover"""
+
+    if check:
+        try:
+            fingerprint = json.loads(output.read_text()).get("fingerprint")
+        except (OSError, ValueError):
+            fingerprint = None
+        if fingerprint != source_fingerprint():
+            raise click.ClickException(f"{output} is out of date")
+        click.echo(f"{output} is up to date")
+        return
+
+    bundle = build_bundle()
+    output.write_text(json.dumps(bundle, indent=2, sort_keys=True) + "\n")
+    click.echo(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Command line utility receiving Strava push subscription events for the tap.
+
+It answers Strava's subscription validation request and appends every event
+it is sent to a JSON lines file, which the tap syncs from when its
+`webhook_events_path` points at the same file. Strava wants an answer within
+two seconds, so events are only written down here and synced later.
+
+Put it behind whatever public HTTPS endpoint the subscription's callback URL
+points to, then create the subscription with the same verify token.
+"""
+
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import click
+
+from tap_strava.webhooks import append_event
+
+# Strava never sends more than a small JSON object
+MAX_EVENT_BYTES = 64 * 1024
+
+
+class EventReceiver(ThreadingHTTPServer):
+    """HTTP server appending the push events it receives to `events_path`"""
+
+    daemon_threads = True
+
+    def __init__(
+        self, address: tuple, events_path: str, verify_token: Optional[str]
+    ) -> None:
+        super().__init__(address, _EventHandler)
+        self.events_path = events_path
+        self.verify_token = verify_token
+
+
+class _EventHandler(BaseHTTPRequestHandler):
+    server: EventReceiver
+
+    def do_GET(self):
+        """Echo the challenge of a subscription validation request"""
+
+        query = parse_qs(urlparse(self.path).query)
+        mode = query.get("hub.mode", [None])[0]
+        token = query.get("hub.verify_token", [None])[0]
+        challenge = query.get("hub.challenge", [None])[0]
+        if mode != "subscribe" or challenge is None:
+            self._reply(400)
+        elif self.server.verify_token and token != self.server.verify_token:
+            self._reply(403)
+        else:
+            self._reply(200, {"hub.challenge": challenge})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_EVENT_BYTES:
+            self._reply(413)
+            return
+        try:
+            event = json.loads(self.rfile.read(length))
+        except ValueError:
+            event = None
+        if not isinstance(event, dict) or "object_type" not in event:
+            self._reply(400)
+            return
+        append_event(self.server.events_path, event)
+        self._reply(200)
+
+    def _reply(self, status: int, body: Optional[dict] = None) -> None:
+        payload = json.dumps(body or {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@click.command()
+@click.option(
+    "--events-path",
+    required=True,
+    help="JSON lines file the events are appended to, the tap's webhook_events_path",
+)
+@click.option(
+    "--verify-token",
+    envvar="STRAVA_WEBHOOK_VERIFY_TOKEN",
+    help="Token the subscription was created with, validation requests must carry it",
+)
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8080, show_default=True, type=int)
+def main(events_path, verify_token, host, port):
+    """Receive Strava push subscription events into a file the tap syncs from"""
+
+    server = EventReceiver((host, port), events_path, verify_token)
+    click.echo(f"Receiving Strava events on {host}:{port} into {events_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
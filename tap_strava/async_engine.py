@@ -0,0 +1,174 @@
+import asyncio
+import datetime
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, Mapping, Optional, Tuple, TypeVar
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# httpx, imported by `_import_httpx` when the first engine starts
+httpx: Any = None
+
+DEFAULT_ASYNC_CONCURRENCY = 16
+
+T = TypeVar("T")
+
+
+def _import_httpx() -> None:
+    global httpx
+    if httpx is not None:
+        return
+    try:
+        import httpx as _httpx
+    except ImportError:  # pragma: no cover - only without httpx installed
+        raise RuntimeError(
+            "The async http engine needs httpx, install it with "
+            "`pip install httpx` or set http_engine to 'requests'"
+        ) from None
+    httpx = _httpx
+
+
+class AsyncHttpEngine:
+    """
+    Opt-in asyncio transport for Strava requests.
+
+    The engine runs one event loop on a background thread with a single
+    `httpx.AsyncClient`, so many requests can be in flight at once without a
+    thread per request. Requests are built and responses validated by the
+    exact same stream methods as the synchronous path: the engine only swaps
+    the network call, taking a `requests.PreparedRequest` and handing back a
+    `requests.Response`.
+
+    With `http2`, requests to the same host are multiplexed over a single
+    HTTP/2 connection instead of one keep-alive connection each.
+    """
+
+    _registry: Dict[Tuple[int, bool], "AsyncHttpEngine"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self, concurrency: int = DEFAULT_ASYNC_CONCURRENCY, http2: bool = False
+    ) -> None:
+        _import_httpx()
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                raise RuntimeError(
+                    "http2 needs the h2 package, install it with "
+                    "`pip install httpx[http2]`"
+                ) from None
+        self.concurrency = concurrency
+        self.http2 = http2
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="strava-async-engine", daemon=True
+        )
+        self._thread.start()
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def for_config(cls, config: Mapping[str, Any]) -> "AsyncHttpEngine":
+        """
+        Return the process-wide engine for the configured concurrency and
+        protocol, starting it on first use
+        """
+
+        concurrency = int(config.get("async_concurrency", DEFAULT_ASYNC_CONCURRENCY))
+        http2 = bool(config.get("http2", False))
+        with cls._registry_lock:
+            engine = cls._registry.get((concurrency, http2))
+            if engine is None:
+                engine = cls(concurrency=concurrency, http2=http2)
+                cls._registry[(concurrency, http2)] = engine
+        return engine
+
+    @classmethod
+    def reset(cls) -> None:
+        """Stop and forget every engine (mostly useful in tests)"""
+        with cls._registry_lock:
+            for engine in cls._registry.values():
+                engine.close()
+            cls._registry.clear()
+
+    def submit(self, coroutine: Coroutine[Any, Any, T]) -> "Future[T]":
+        """
+        Schedule a coroutine on the engine's loop from any thread and return a
+        `concurrent.futures.Future` for its result
+        """
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the engine's loop and block until it finishes"""
+        return self.submit(coroutine).result()
+
+    async def send(
+        self, prepared_request: requests.PreparedRequest, timeout: float
+    ) -> requests.Response:
+        """
+        Send a prepared request over the shared async client. Transport errors
+        are re-raised as their `requests` equivalents so the stream's retry
+        handling treats both engines the same way.
+        """
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+                http2=self.http2,
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        assert self._semaphore is not None
+
+        async with self._semaphore:
+            started = datetime.datetime.now()
+            try:
+                httpx_response = await self._client.request(
+                    prepared_request.method or "GET",
+                    prepared_request.url or "",
+                    headers=dict(prepared_request.headers),
+                    content=prepared_request.body,
+                    timeout=timeout,
+                )
+            except httpx.TimeoutException as ex:
+                raise requests.exceptions.ReadTimeout(str(ex), request=prepared_request)
+            except httpx.TransportError as ex:
+                raise requests.exceptions.ConnectionError(
+                    str(ex), request=prepared_request
+                )
+            elapsed = datetime.datetime.now() - started
+
+        return self._to_requests_response(httpx_response, prepared_request, elapsed)
+
+    @staticmethod
+    def _to_requests_response(
+        httpx_response: "httpx.Response",
+        prepared_request: requests.PreparedRequest,
+        elapsed: datetime.timedelta,
+    ) -> requests.Response:
+        """Copy an httpx response into a `requests.Response`"""
+
+        response = requests.Response()
+        response.status_code = httpx_response.status_code
+        response.headers = CaseInsensitiveDict(httpx_response.headers)
+        response._content = httpx_response.content
+        response.encoding = httpx_response.encoding
+        response.reason = httpx_response.reason_phrase
+        response.url = str(httpx_response.url)
+        response.request = prepared_request
+        response.elapsed = elapsed
+        return response
+
+    def close(self) -> None:
+        """Close the client and stop the loop"""
+
+        if self._client is not None:
+            self.run(self._client.aclose())
+            self._client = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
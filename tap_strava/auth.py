@@ -1,9 +1,271 @@
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
 from singer_sdk.authenticators import APIAuthenticatorBase
 from singer_sdk.streams import Stream
-from datetime import datetime
+from datetime import datetime, timedelta
 import requests
-from singer import utils
 from singer_sdk.helpers._util import utc_now
+from tap_strava.http_pool import HttpPool
+
+# Refresh the access token this many seconds before Strava says it expires so
+# that a request built just before expiry doesn't go out with a stale token
+DEFAULT_REFRESH_MARGIN = 300
+
+# Seconds to wait on the token endpoint before giving up on a refresh
+DEFAULT_TOKEN_TIMEOUT = 30
+
+
+def athlete_credentials(config: Mapping[str, Any], name: str) -> Dict[str, Any]:
+    """The tap config with the credentials of the athlete called `name`"""
+
+    for athlete in config.get("athletes") or []:
+        if athlete["name"] == name:
+            break
+    else:
+        raise ValueError(f"No athlete named {name} is configured")
+    credentials = {**config, **athlete}
+    if "token_cache_path" not in athlete and config.get("token_cache_path"):
+        # Athletes each rotate their own refresh token, never share a cache
+        credentials["token_cache_path"] = f"{config['token_cache_path']}.{name}"
+    return credentials
+
+
+class StravaTokenManager:
+    """
+    Process-wide OAuth token store for a single set of Strava credentials.
+
+    Every stream (and thread) in a run shares one manager per client id and
+    refresh token, so the token endpoint is only hit when the access token is
+    about to expire and the rotated refresh token is never thrown away.
+    """
+
+    _registry: Dict[Tuple[Optional[str], Optional[str]], "StravaTokenManager"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        auth_endpoint: str,
+        client_id: str | None,
+        client_secret: str | None,
+        refresh_token: str | None,
+        cache_path: str | None = None,
+        default_expiration: int | None = None,
+        refresh_margin: int = DEFAULT_REFRESH_MARGIN,
+        logger: logging.Logger | None = None,
+        session: requests.Session | None = None,
+        timeout: float = DEFAULT_TOKEN_TIMEOUT,
+    ) -> None:
+        """Create a new token manager.
+        Args:
+            auth_endpoint: Strava OAuth token endpoint.
+            client_id: Strava application client id.
+            client_secret: Strava application client secret.
+            refresh_token: Refresh token from the config, used until Strava rotates it.
+            cache_path: Optional file the latest tokens are saved to between runs.
+            default_expiration: Default token expiry in seconds.
+            refresh_margin: Seconds before expiry at which the token is refreshed.
+            logger: Logger to report token refreshes to.
+            session: Session to reach the token endpoint through, so refreshes
+                reuse the run's pooled connections.
+            timeout: Seconds to wait on the token endpoint.
+        """
+        self.auth_endpoint = auth_endpoint
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.config_refresh_token = refresh_token
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.default_expiration = default_expiration
+        self.refresh_margin = refresh_margin
+        self.logger = logger or logging.getLogger(__name__)
+        self.session = session
+        self.timeout = timeout
+
+        self.access_token: str | None = None
+        self.last_refreshed: datetime | None = None
+        self.expires_at: datetime | None = None
+        self._lock = threading.RLock()
+
+        if self.cache_path:
+            self._load_cache()
+
+    @classmethod
+    def for_config(
+        cls,
+        config: Mapping[str, Any],
+        auth_endpoint: str,
+        logger: logging.Logger | None = None,
+        default_expiration: int | None = None,
+    ) -> "StravaTokenManager":
+        """
+        Return the shared token manager for the credentials in `config`,
+        creating it on first use
+        """
+
+        key = (config.get("client_id"), config.get("refresh_token"))
+        with cls._registry_lock:
+            manager = cls._registry.get(key)
+            if manager is None:
+                manager = cls(
+                    auth_endpoint=auth_endpoint,
+                    client_id=config.get("client_id"),
+                    client_secret=config.get("client_secret"),
+                    refresh_token=config.get("refresh_token"),
+                    cache_path=config.get("token_cache_path"),
+                    default_expiration=default_expiration,
+                    logger=logger,
+                    session=HttpPool.for_config(config, logger=logger).session,
+                )
+                cls._registry[key] = manager
+        return manager
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forget every shared token manager (mostly useful in tests)"""
+        with cls._registry_lock:
+            cls._registry.clear()
+
+    @property
+    def oauth_request_body(self) -> dict:
+        """
+        Format the request body Stravas auth endpoint is expecting
+        """
+
+        return {
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "refresh_token": self.refresh_token,
+            "grant_type": "refresh_token",
+        }
+
+    def is_token_valid(self) -> bool:
+        """Check if token is valid.
+        Returns:
+            True if the token exists and won't expire within the refresh margin.
+        """
+        if self.access_token is None:
+            return False
+        if self.expires_at is None:
+            return True
+        margin = timedelta(seconds=self.refresh_margin)
+        return utc_now() + margin < self.expires_at
+
+    def get_access_token(self) -> str:
+        """
+        Return a valid access token, refreshing it first if it is missing or
+        about to expire. Safe to call from several threads at once, only one of
+        them will hit the token endpoint.
+        """
+
+        with self._lock:
+            if not self.is_token_valid():
+                self.refresh()
+            return str(self.access_token)
+
+    def refresh(self) -> None:
+        """Exchange the refresh token for a new access token.
+        Raises:
+            RuntimeError: When OAuth login fails.
+        """
+        with self._lock:
+            request_time = utc_now()
+            post = self.session.post if self.session else requests.post
+            token_response = post(
+                self.auth_endpoint, data=self.oauth_request_body, timeout=self.timeout
+            )
+            try:
+                token_response.raise_for_status()
+                self.logger.info("OAuth authorization attempt was successful.")
+            except Exception as ex:
+                raise RuntimeError(
+                    f"Failed OAuth login, response was '{token_response.text}'. {ex}"
+                )
+            token_json = token_response.json()
+            self.access_token = token_json["access_token"]
+            self.refresh_token = token_json.get("refresh_token", self.refresh_token)
+            self.last_refreshed = request_time
+            self.expires_at = self._get_expiry(token_json, request_time)
+            if self.expires_at is None:
+                self.logger.debug(
+                    "No expires_in receied in OAuth response and no "
+                    "default_expiration set. Token will be treated as if it never "
+                    "expires."
+                )
+            if self.cache_path:
+                self._save_cache()
+
+    def _get_expiry(self, token_json: dict, request_time: datetime) -> datetime | None:
+        """
+        Work out when the token expires, preferring Strava's absolute
+        `expires_at` over the relative `expires_in`
+        """
+
+        if token_json.get("expires_at"):
+            return datetime.fromtimestamp(
+                int(token_json["expires_at"]), tz=request_time.tzinfo
+            )
+        expires_in = token_json.get("expires_in", self.default_expiration)
+        if expires_in is None:
+            return None
+        return request_time + timedelta(seconds=int(expires_in))
+
+    def _load_cache(self) -> None:
+        """
+        Start from the tokens saved by a previous run, if the cache file exists
+        and was written for the same client and configured refresh token. A
+        refresh token put in the config since then wins over the cache.
+        """
+
+        assert self.cache_path is not None
+        if not self.cache_path.exists():
+            return
+        try:
+            cached = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError) as ex:
+            self.logger.warning(f"Ignoring unreadable token cache: {ex}")
+            return
+        if str(cached.get("client_id")) != str(self.client_id):
+            return
+        if cached.get("config_refresh_token") != self.config_refresh_token:
+            self.logger.info(
+                "The configured refresh token changed, ignoring the token cache"
+            )
+            return
+
+        self.refresh_token = cached.get("refresh_token") or self.refresh_token
+        self.access_token = cached.get("access_token")
+        if cached.get("expires_at"):
+            self.expires_at = datetime.fromtimestamp(
+                int(cached["expires_at"]), tz=utc_now().tzinfo
+            )
+        self.logger.debug(f"Loaded cached OAuth token from {self.cache_path}")
+
+    def _save_cache(self) -> None:
+        """
+        Persist the latest tokens so the next run can skip the token endpoint.
+        The file is written next to the target and renamed into place so a
+        crash can never leave a half written cache behind.
+        """
+
+        assert self.cache_path is not None
+        payload = {
+            "client_id": self.client_id,
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "config_refresh_token": self.config_refresh_token,
+            "expires_at": int(self.expires_at.timestamp()) if self.expires_at else None,
+        }
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(payload))
+            tmp_path.chmod(0o600)
+            tmp_path.replace(self.cache_path)
+        except OSError as ex:
+            self.logger.warning(f"Could not write token cache: {ex}")
 
 
 class StravaAuthenticator(APIAuthenticatorBase):
@@ -15,6 +277,7 @@ class StravaAuthenticator(APIAuthenticatorBase):
         auth_endpoint: str | None = None,
         oauth_scopes: str | None = None,
         default_expiration: int | None = None,
+        credentials: Mapping[str, Any] | None = None,
     ) -> None:
         """Create a new authenticator.
         Args:
@@ -22,17 +285,18 @@ class StravaAuthenticator(APIAuthenticatorBase):
             auth_endpoint: API username.
             oauth_scopes: API password.
             default_expiration: Default token expiry in seconds.
+            credentials: Config holding the athlete's credentials, when it isn't the stream config.
         """
         super().__init__(stream=stream)
         self._auth_endpoint = auth_endpoint
         self._default_expiration = default_expiration
         self._oauth_scopes = oauth_scopes
-
-        # Initialize internal tracking attributes
-        self.refresh_token: str | None = None
-        self.access_token: str | None = None
-        self.last_refreshed: datetime | None = None
-        self.expires_in: int | None = None
+        self.token_manager = StravaTokenManager.for_config(
+            credentials or self.config,
+            auth_endpoint=self.auth_endpoint,
+            logger=self.logger,
+            default_expiration=default_expiration,
+        )
 
     @property
     def auth_params(self) -> dict:
@@ -41,10 +305,8 @@ class StravaAuthenticator(APIAuthenticatorBase):
         Returns:
             HTTP query params for authentication.
         """
-        if not self.is_token_valid():
-            self.update_access_token()
-        result = super().auth_headers
-        result["access_token"] = f"{self.access_token}"
+        result = super().auth_params
+        result["access_token"] = self.token_manager.get_access_token()
         return result
 
     @property
@@ -73,20 +335,22 @@ class StravaAuthenticator(APIAuthenticatorBase):
         Returns:
             A plain (OAuth) or encrypted (JWT) request body.
         """
-        return self.oauth_request_body
+        return self.token_manager.oauth_request_body
 
     @property
-    def oauth_request_body(self) -> dict:
-        """
-        Format the request body Stravas auth endpoint is expecting
-        """
+    def access_token(self) -> str | None:
+        """The current access token held by the shared token manager"""
+        return self.token_manager.access_token
 
-        return {
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-            "refresh_token": self.refresh_token or self.config.get("refresh_token"),
-            "grant_type": "refresh_token",
-        }
+    @property
+    def refresh_token(self) -> str | None:
+        """The latest (possibly rotated) refresh token"""
+        return self.token_manager.refresh_token
+
+    @property
+    def last_refreshed(self) -> datetime | None:
+        """When the shared access token was last refreshed"""
+        return self.token_manager.last_refreshed
 
     @property
     def client_id(self) -> str | None:
@@ -113,38 +377,12 @@ class StravaAuthenticator(APIAuthenticatorBase):
         Returns:
             True if the token is valid (fresh).
         """
-        if self.last_refreshed is None:
-            return False
-        if not self.expires_in:
-            return True
-        if self.expires_in > (utils.now() - self.last_refreshed).total_seconds():
-            return True
-        return False
+        return self.token_manager.is_token_valid()
 
     # Authentication and refresh
     def update_access_token(self) -> None:
-        """Update `access_token` along with: `last_refreshed` and `expires_in`.
+        """Update the shared access token along with its expiry.
         Raises:
             RuntimeError: When OAuth login fails.
         """
-        request_time = utc_now()
-        auth_request_payload = self.oauth_request_payload
-        token_response = requests.post(self.auth_endpoint, data=auth_request_payload)
-        try:
-            token_response.raise_for_status()
-            self.logger.info("OAuth authorization attempt was successful.")
-        except Exception as ex:
-            raise RuntimeError(
-                f"Failed OAuth login, response was '{token_response.json()}'. {ex}"
-            )
-        token_json = token_response.json()
-        self.access_token = token_json["access_token"]
-        self.refresh_token = token_json["refresh_token"]
-        self.expires_in = token_json.get("expires_in", self._default_expiration)
-        if self.expires_in is None:
-            self.logger.debug(
-                "No expires_in receied in OAuth response and no "
-                "default_expiration set. Token will be treated as if it never "
-                "expires."
-            )
-        self.last_refreshed = request_time
+        self.token_manager.refresh()
@@ -0,0 +1,141 @@
+import gzip
+import json
+from dataclasses import dataclass
+from typing import IO, Any, List, Optional
+from uuid import uuid4
+
+import fs
+from singer_sdk.helpers._batch import BaseBatchFileEncoding, BatchConfig
+
+# pyarrow, imported by `_import_pyarrow` when a Parquet batch is started
+pa: Any = None
+pq: Any = None
+
+
+def _import_pyarrow() -> None:
+    global pa, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:  # pragma: no cover - only without pyarrow installed
+        raise RuntimeError(
+            "Parquet batches need pyarrow, install it with `pip install pyarrow`"
+        ) from None
+    pa, pq = pyarrow, pyarrow.parquet
+
+
+@dataclass
+class ParquetEncoding(BaseBatchFileEncoding):
+    """
+    Parquet batch files, registered with the SDK so `batch_config` accepts
+    `"format": "parquet"`. Needs pyarrow.
+    """
+
+    __encoding_format__ = "parquet"
+
+
+class BatchSpool:
+    """
+    The batch file a stream's records are currently going into.
+
+    The file stays open across contexts, so a child stream's records for many
+    activities land in the same file instead of one tiny file per activity.
+    It is rotated once it holds `max_records` records or, for JSON lines,
+    `max_bytes` bytes of uncompressed records. `close` finishes the file and
+    returns its manifest, the next record starts a new one.
+    """
+
+    def __init__(
+        self,
+        stream_name: str,
+        batch_config: BatchConfig,
+        max_records: int,
+        max_bytes: Optional[int] = None,
+        file_prefix: str = "tap-strava",
+    ) -> None:
+        self.stream_name = stream_name
+        self.batch_config = batch_config
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.file_prefix = file_prefix
+        self.records = 0
+        self.bytes = 0
+        self._fs: Any = None
+        self._filename: Optional[str] = None
+        self._file: Optional[IO[bytes]] = None
+        self._writer: Optional[IO[bytes]] = None
+        self._rows: List[dict] = []
+
+    @property
+    def encoding(self) -> BaseBatchFileEncoding:
+        return self.batch_config.encoding
+
+    @property
+    def is_parquet(self) -> bool:
+        return self.encoding.format == ParquetEncoding.__encoding_format__
+
+    @property
+    def full(self) -> bool:
+        if self.records >= self.max_records:
+            return True
+        return self.max_bytes is not None and 0 < self.max_bytes <= self.bytes
+
+    def append(self, record: dict) -> None:
+        if self._filename is None:
+            self._open()
+        self.records += 1
+        if self.is_parquet:
+            self._rows.append(record)
+            return
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        self.bytes += len(line)
+        assert self._writer is not None
+        self._writer.write(line)
+
+    def _open(self) -> None:
+        if self.is_parquet:
+            _import_pyarrow()
+        storage = self.batch_config.storage
+        extension = "parquet" if self.is_parquet else "jsonl"
+        if self.encoding.compression == "gzip" and not self.is_parquet:
+            extension += ".gz"
+        self._filename = (
+            f"{storage.prefix or ''}{self.file_prefix}--{self.stream_name}-"
+            f"{uuid4()}.{extension}"
+        )
+        self._fs = fs.open_fs(storage.fs_url.geturl(), create=True)
+        if self.is_parquet:
+            return
+        self._file = self._fs.open(self._filename, "wb")
+        if self.encoding.compression == "gzip":
+            self._writer = gzip.GzipFile(fileobj=self._file, mode="wb")
+        else:
+            self._writer = self._file
+
+    def close(self) -> Optional[List[str]]:
+        """Finish the current file and return its manifest, if it has records"""
+
+        if self._filename is None:
+            return None
+        filename = self._filename
+        try:
+            if self.is_parquet:
+                with self._fs.open(filename, "wb") as parquet_file:
+                    pq.write_table(pa.Table.from_pylist(self._rows), parquet_file)
+            else:
+                assert self._writer is not None and self._file is not None
+                self._writer.close()
+                self._file.close()
+            url = self._fs.geturl(filename)
+        finally:
+            self._fs.close()
+            self._fs = None
+            self._filename = None
+            self._file = None
+            self._writer = None
+            self._rows = []
+            self.records = 0
+            self.bytes = 0
+        return [url]
@@ -0,0 +1,176 @@
+"""
+Entry point of the `tap-strava` command.
+
+`--about`, `--version` and `--discover` only print things that are fixed when
+the package is built, yet going through the SDK means importing it and every
+stream's dependencies first, which takes most of a second. Those invocations
+are answered from `bundle.json` instead, written by `scripts/build_bundle.py`
+when the package is built. It isn't kept in the repository. The bundle
+records a fingerprint of what its output was built from, and anything it
+can't answer exactly, including a missing or stale bundle, goes to the SDK.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PACKAGE_DIR = Path(__file__).parent
+BUNDLE_PATH = PACKAGE_DIR / "bundle.json"
+
+# Distributions whose versions show up in the --about and --version output
+VERSIONED_PACKAGES = ("tap-strava", "singer-sdk")
+
+# Modules the settings, capabilities and catalog are defined in, along with
+# the schemas. Any other change to the package leaves the bundle as it is
+BUNDLE_INPUTS = ("tap.py", "streams.py", "series.py", "polyline.py")
+
+# Settings that change the discovered catalog. activity_stream_types only
+# selects activity_streams, the bundle holds the catalog both ways, while
+# the SDK's own settings are left to the SDK
+ACTIVITY_STREAMS_SETTING = "activity_stream_types"
+DISCOVERY_SETTINGS = (
+    ACTIVITY_STREAMS_SETTING,
+    "flattening_enabled",
+    "flattening_max_depth",
+    "stream_maps",
+    "stream_map_config",
+)
+
+
+def source_fingerprint() -> str:
+    """
+    Hash of what the bundled output depends on: the config schema, the
+    streams and their schemas, and the tap and SDK versions
+    """
+
+    digest = hashlib.sha256()
+    sources = [PACKAGE_DIR / name for name in BUNDLE_INPUTS] + sorted(
+        (PACKAGE_DIR / "schemas").glob("*.json")
+    )
+    for path in sources:
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    for package in VERSIONED_PACKAGES:
+        digest.update(_package_version(package).encode())
+    return digest.hexdigest()
+
+
+def _package_version(package: str) -> str:
+    from importlib import metadata
+
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+def load_bundle() -> Optional[Dict[str, Any]]:
+    """The bundle, if there is one and it matches the installed sources"""
+
+    try:
+        bundle = json.loads(BUNDLE_PATH.read_text())
+    except (OSError, ValueError):
+        return None
+    if bundle.get("fingerprint") != source_fingerprint():
+        return None
+    return bundle
+
+
+def bundled_output(args: List[str]) -> Optional[str]:
+    """
+    What the SDK would print for `args`, or None unless the invocation is
+    one of those the bundle can answer exactly
+    """
+
+    about = discover = version = False
+    output_format = None
+    configs: List[str] = []
+    remaining = list(args)
+    while remaining:
+        arg = remaining.pop(0)
+        name, has_value, value = arg.partition("=")
+        if arg == "--about":
+            about = True
+        elif arg == "--discover":
+            discover = True
+        elif arg == "--version":
+            version = True
+        elif name in ("--format", "--config"):
+            if not has_value:
+                if not remaining:
+                    return None
+                value = remaining.pop(0)
+            if name == "--format":
+                output_format = value
+            else:
+                configs.append(value)
+        else:
+            return None
+
+    if version:
+        key = "version"
+    elif about:
+        key = f"about_{output_format or 'text'}"
+    elif discover:
+        if output_format is not None:
+            return None
+        streams_enabled = _activity_streams_enabled(configs)
+        if streams_enabled is None:
+            return None
+        key = "catalog_activity_streams" if streams_enabled else "catalog"
+    else:
+        return None
+
+    bundle = load_bundle()
+    if bundle is None:
+        return None
+    return bundle.get(key)
+
+
+def _activity_streams_enabled(configs: List[str]) -> Optional[bool]:
+    """
+    Whether the config turns activity_streams on, None when that can't be
+    told without the SDK: an unreadable file, discovery settings in the env,
+    or SDK settings that change the catalog
+    """
+
+    enabled = False
+    for config in configs:
+        if config == "ENV":
+            if any(
+                f"TAP_STRAVA_{name.upper()}" in os.environ
+                for name in DISCOVERY_SETTINGS
+            ):
+                return None
+            continue
+        try:
+            settings = json.loads(Path(config).read_text())
+        except (OSError, ValueError):
+            # Let the SDK report it
+            return None
+        if not isinstance(settings, dict):
+            return None
+        if any(name in settings for name in DISCOVERY_SETTINGS[1:]):
+            return None
+        if ACTIVITY_STREAMS_SETTING in settings:
+            enabled = bool(settings[ACTIVITY_STREAMS_SETTING])
+    return enabled
+
+
+def main() -> None:
+    output = bundled_output(sys.argv[1:])
+    if output is not None:
+        sys.stdout.write(output)
+        return
+
+    from tap_strava.output import BufferedMessageWriter
+    from tap_strava.tap import TapStrava
+
+    try:
+        TapStrava.cli()
+    finally:
+        # Syncs end on a flushed STATE message, but not the ones that fail
+        BufferedMessageWriter.flush_shared()
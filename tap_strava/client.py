@@ -1,13 +1,75 @@
-import time
+import asyncio
 import datetime
+import hashlib
+import logging
+import threading
+import time
 import requests
+from concurrent.futures import Executor, Future
 from dateutil import parser as date_parser
-from typing import Dict, Optional, Any, Union
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 from singer_sdk.exceptions import RetriableAPIError, FatalAPIError
+from singer_sdk.helpers.jsonpath import extract_jsonpath
+from singer_sdk.helpers._state import (
+    get_starting_replication_value,
+    get_state_if_exists,
+)
+
+from singer_sdk import RESTStream, metrics
+from singer_sdk import _singerlib as singer
+from singer_sdk._singerlib import RecordMessage
+from singer_sdk.helpers._batch import BatchConfig, SDKBatchMessage
+from singer_sdk.helpers._util import utc_now
+from tap_strava.async_engine import AsyncHttpEngine
+from tap_strava.auth import StravaAuthenticator, athlete_credentials
+from tap_strava.batch import BatchSpool
+from tap_strava.fingerprints import FingerprintStore
+from tap_strava.http_cache import (
+    CachedResponse,
+    ResponseCache,
+    cache_key,
+    response_from_cache,
+)
+from tap_strava.http_pool import HttpPool
+from tap_strava.output import BufferedMessageWriter
+from tap_strava.projection import Projection
+from tap_strava.rate_limit import RateLimitScheduler, parse_rate_limit_headers
+from tap_strava.responses import (
+    PageInfo,
+    decode_response,
+    ijson,
+    page_info,
+    response_info,
+    stream_records,
+)
+from tap_strava.telemetry import SyncTelemetry
+from tap_strava.transform import Transformer, compile_transformer
+from urllib.parse import parse_qs, urljoin, urlparse
+
+
+def epoch_seconds(value: str) -> int:
+    """
+    Seconds since the epoch of a datetime string, read as UTC unless it
+    carries an offset, whatever the timezone of the host
+    """
+
+    parsed = date_parser.parse(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.astimezone(datetime.timezone.utc).timestamp())
+
 
-from singer_sdk import RESTStream
-from tap_strava.auth import StravaAuthenticator
-from urllib.parse import parse_qs, urlparse
+DEFAULT_API_URL = "https://www.strava.com/api/v3/"
 
 
 class StravaStream(RESTStream):
@@ -16,20 +78,608 @@ class StravaStream(RESTStream):
     Base stream class for the Strava API
     """
 
+    _authenticator: Optional[StravaAuthenticator] = None
+    _athlete_authenticators: Optional[Dict[str, StravaAuthenticator]] = None
+    _transformer: Optional[Transformer] = None
+    _projection: Optional[Projection] = None
+    _projection_compiled = False
+    _prefetched: Optional[Dict[Tuple, Future]] = None
+    _batch_spools: Optional[Dict[str, BatchSpool]] = None
+    _sync_costs_lock = threading.Lock()
+
+    #: Largest `per_page` Strava accepts on its list endpoints
+    max_page_size: int = 200
+
+    #: Child context key holding the parent's count of this stream's records
+    parent_count_key: Optional[str] = None
+
+    #: Properties, as dotted paths, the stream reads off its own records, e.g.
+    #: for child contexts or pagination, so they survive parsing even when
+    #: deselected. The primary keys and replication key are always kept too
+    required_properties: Tuple[str, ...] = ()
+
+    #: Seconds a cached response is reused without asking Strava at all. Past
+    #: that it is revalidated with its ETag, or fetched again if it has none
+    cache_ttl: int = 0
+
     @property
     def url_base(self):
-        return "https://www.strava.com/api/v3/"
+        return self.config.get("api_url", DEFAULT_API_URL)
 
     @property
-    def authenticator(self):
+    def authenticator(self) -> StravaAuthenticator:
+        """
+        OAuth2 authenticator for the Strava API. It is created once per stream
+        and backed by a token manager shared by every stream in the process
+        """
+
+        if self._authenticator is None:
+            self._authenticator = StravaAuthenticator(
+                self,
+                auth_endpoint=urljoin(self.url_base, "/oauth/token"),
+            )
+        return self._authenticator
+
+    def athlete_config(self, context: Optional[dict]) -> Mapping[str, Any]:
         """
-        Instantiates OAuth2 authenticatior class for the Strava API
+        The config with the credentials of the athlete the context belongs to.
+        Without `athletes` configured that's simply the stream config.
         """
 
-        return StravaAuthenticator(
-            self,
-            auth_endpoint="https://www.strava.com/oauth/token",
+        name = context.get("athlete") if context else None
+        if name is None:
+            return self.config
+        return athlete_credentials(self.config, name)
+
+    def authenticator_for(self, context: Optional[dict]) -> StravaAuthenticator:
+        """Authenticator for the athlete the context belongs to"""
+
+        name = context.get("athlete") if context else None
+        if name is None:
+            return self.authenticator
+        if self._athlete_authenticators is None:
+            self._athlete_authenticators = {}
+        authenticator = self._athlete_authenticators.get(name)
+        if authenticator is None:
+            authenticator = StravaAuthenticator(
+                self,
+                auth_endpoint=urljoin(self.url_base, "/oauth/token"),
+                credentials=self.athlete_config(context),
+            )
+            self._athlete_authenticators[name] = authenticator
+        return authenticator
+
+    def prepare_request(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> requests.PreparedRequest:
+        """
+        Build the request like the SDK does, but authenticated as the athlete
+        the context belongs to
+        """
+
+        request = requests.Request(
+            method=self.rest_method,
+            url=self.get_url(context),
+            params=self.get_url_params(context, next_page_token),
+            headers=self.http_headers,
+            json=self.prepare_request_payload(context, next_page_token),
         )
+        self.authenticator_for(context).authenticate_request(request)
+        return self.requests_session.prepare_request(request)
+
+    @property
+    def http_pool(self) -> HttpPool:
+        """Connection pool shared by every stream and token refresh of the run"""
+        return HttpPool.for_config(self.config, logger=self.logger)
+
+    @property
+    def requests_session(self) -> requests.Session:
+        """The shared pool's session, in place of one session per stream"""
+        return self.http_pool.session
+
+    @property
+    def rate_limit_scheduler(self) -> RateLimitScheduler:
+        """
+        Request scheduler shared with every other stream and worker using the
+        same Strava application
+        """
+
+        return RateLimitScheduler.for_config(self.config, logger=self.logger)
+
+    @property
+    def async_engine(self) -> Optional[AsyncHttpEngine]:
+        """
+        Shared asyncio engine when `http_engine` is set to "async", None when
+        requests go through the shared `requests` session
+        """
+
+        if self.config.get("http_engine", "requests") != "async":
+            return None
+        return AsyncHttpEngine.for_config(self.config)
+
+    def _request(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        """
+        Send the request once the shared rate limit scheduler gives it a slot
+        """
+
+        cache = self.http_cache
+        entry = None
+        if cache is not None:
+            entry = self._cached_entry(cache, prepared_request, context)
+            if entry is not None and self._is_fresh(cache, entry):
+                cache.record("hits")
+                return response_from_cache(entry, prepared_request)
+
+        scheduler = self.rate_limit_scheduler
+        scheduler.check_daily_quota()
+        waited_from = time.monotonic()
+        scheduler.acquire()
+        self.telemetry.add_rate_limit_sleep(self.name, time.monotonic() - waited_from)
+        try:
+            engine = self.async_engine
+            if engine:
+                response = engine.run(engine.send(prepared_request, self.timeout))
+            else:
+                # Cached responses are stored whole, so they can't be streamed
+                streamed = self.stream_responses and cache is None
+                response = self.requests_session.send(
+                    prepared_request, timeout=self.timeout, stream=streamed
+                )
+                response_info(response).streamed = streamed
+            if cache is not None:
+                key = self._cache_key(prepared_request, context)
+                response = cache.update(key, prepared_request, response, entry)
+            try:
+                self._handle_response(prepared_request, response, context)
+            except Exception:
+                # Hand a streamed connection back to the pool before retrying
+                response.close()
+                raise
+        finally:
+            scheduler.release()
+        return response
+
+    @property
+    def stream_responses(self) -> bool:
+        """
+        Whether page bodies are parsed incrementally off the socket. Only the
+        requests engine streams, the async engine always reads whole bodies.
+        """
+
+        if not self.config.get("stream_responses", False):
+            return False
+        if ijson is None:
+            raise RuntimeError(
+                "stream_responses needs ijson, install it with `pip install ijson`"
+            )
+        return True
+
+    async def _request_async(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        """
+        Async counterpart of `_request`, waiting for the scheduler's slot
+        without holding up the event loop
+        """
+
+        engine = self.async_engine
+        assert engine is not None
+        cache = self.http_cache
+        entry = None
+        if cache is not None:
+            entry = self._cached_entry(cache, prepared_request, context)
+            if entry is not None and self._is_fresh(cache, entry):
+                cache.record("hits")
+                return response_from_cache(entry, prepared_request)
+
+        scheduler = self.rate_limit_scheduler
+        scheduler.check_daily_quota()
+        wait = scheduler.reserve()
+        if wait > 0:
+            self.telemetry.add_rate_limit_sleep(self.name, wait)
+            await asyncio.sleep(wait)
+        try:
+            response = await engine.send(prepared_request, self.timeout)
+            if cache is not None:
+                key = self._cache_key(prepared_request, context)
+                response = cache.update(key, prepared_request, response, entry)
+            self._handle_response(prepared_request, response, context)
+        finally:
+            scheduler.release()
+        return response
+
+    @property
+    def telemetry(self) -> SyncTelemetry:
+        """Runtime metrics shared by every stream of the application"""
+        return SyncTelemetry.for_config(self.config, logger=self.logger)
+
+    def backoff_handler(self, details: dict) -> None:
+        """Count the retry before the SDK logs it"""
+        self.telemetry.count_retry(self.name, self.path)
+        super().backoff_handler(details)
+
+    @property
+    def http_cache(self) -> Optional[ResponseCache]:
+        """Shared response cache, if `http_cache_path` is configured"""
+        return ResponseCache.for_config(self.config, logger=self.logger)
+
+    def _cache_key(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> str:
+        """Cache key of the request, scoped to the athlete it is made for"""
+
+        credentials = self.athlete_config(context)
+        account = hashlib.sha256(
+            f"{credentials['client_id']}:{credentials['refresh_token']}".encode()
+        ).hexdigest()[:16]
+        return cache_key(prepared_request, account)
+
+    def _cached_entry(
+        self,
+        cache: ResponseCache,
+        prepared_request: requests.PreparedRequest,
+        context: Optional[dict],
+    ) -> Optional[CachedResponse]:
+        return cache.lookup(
+            self._cache_key(prepared_request, context), prepared_request
+        )
+
+    def _is_fresh(self, cache: ResponseCache, entry: CachedResponse) -> bool:
+        ttl = (self.config.get("http_cache_ttls") or {}).get(self.name, self.cache_ttl)
+        return cache.is_fresh(entry, ttl)
+
+    def _handle_response(
+        self,
+        prepared_request: requests.PreparedRequest,
+        response: requests.Response,
+        context: Optional[dict],
+    ) -> None:
+        """
+        Log the request duration, record the response in the runtime metrics
+        and validate it, for either engine
+        """
+
+        self._write_request_duration_log(
+            endpoint=self.path,
+            response=response,
+            context=context,
+            extra_tags={"url": prepared_request.path_url}
+            if self._LOG_REQUEST_METRIC_URLS
+            else None,
+        )
+        if response_info(response).streamed:
+            # Reading the body here would defeat streaming, trust the header
+            size = int(response.headers.get("Content-Length", 0))
+        else:
+            size = len(response.content)
+        self.telemetry.observe_response(
+            self.name, self.path, response.elapsed.total_seconds(), size
+        )
+        self.validate_response(response)
+        logging.debug("Response received successfully.")
+
+    async def request_records_async(self, context: Optional[dict]) -> List[dict]:
+        """
+        Fetch every page for `context` on the async engine. Mirrors the SDK's
+        `request_records` so pagination, retries and parsing are identical.
+        """
+
+        # Refresh the token off the loop, the token endpoint call is blocking
+        token_manager = self.authenticator_for(context).token_manager
+        await asyncio.to_thread(token_manager.get_access_token)
+
+        paginator = self.get_new_paginator()
+        decorated_request = self.request_decorator(self._request_async)
+        records: List[dict] = []
+
+        with metrics.http_request_counter(self.name, self.path) as request_counter:
+            request_counter.context = context
+
+            while not paginator.finished:
+                prepared_request = self.prepare_request(
+                    context,
+                    next_page_token=paginator.current_value,
+                )
+                resp = await decorated_request(prepared_request, context)
+                request_counter.increment()
+                self.update_sync_costs(prepared_request, resp, context)
+                records.extend(self.parse_response(resp))
+
+                paginator.advance(resp)
+
+        return records
+
+    def prefetch(self, context: dict, executor: Optional[Executor]) -> None:
+        """
+        Start fetching every page of this stream for `context`, on the async
+        engine when it's enabled and on `executor` otherwise. The records are
+        picked up, in order, when the SDK later syncs this stream for the same
+        context.
+        """
+
+        if self.is_unchanged(context) or self.is_synced_before_stop(context):
+            return
+        if self._prefetched is None:
+            self._prefetched = {}
+        engine = self.async_engine
+        if engine:
+            future = engine.submit(self.request_records_async(context))
+        else:
+            assert executor is not None
+            future = executor.submit(lambda: list(self.request_records(context)))
+        self._prefetched[self._prefetch_key(context)] = future
+
+    def discard_prefetch(self, context: dict) -> None:
+        """Cancel a prefetch that is no longer going to be consumed"""
+
+        if self._prefetched:
+            future = self._prefetched.pop(self._prefetch_key(context), None)
+            if future:
+                future.cancel()
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """
+        Return records for the context, reusing the result of `prefetch` when
+        the context was fetched ahead of time. Child contexts whose parent
+        count says nothing changed are skipped without a request.
+        """
+
+        if self.is_unchanged(context):
+            self.logger.debug(f"Skipping {self.name} for unchanged {context}")
+            return
+        if self.is_synced_before_stop(context):
+            self.logger.debug(f"Skipping {self.name} for {context}, synced last run")
+            return
+
+        future = None
+        if self._prefetched and context is not None:
+            future = self._prefetched.pop(self._prefetch_key(context), None)
+        emitted = 0
+        try:
+            if future is None:
+                for record in super().get_records(context):
+                    emitted += 1
+                    yield record
+            else:
+                records: List[dict] = future.result()
+                for record in records:
+                    transformed_record = self.post_process(record, context)
+                    if transformed_record is None:
+                        continue
+                    emitted += 1
+                    yield transformed_record
+        finally:
+            self.telemetry.count_records(self.name, emitted)
+
+        # Every record for the context has been emitted by now
+        self._record_fingerprint(context)
+        parent = self.parent_stream
+        if parent is not None and context is not None:
+            parent.child_synced(self.name, context)
+
+    @property
+    def fingerprints(self) -> Optional[FingerprintStore]:
+        """Shared fingerprint store, if `fingerprint_store_path` is configured"""
+
+        path = self.config.get("fingerprint_store_path")
+        if not path:
+            return None
+        return FingerprintStore.for_path(path, logger=self.logger)
+
+    def is_unchanged(self, context: Optional[dict]) -> bool:
+        """
+        True when the parent count for this child stream is zero, or equal to
+        the count recorded the last time this stream synced the activity
+        """
+
+        if not self.parent_count_key or not context:
+            return False
+        count = context.get(self.parent_count_key)
+        if count is None:
+            return False
+        if count == 0:
+            return True
+        store = self.fingerprints
+        return (
+            store is not None and store.get(self.name, context["activity_id"]) == count
+        )
+
+    @property
+    def parent_stream(self) -> Optional["StravaStream"]:
+        if self.parent_stream_type is None:
+            return None
+        parent = self._tap.streams.get(self.parent_stream_type.name)
+        return cast(Optional["StravaStream"], parent)
+
+    def is_synced_before_stop(self, context: Optional[dict]) -> bool:
+        """
+        True when a run stopped by the daily quota synced this child context
+        but not every other child stream of the same activity
+        """
+
+        parent = self.parent_stream
+        if parent is None or not context:
+            return False
+        return parent.synced_before_stop(self.name, context)
+
+    def synced_before_stop(self, child_name: str, child_context: dict) -> bool:
+        """Whether the stopped run synced `child_context` for the child stream"""
+        return False
+
+    def child_synced(self, child_name: str, child_context: dict) -> None:
+        """Called once a child stream has emitted every record of a context"""
+
+    def _record_fingerprint(self, context: Optional[dict]) -> None:
+        store = self.fingerprints
+        if store is None or not self.parent_count_key or not context:
+            return
+        count = context.get(self.parent_count_key)
+        if count is not None:
+            store.set(self.name, context["activity_id"], count)
+
+    def saved_context_state(self, context: Optional[dict]) -> dict:
+        """
+        State saved for the context, without creating an empty one when there
+        is none like `get_context_state` does
+        """
+
+        return (
+            get_state_if_exists(
+                self.tap_state, self.name, self._get_state_partition_context(context)
+            )
+            or {}
+        )
+
+    def get_starting_replication_key_value(self, context: Optional[dict]) -> Any:
+        """
+        The value the SDK starts the context from. Partitions are prefetched on
+        worker threads before the SDK gets to them, so this only reads state:
+        adding it from a worker would race the main thread and put the
+        partition in the state ahead of its turn.
+        """
+
+        state = self.saved_context_state(context)
+        value = get_starting_replication_value(state)
+        if value is None and state.get("replication_key") == self.replication_key:
+            # Not started yet this run, it will start from its old bookmark
+            value = state.get("replication_key_value")
+        return value
+
+    @staticmethod
+    def _prefetch_key(context: dict) -> Tuple:
+        return tuple(sorted(context.items()))
+
+    @property
+    def transformer(self) -> Transformer:
+        """Record transform compiled for this stream's schema and selection"""
+
+        if self._transformer is None:
+            self._transformer = compile_transformer(
+                self.name, self.schema, self.mask, self.logger
+            )
+        return self._transformer
+
+    @property
+    def projection(self) -> Optional[Projection]:
+        """
+        Deselected subtrees to drop while parsing pages, None when the catalog
+        selects everything
+        """
+
+        if not self._projection_compiled:
+            keep = set(self.required_properties) | set(self.primary_keys or [])
+            if self.replication_key:
+                keep.add(self.replication_key)
+            self._projection = Projection.from_mask(self.mask, keep=keep)
+            self._projection_compiled = True
+        return self._projection
+
+    def _generate_record_messages(self, record: dict) -> Iterable[RecordMessage]:
+        """
+        Same as the SDK, but with the compiled transform in place of its
+        generic, per record walk of the schema
+        """
+
+        record = self.transformer(record)
+        for stream_map in self.stream_maps:
+            mapped_record = stream_map.transform(record)
+            # Emit record if not filtered
+            if mapped_record is not None:
+                yield RecordMessage(
+                    stream=stream_map.stream_alias,
+                    record=mapped_record,
+                    version=None,
+                    time_extracted=utc_now(),
+                )
+
+    def _sync_batches(
+        self, batch_config: BatchConfig, context: Optional[dict] = None
+    ) -> None:
+        """
+        Write records to batch files instead of stdout, with the same
+        selection, transform and stream maps as RECORD messages.
+
+        Unlike the SDK, a stream's batch file stays open across contexts, so
+        child streams don't write a file per activity. Files are rotated at
+        `batch_size` records or `batch_max_mb`, and every rotation is a state
+        checkpoint: all open files are closed and their BATCH messages written
+        right before the STATE message that covers them.
+        """
+
+        for record in self._sync_records(context, write_messages=False):
+            rotate = False
+            for record_message in self._generate_record_messages(record):
+                spool = self._batch_spool(record_message.stream, batch_config)
+                spool.append(record_message.record)
+                rotate = rotate or spool.full
+            if rotate:
+                self._write_state_message()
+
+    def _batch_spool(self, stream_name: str, batch_config: BatchConfig) -> BatchSpool:
+        if self._batch_spools is None:
+            self._batch_spools = {}
+        spool = self._batch_spools.get(stream_name)
+        if spool is None:
+            max_mb = self.config.get("batch_max_mb")
+            spool = BatchSpool(
+                stream_name,
+                batch_config,
+                max_records=int(self.config.get("batch_size", self.batch_size)),
+                max_bytes=int(max_mb * 2**20) if max_mb else None,
+                file_prefix=self.tap_name,
+            )
+            self._batch_spools[stream_name] = spool
+        return spool
+
+    def _write_state_message(self) -> None:
+        """
+        Close every open batch file of the tap first, so a STATE message never
+        covers records that aren't in a BATCH message yet, and with
+        `buffered_output` flush the buffer right after the STATE message
+        """
+
+        for stream in self._tap.streams.values():
+            spools = getattr(stream, "_batch_spools", None)
+            for stream_name, spool in (spools or {}).items():
+                manifest = spool.close()
+                if manifest:
+                    self._write_message(
+                        SDKBatchMessage(
+                            stream=stream_name,
+                            encoding=spool.encoding,
+                            manifest=manifest,
+                        )
+                    )
+        self._write_message(singer.StateMessage(value=self.tap_state))
+        # A checkpoint must reach the target along with everything before it
+        writer = self.message_writer
+        if writer is not None:
+            writer.flush()
+
+    @property
+    def message_writer(self) -> Optional[BufferedMessageWriter]:
+        """Shared stdout buffer, if `buffered_output` is on"""
+
+        if not self.config.get("buffered_output", False):
+            return None
+        return BufferedMessageWriter.for_config(self.config)
+
+    def _write_message(self, message: singer.Message) -> None:
+        writer = self.message_writer
+        if writer is None:
+            singer.write_message(message)
+        else:
+            writer.write(message.to_dict())
+
+    def _write_record_message(self, record: dict) -> None:
+        for record_message in self._generate_record_messages(record):
+            self._write_message(record_message)
+
+    def _write_schema_message(self) -> None:
+        for schema_message in self._generate_schema_messages():
+            self._write_message(schema_message)
 
     def get_next_page_token(
         self, response: requests.Response, current_value: int
@@ -39,8 +689,7 @@ class StravaStream(RESTStream):
         """
 
         self.logger.debug(f"Current value of the page number is {current_value}")
-        # Break if the result is empty meaning we're on the last page
-        if not response.json():
+        if self.is_last_page(response):
             next_page_token = None
         else:
             parsed_url = urlparse(response.request.url)
@@ -50,14 +699,104 @@ class StravaStream(RESTStream):
 
         return next_page_token
 
+    @property
+    def page_size(self) -> int:
+        """
+        Records requested per page. Defaults to the largest page the endpoint
+        allows, since every page costs one request against the rate limit.
+        """
+
+        requested = self.config.get("results_per_page") or self.max_page_size
+        return min(int(requested), self.max_page_size)
+
+    def is_last_page(self, response: requests.Response) -> bool:
+        """
+        An empty page is always the last one. Unless `stop_on_short_page` is
+        switched off, so is a page with fewer records than were asked for,
+        which saves the extra request that would only come back empty.
+        """
+
+        size = self.page_info(response).size
+        if not size:
+            return True
+        if not self.config.get("stop_on_short_page", True):
+            return False
+        query_string = parse_qs(urlparse(response.request.url).query)
+        requested = query_string.get("per_page")
+        return bool(requested) and size < int(requested[0])
+
+    def calculate_sync_cost(
+        self,
+        request: requests.PreparedRequest,
+        response: requests.Response,
+        context: Optional[dict],
+    ) -> Dict[str, int]:
+        """
+        Every call counts against the rate limit, so that's the cost we track.
+        Responses served from the cache without a call are tallied separately.
+        """
+        if response_info(response).cached and response.status_code == 200:
+            return {"cache_hits": 1}
+        return {"requests": 1}
+
+    def update_sync_costs(
+        self,
+        request: requests.PreparedRequest,
+        response: requests.Response,
+        context: Optional[dict],
+    ) -> Dict[str, int]:
+        """Child streams fetch concurrently, so keep the tally under a lock"""
+        with self._sync_costs_lock:
+            return super().update_sync_costs(request, response, context)
+
+    def response_json(self, response: requests.Response) -> Any:
+        """
+        The decoded response body, decoded once whoever asks for it first so
+        pagination and record parsing share a single decode. Uses orjson when
+        it is installed.
+        """
+
+        return decode_response(response)
+
+    def page_info(self, response: requests.Response) -> PageInfo:
+        """Size and last cursor of the page in `response`"""
+        return page_info(response)
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """
+        Yield the records in the (cached) decoded response body, or straight
+        off the socket when the response is streamed. A body holding a single
+        object, e.g. one activity, is a single record.
+        """
+
+        info = response_info(response)
+        if info.streamed and not info.is_decoded:
+            yield from stream_records(response, self.projection)
+            return
+
+        decoded = self.response_json(response)
+        if self.records_jsonpath == "$[*]" and isinstance(decoded, list):
+            # Every Strava list endpoint returns a bare array, skip jsonpath
+            records = iter(decoded)
+        elif self.records_jsonpath == "$[*]" and isinstance(decoded, dict):
+            records = iter([decoded])
+        else:
+            records = extract_jsonpath(self.records_jsonpath, input=decoded)
+        projection = self.projection
+        if projection is None:
+            yield from records
+            return
+        for record in records:
+            # Drop deselected subtrees before the record is held anywhere
+            yield projection.prune(record) if isinstance(record, dict) else record
+
     def get_url_params(
         self, context: Optional[dict], next_page_token: Optional[Any]
     ) -> Dict[str, Any]:
         """Return a dictionary of values to be used in URL parameterization."""
 
         params = {
-            "acccess_token": self.authenticator.access_token,
-            "per_page": self.config.get("results_per_page", 30),
+            "per_page": self.page_size,
             "page": next_page_token,
         }
 
@@ -76,26 +815,39 @@ class StravaStream(RESTStream):
 
         return params
 
-    def check_rate_limit(self, response: requests.Response) -> dict:
+    def check_rate_limit(self, response: requests.Response) -> Optional[dict]:
         """
-        Checks the rate limit and sleeps if we're over the limit
+        Reports the rate limit headers to the shared scheduler, which paces
+        further requests so we stay under the limit, and stops the sync once
+        Strava refuses a request for want of daily quota
         """
 
-        rate_limit = response.headers.get("x-ratelimit-limit", None)
-        rate_usage = response.headers.get("x-ratelimit-usage", None)
-        per_15_min_limit, daily_limit = rate_limit.strip().split(",")
-        per_15_min_usage, daily_usage = rate_usage.strip().split(",")
-        self.logger.info(
-            f"""You have used: {per_15_min_usage} of your {per_15_min_limit} 15 minute request allocation
-            You have used: {daily_usage} of your {daily_limit} daily request allocation"""
+        rate_limits = parse_rate_limit_headers(response.headers, self.logger)
+        if rate_limits is None:
+            self.logger.debug("No rate limit headers in response, skipping check")
+            return None
+
+        self.logger.debug(
+            f"""You have used: {rate_limits["short_usage"]} of your {rate_limits["short_limit"]} 15 minute request allocation
+            You have used: {rate_limits["daily_usage"]} of your {rate_limits["daily_limit"]} daily request allocation"""
+        )
+        self.telemetry.set_quota_remaining(
+            rate_limits["short_limit"] - rate_limits["short_usage"],
+            rate_limits["daily_limit"] - rate_limits["daily_usage"],
+        )
+
+        # Pacing happens in the shared scheduler so every worker backs off together
+        scheduler = self.rate_limit_scheduler
+        scheduler.update(
+            (rate_limits["short_limit"], rate_limits["daily_limit"]),
+            (rate_limits["short_usage"], rate_limits["daily_usage"]),
         )
 
-        if int(per_15_min_usage) >= int(per_15_min_limit):
-            self.logger.info("Rate limit exceeded, going to sleep for 15 minutes")
-            time.sleep(900)
+        if response.status_code == 429:
+            # Refused, a response that used the last request is still good
+            scheduler.check_daily_quota(response)
 
-        if int(daily_usage) >= int(daily_limit):
-            raise FatalAPIError("Daily rate limit exceeded... exiting", response)
+        return rate_limits
 
     def validate_response(self, response: requests.Response) -> None:
         """
@@ -121,4 +873,4 @@ class StravaStream(RESTStream):
         """
 
         self.logger.debug(f"Trying to convert {dt} to epoch time")
-        return date_parser.parse(dt).strftime("%s")
+        return epoch_seconds(dt)
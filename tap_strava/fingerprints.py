@@ -0,0 +1,82 @@
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class FingerprintStore:
+    """
+    Remembers, per child stream, how many records each activity had the last
+    time the stream was synced for it. Parent activities report their current
+    `kudos_count`/`comment_count`, so a child whose count hasn't moved since
+    the previous run can be skipped without a request.
+
+    The store is a small JSON file of `{stream: {activity_id: count}}` that is
+    rewritten atomically, and it is shared by every stream in the process.
+    """
+
+    _registry: Dict[str, "FingerprintStore"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None) -> None:
+        self.path = Path(path)
+        self.logger = logger or logging.getLogger(__name__)
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def for_path(
+        cls, path: str, logger: Optional[logging.Logger] = None
+    ) -> "FingerprintStore":
+        """Return the shared store for `path`, loading it on first use"""
+
+        with cls._registry_lock:
+            store = cls._registry.get(path)
+            if store is None:
+                store = cls(path, logger=logger)
+                cls._registry[path] = store
+        return store
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forget every shared store (mostly useful in tests)"""
+        with cls._registry_lock:
+            cls._registry.clear()
+
+    def get(self, stream_name: str, activity_id: int) -> Optional[int]:
+        """Count recorded for the activity when the stream last synced it"""
+        with self._lock:
+            return self._counts.get(stream_name, {}).get(str(activity_id))
+
+    def set(self, stream_name: str, activity_id: int, count: int) -> None:
+        """Record the count the stream was just synced at"""
+        with self._lock:
+            self._counts.setdefault(stream_name, {})[str(activity_id)] = count
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write the store back to disk if anything changed"""
+
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self._counts, separators=(",", ":"))
+            self._dirty = False
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(payload)
+            tmp_path.replace(self.path)
+        except OSError as ex:
+            self.logger.warning(f"Could not write fingerprint store: {ex}")
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            self._counts = json.loads(self.path.read_text())
+        except (OSError, ValueError) as ex:
+            self.logger.warning(f"Ignoring unreadable fingerprint store: {ex}")
@@ -0,0 +1,265 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from tap_strava.responses import response_info
+
+DEFAULT_CACHE_MAX_MB = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+
+
+class CachedResponse(NamedTuple):
+    """A response body stored in the cache, with what's needed to revalidate it"""
+
+    etag: Optional[str]
+    headers: Dict[str, str]
+    body: bytes
+    stored_at: float
+
+
+def cache_key(prepared_request: requests.PreparedRequest, account: str) -> str:
+    """
+    Identify a request by its method, path and query, leaving out the access
+    token (which changes with every refresh) but scoped to `account` so
+    different athletes never share entries
+    """
+
+    url = urlparse(prepared_request.url)
+    query = urlencode(
+        [
+            (name, value)
+            for name, value in parse_qsl(url.query, keep_blank_values=True)
+            if name != "access_token"
+        ]
+    )
+    return f"{account} {prepared_request.method} {url.path}?{query}"
+
+
+def response_from_cache(
+    entry: CachedResponse, prepared_request: requests.PreparedRequest
+) -> requests.Response:
+    """A response standing in for the one the entry was stored from"""
+
+    response = requests.Response()
+    response.status_code = 200
+    response.headers = CaseInsensitiveDict(entry.headers)
+    response._content = entry.body
+    response.url = prepared_request.url or ""
+    response.request = prepared_request
+    response_info(response).cached = True
+    return response
+
+
+class ResponseCache:
+    """
+    Persistent cache of successful Strava responses in a sqlite file.
+
+    Entries are keyed by the request (without its access token) and kept with
+    their ETag, so a stale entry can be revalidated with `If-None-Match` and a
+    304 reused instead of downloading the page again. The file is capped at
+    `max_bytes`, evicting the least recently used entries first. Hits, misses
+    and revalidations are counted for the logs.
+    """
+
+    _registry: Dict[str, "ResponseCache"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024,
+        logger: Optional[logging.Logger] = None,
+        clock=time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.logger = logger or logging.getLogger(__name__)
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(_SCHEMA)
+
+    @classmethod
+    def for_config(
+        cls, config: dict, logger: Optional[logging.Logger] = None
+    ) -> Optional["ResponseCache"]:
+        """
+        Return the shared cache at `http_cache_path`, opening it on first use,
+        or None when caching isn't configured
+        """
+
+        path = config.get("http_cache_path")
+        if not path:
+            return None
+        max_mb = config.get("http_cache_max_mb", DEFAULT_CACHE_MAX_MB)
+        with cls._registry_lock:
+            cache = cls._registry.get(path)
+            if cache is None:
+                cache = cls(path, max_bytes=int(max_mb * 1024 * 1024), logger=logger)
+                cls._registry[path] = cache
+        return cache
+
+    @classmethod
+    def reset(cls) -> None:
+        """Close and forget every shared cache (mostly useful in tests)"""
+        with cls._registry_lock:
+            for cache in cls._registry.values():
+                cache.close()
+            cls._registry.clear()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Look up an entry, marking it as recently used"""
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT etag, headers, body, stored_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (self.clock(), key),
+            )
+        etag, headers, body, stored_at = row
+        return CachedResponse(etag, json.loads(headers), bytes(body), stored_at)
+
+    def put(
+        self, key: str, etag: Optional[str], headers: Dict[str, str], body: bytes
+    ) -> None:
+        """Store a fresh response, evicting old entries if the cache is full"""
+
+        if len(body) > self.max_bytes:
+            return
+        now = self.clock()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, json.dumps(headers), body, len(body), now, now),
+            )
+            self._evict()
+
+    def lookup(
+        self, key: str, prepared_request: requests.PreparedRequest
+    ) -> Optional[CachedResponse]:
+        """
+        Look the request up, asking Strava to confirm a stored entry with its
+        ETag instead of sending the page again
+        """
+
+        entry = self.get(key)
+        if entry is not None and entry.etag:
+            prepared_request.headers["If-None-Match"] = entry.etag
+        return entry
+
+    def is_fresh(self, entry: CachedResponse, ttl: Optional[int]) -> bool:
+        """Whether an entry is young enough to reuse without revalidating"""
+        if not ttl:
+            return False
+        return self.clock() - entry.stored_at < ttl
+
+    def update(
+        self,
+        key: str,
+        prepared_request: requests.PreparedRequest,
+        response: requests.Response,
+        entry: Optional[CachedResponse],
+    ) -> requests.Response:
+        """
+        Store a fresh page, or swap a 304 for the entry it confirmed. The 304's
+        own headers are kept, since they carry the current rate limit usage.
+        """
+
+        if response.status_code == 304 and entry is not None:
+            self.record("revalidated")
+            self.touch(key)
+            cached = response_from_cache(entry, prepared_request)
+            cached.headers.update(response.headers)
+            cached.elapsed = response.elapsed
+            return cached
+        if response.status_code == 200:
+            self.record("misses")
+            stored_headers = {
+                name: response.headers[name]
+                for name in ("content-type", "etag")
+                if name in response.headers
+            }
+            self.put(
+                key, response.headers.get("etag"), stored_headers, response.content
+            )
+        return response
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as just revalidated, restarting its time to live"""
+
+        now = self.clock()
+        with self._lock:
+            self._connection.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, key),
+            )
+
+    def _evict(self) -> None:
+        (total,) = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        rows = self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self.logger.debug(f"Evicted {evicted} responses from the http cache")
+
+    def record(self, outcome: str) -> None:
+        """Count a lookup as one of `hits`, `misses` or `revalidated`"""
+
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    @property
+    def stats(self) -> Tuple[int, int, int]:
+        """Hits, misses and revalidations so far"""
+        return self.hits, self.misses, self.revalidated
+
+    def log_stats(self) -> None:
+        hits, misses, revalidated = self.stats
+        self.logger.info(
+            f"HTTP cache: {hits} hits, {revalidated} revalidated, {misses} misses"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
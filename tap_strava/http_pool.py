@@ -0,0 +1,102 @@
+import logging
+import threading
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# requests' own default, enough for a sync without any concurrency
+DEFAULT_POOL_SIZE = 10
+
+
+def pool_size_for(config: Mapping[str, Any]) -> int:
+    """
+    Connections kept open per host: `http_pool_size` when set, otherwise
+    enough for every thread that can have a request in flight at once
+    """
+
+    if config.get("http_pool_size"):
+        return int(config["http_pool_size"])
+    workers = int(config.get("child_stream_workers", 1))
+    partitions = int(config.get("backfill_workers", 1))
+    if config.get("athletes"):
+        partitions *= int(config.get("athlete_workers", 1))
+    # Each partition thread fetches pages while the workers fetch its children
+    return max(DEFAULT_POOL_SIZE, workers + partitions + 1)
+
+
+class HttpPool:
+    """
+    The `requests` session, and so the keep-alive connection pool, shared by
+    every stream, worker thread and token refresh of a run. Without it every
+    stream would open its own connections to Strava and pay for a TLS
+    handshake on each of them.
+
+    Threads that find every pooled connection busy still get a connection of
+    their own instead of waiting, it is simply closed after use rather than
+    kept. `stats` reports how often connections were reused.
+    """
+
+    _registry: Dict[int, "HttpPool"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.pool_size = pool_size
+        self.logger = logger or logging.getLogger(__name__)
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    @classmethod
+    def for_config(
+        cls, config: Mapping[str, Any], logger: Optional[logging.Logger] = None
+    ) -> "HttpPool":
+        """
+        Return the shared pool for the configured size, creating it on first
+        use
+        """
+
+        pool_size = pool_size_for(config)
+        with cls._registry_lock:
+            pool = cls._registry.get(pool_size)
+            if pool is None:
+                pool = cls(pool_size=pool_size, logger=logger)
+                cls._registry[pool_size] = pool
+        return pool
+
+    @classmethod
+    def reset(cls) -> None:
+        """Close and forget every pool (mostly useful in tests)"""
+        with cls._registry_lock:
+            for pool in cls._registry.values():
+                pool.close()
+            cls._registry.clear()
+
+    @property
+    def stats(self) -> Tuple[int, int]:
+        """Requests sent and connections opened, across every host"""
+
+        pools = self.adapter.poolmanager.pools
+        requests_sent = connections = 0
+        for key in list(pools.keys()):
+            host_pool = pools.get(key)
+            if host_pool is not None:
+                requests_sent += host_pool.num_requests
+                connections += host_pool.num_connections
+        return requests_sent, connections
+
+    def log_stats(self) -> None:
+        requests_sent, connections = self.stats
+        reused = max(requests_sent - connections, 0)
+        self.logger.info(
+            f"HTTP pool: {requests_sent} requests over {connections} connections "
+            f"({reused} reused), pool size {self.pool_size}"
+        )
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,110 @@
+import json
+import sys
+import threading
+from typing import Any, Mapping, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - only without orjson installed
+    orjson = None
+
+DEFAULT_BUFFER_KB = 1024
+
+
+def dumps_message(message: Mapping[str, Any]) -> bytes:
+    """
+    Serialize a message dict to a JSON line. Non JSON values are written as
+    `str()` would, exactly like the SDK, so the output reads the same whether
+    or not orjson is installed.
+    """
+
+    if orjson is not None:
+        return orjson.dumps(
+            message,
+            default=str,
+            option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    return (json.dumps(message, default=str, separators=(",", ":")) + "\n").encode()
+
+
+class BufferedMessageWriter:
+    """
+    Writes Singer messages to stdout through one preallocated buffer.
+
+    Messages are serialized with orjson when it is installed and copied into
+    the buffer, which goes out in a single write whenever it fills up and
+    whenever `flush` is called. Streams flush right after every STATE message,
+    so a target never sees a checkpoint before the records it covers, and
+    nothing sits in the buffer past a checkpoint.
+    """
+
+    _instance: Optional["BufferedMessageWriter"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_KB * 1024) -> None:
+        self.buffer_size = buffer_size
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._position = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_config(cls, config: Mapping[str, Any]) -> "BufferedMessageWriter":
+        """
+        Return the process wide writer, creating it on first use. There is
+        only one stdout, so every stream must share the same buffer.
+        """
+
+        with cls._instance_lock:
+            if cls._instance is None:
+                kilobytes = int(config.get("output_buffer_kb") or DEFAULT_BUFFER_KB)
+                cls._instance = cls(buffer_size=kilobytes * 1024)
+            return cls._instance
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forget the writer, without flushing it (mostly useful in tests)"""
+        with cls._instance_lock:
+            cls._instance = None
+
+    @classmethod
+    def flush_shared(cls) -> None:
+        """Flush the process wide writer, if one was created"""
+        with cls._instance_lock:
+            writer = cls._instance
+        if writer is not None:
+            writer.flush()
+
+    def write(self, message: Mapping[str, Any]) -> None:
+        line = dumps_message(message)
+        size = len(line)
+        with self._lock:
+            if self._position + size > self.buffer_size:
+                self._flush()
+            if size > self.buffer_size:
+                # Larger than the whole buffer, no point copying it in
+                self._write(line)
+                return
+            self._view[self._position : self._position + size] = line
+            self._position += size
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._position:
+            self._write(self._view[: self._position])
+            self._position = 0
+
+    @staticmethod
+    def _write(data: Any) -> None:
+        # Resolved on every write, stdout may have been swapped (e.g. by tests)
+        stdout = sys.stdout
+        stdout.flush()
+        binary = getattr(stdout, "buffer", None)
+        if binary is None:
+            stdout.write(bytes(data).decode())
+        else:
+            binary.write(data)
+            binary.flush()
@@ -0,0 +1,139 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# numpy, imported by `_import_numpy` the first time a polyline is decoded
+np: Any = None
+
+# What `decode_polylines` adds to activities: the decoded coordinates and their
+# bounding box, or only the bounding box
+POLYLINE_OUTPUTS = ("coordinates", "bounds")
+
+# Google's encoded polyline format stores coordinates to 5 decimal places
+PRECISION = 5
+
+
+def decode_polylines(
+    encoded: Sequence[Optional[str]], precision: int = PRECISION
+) -> List[Optional[Tuple[Any, Any]]]:
+    """
+    Decode a batch of encoded polylines into (latitudes, longitudes) arrays.
+
+    Every polyline in the batch is decoded in a handful of NumPy operations
+    over all of their characters at once. Empty or missing polylines give
+    empty arrays, malformed ones give None.
+    """
+
+    _import_numpy()
+    decoded: List[Optional[Tuple[Any, Any]]] = [None] * len(encoded)
+    empty = np.empty(0, dtype=np.float64)
+    present = []
+    for index, polyline in enumerate(encoded):
+        if not polyline:
+            decoded[index] = (empty, empty)
+        elif polyline.isascii():
+            present.append(index)
+    if not present:
+        return decoded
+
+    lengths = np.fromiter((len(encoded[i]) for i in present), dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    text = "".join(encoded[i] for i in present).encode("ascii")  # type: ignore
+    values = np.frombuffer(text, dtype=np.uint8).astype(np.int64) - 63
+
+    # Every character must be in '?'..'~' and the last one must end a value
+    bad = (values < 0) | (values > 63)
+    valid_mask = (np.add.reduceat(bad, offsets[:-1]) == 0) & (
+        values[offsets[1:] - 1] & 0x20 == 0
+    )
+    if not valid_mask.all():
+        values = values[np.repeat(valid_mask, lengths)]
+        lengths = lengths[valid_mask]
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+    valid = [index for index, ok in zip(present, valid_mask) if ok]
+    if not valid:
+        return decoded
+
+    # A value is a run of 5 bit chunks, least significant first, ending at the
+    # first character without the continuation bit
+    ends = np.flatnonzero((values & 0x20) == 0)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    value_ids = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = 5 * (np.arange(len(values)) - starts[value_ids])
+    numbers = np.add.reduceat((values & 0x1F) << shifts, starts)
+    # Zigzag encoded signs
+    deltas = np.where(numbers & 1, ~(numbers >> 1), numbers >> 1)
+
+    # Values alternate latitude and longitude deltas within each polyline,
+    # whose coordinates are the running sums of the deltas on each axis
+    value_offsets = np.searchsorted(ends, offsets)
+    counts = np.diff(value_offsets)
+    polyline_ids = np.repeat(np.arange(len(valid)), counts)
+    is_latitude = (np.arange(len(ends)) - value_offsets[polyline_ids]) % 2 == 0
+    scale = 10.0**precision
+    latitudes = _split_running_sums(deltas[is_latitude], (counts + 1) // 2, scale)
+    longitudes = _split_running_sums(deltas[~is_latitude], counts // 2, scale)
+    for position, index in enumerate(valid):
+        # An odd number of values leaves a latitude without its longitude
+        if not counts[position] % 2:
+            decoded[index] = (latitudes[position], longitudes[position])
+    return decoded
+
+
+def _import_numpy() -> None:
+    global np
+    if np is not None:
+        return
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - only without numpy installed
+        raise RuntimeError(
+            "decode_polylines needs numpy, install it with `pip install numpy`"
+        ) from None
+    np = numpy
+
+
+def _split_running_sums(deltas: Any, counts: Any, scale: float) -> List[Any]:
+    """Running sums of `deltas` restarting at every group of `counts` values"""
+
+    totals = np.cumsum(deltas)
+    group_ends = np.cumsum(counts)
+    # Total of every earlier group, to subtract from each group's values
+    before = np.concatenate(([0], totals))[group_ends - counts]
+    return np.split((totals - np.repeat(before, counts)) / scale, group_ends[:-1])
+
+
+def polyline_fields(latitudes: Any, longitudes: Any, output: str) -> Dict[str, Any]:
+    """The record fields for one decoded polyline"""
+
+    if len(latitudes):
+        bounds: Optional[dict] = {
+            "min_latitude": float(latitudes.min()),
+            "min_longitude": float(longitudes.min()),
+            "max_latitude": float(latitudes.max()),
+            "max_longitude": float(longitudes.max()),
+        }
+    else:
+        bounds = None
+    fields: Dict[str, Any] = {"summary_polyline_bounds": bounds}
+    if output == "coordinates":
+        fields["summary_polyline_latitudes"] = latitudes.tolist()
+        fields["summary_polyline_longitudes"] = longitudes.tolist()
+    return fields
+
+
+def add_polyline_fields(records: List[dict], output: str) -> None:
+    """
+    Decode the `map.summary_polyline` of a page of activities in one batch
+    and add the coordinates and/or bounding box to each record in place
+    """
+
+    encoded = []
+    for record in records:
+        activity_map = record.get("map")
+        encoded.append(
+            activity_map.get("summary_polyline")
+            if isinstance(activity_map, dict)
+            else None
+        )
+    for record, coordinates in zip(records, decode_polylines(encoded)):
+        if coordinates is not None:
+            record.update(polyline_fields(*coordinates, output))
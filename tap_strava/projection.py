@@ -0,0 +1,106 @@
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, Optional, Tuple
+
+from singer_sdk._singerlib import SelectionMask
+
+# A property path from the record root, e.g. ("map", "summary_polyline")
+Path = Tuple[str, ...]
+
+# An event as produced by `ijson.parse`
+Event = Tuple[str, str, Any]
+
+
+class Projection:
+    """
+    The subtrees of a record that the catalog deselects, so they can be
+    dropped as a page is parsed instead of after every record has been built.
+
+    Like the SDK, only properties reached through nested objects are
+    projected: whatever sits inside an array is always kept whole.
+    """
+
+    def __init__(self, paths: Iterable[Path]) -> None:
+        # A path under another deselected path is dropped along with it
+        ordered = sorted(set(paths), key=len)
+        minimal: list = []
+        for path in ordered:
+            if not any(path[: len(parent)] == parent for parent in minimal):
+                minimal.append(path)
+        self.paths: Tuple[Path, ...] = tuple(minimal)
+        # The same paths as ijson prefixes of the records in a page
+        self._prefixes: FrozenSet[str] = frozenset(
+            ".".join(("item",) + path) for path in self.paths
+        )
+
+    @classmethod
+    def from_mask(
+        cls, mask: SelectionMask, keep: Iterable[str] = ()
+    ) -> Optional["Projection"]:
+        """
+        Projection dropping every property deselected in `mask`, except those
+        along the dotted paths in `keep` (e.g. "map.summary_polyline"). None
+        when nothing is deselected.
+        """
+
+        kept = [tuple(path.split(".")) for path in keep]
+        paths = []
+        for breadcrumb, selected in mask.items():
+            if selected or len(breadcrumb) < 2 or len(breadcrumb) % 2:
+                continue
+            if any(crumb != "properties" for crumb in breadcrumb[::2]):
+                continue
+            path = tuple(breadcrumb[1::2])
+            if any(kept_path[: len(path)] == path for kept_path in kept):
+                continue
+            paths.append(path)
+        if not paths:
+            return None
+        return cls(paths)
+
+    def prune(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop the deselected subtrees of an already decoded record in place"""
+
+        for path in self.paths:
+            node: Any = record
+            for key in path[:-1]:
+                node = node.get(key)
+                if not isinstance(node, dict):
+                    break
+            else:
+                node.pop(path[-1], None)
+        return record
+
+    def filter_events(self, events: Iterable[Event]) -> Iterator[Event]:
+        """
+        Pass on the `ijson.parse` events of a page of records, minus those of
+        deselected subtrees. Feeding the result to `ijson.items` means those
+        subtrees are never built at all.
+        """
+
+        prefixes = self._prefixes
+        # Arrays open inside the current record, beyond the page array itself
+        arrays = -1
+        # Depth inside a value being skipped, and whether one is up next
+        skipping = 0
+        skip_next = False
+        for event in events:
+            prefix, kind, value = event
+            if skipping:
+                if kind == "start_map" or kind == "start_array":
+                    skipping += 1
+                elif kind == "end_map" or kind == "end_array":
+                    skipping -= 1
+                continue
+            if skip_next:
+                skip_next = False
+                if kind == "start_map" or kind == "start_array":
+                    skipping = 1
+                continue
+            if kind == "map_key":
+                if not arrays and f"{prefix}.{value}" in prefixes:
+                    skip_next = True
+                    continue
+            elif kind == "start_array":
+                arrays += 1
+            elif kind == "end_array":
+                arrays -= 1
+            yield event
@@ -0,0 +1,365 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+import requests
+from singer_sdk.exceptions import FatalAPIError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - only on Windows
+    fcntl = None  # type: ignore[assignment]
+
+# Strava resets the short term limit at every quarter hour (:00, :15, :30, :45)
+# and the daily limit at midnight UTC
+SHORT_WINDOW_SECONDS = 900
+DAILY_WINDOW_SECONDS = 86400
+
+# Share of the short term limit that can be used at full speed before the
+# scheduler starts spreading the remaining requests across the window
+DEFAULT_PACING_THRESHOLD = 0.5
+
+# Strava reports overall usage and, for apps with read limits, read usage
+RATE_LIMIT_HEADER_PREFIXES = ("x-ratelimit", "x-readratelimit")
+
+
+class DailyQuotaExhausted(FatalAPIError):
+    """
+    Strava's daily allocation is used up. Nothing more can be fetched until it
+    resets, so the tap stops cleanly, leaving a checkpoint to resume from.
+    """
+
+
+def parse_rate_limit_headers(
+    headers: Mapping[str, str], logger: Optional[logging.Logger] = None
+) -> Optional[Dict[str, int]]:
+    """
+    Read the limit/usage header pairs Strava sends. Apps with read limits get
+    a second `x-readratelimit-*` pair, in which case whichever pair has less
+    headroom wins for each window.
+    """
+
+    logger = logger or logging.getLogger(__name__)
+    parsed: Dict[str, int] = {}
+    for prefix in RATE_LIMIT_HEADER_PREFIXES:
+        rate_limit = headers.get(f"{prefix}-limit")
+        rate_usage = headers.get(f"{prefix}-usage")
+        if not rate_limit or not rate_usage:
+            continue
+        try:
+            short_limit, daily_limit = (int(v) for v in rate_limit.split(","))
+            short_usage, daily_usage = (int(v) for v in rate_usage.split(","))
+        except ValueError:
+            logger.warning(
+                f"Ignoring malformed {prefix} headers: '{rate_limit}' '{rate_usage}'"
+            )
+            continue
+        for window, limit, usage in (
+            ("short", short_limit, short_usage),
+            ("daily", daily_limit, daily_usage),
+        ):
+            headroom = parsed.get(f"{window}_limit", 0) - parsed.get(
+                f"{window}_usage", 0
+            )
+            if f"{window}_limit" not in parsed or limit - usage < headroom:
+                parsed[f"{window}_limit"] = limit
+                parsed[f"{window}_usage"] = usage
+
+    return parsed or None
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class RateLimitCoordinator:
+    """
+    Scheduler state shared by every tap process on the host through a small
+    JSON file. Processes take an exclusive `flock` on the file around every
+    scheduler decision, so they see each other's usage reports, requests in
+    flight and paced slots, and pace themselves as one.
+
+    The file holds one entry per client id. Requests in flight are tracked
+    per process id, and those of processes that died are dropped.
+    """
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None) -> None:
+        if fcntl is None:
+            raise RuntimeError(
+                "rate_limit_coordinator_path needs file locking, which is only "
+                "available on POSIX systems"
+            )
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+
+    @contextmanager
+    def locked(self, key: str) -> Iterator[Dict[str, Any]]:
+        """
+        Hold the lock and yield the state for `key`. Changes made to it are
+        written back when the block exits.
+        """
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), "r+") as shared_file:
+                content = shared_file.read()
+                try:
+                    everything = json.loads(content) if content else {}
+                except ValueError:
+                    self.logger.warning("Resetting unreadable rate limit state")
+                    everything = {}
+                state = everything.setdefault(key, {})
+                yield state
+                # Rewrite in place, replacing the file would orphan the lock
+                shared_file.seek(0)
+                shared_file.truncate()
+                shared_file.write(json.dumps(everything))
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+class RateLimitScheduler:
+    """
+    Paces Strava requests for every stream and worker thread that use the same
+    application. Strava applies its limits per client id, so all the requests
+    a process sends for that client draw from one scheduler.
+
+    The scheduler follows the usage reported in the `x-ratelimit-*` headers
+    and knows when Strava's quarter hour and daily windows roll over. Requests
+    go out immediately while there is plenty of headroom. Past the pacing
+    threshold the remaining requests are spread evenly until the end of the
+    window, and once the window is used up callers wait for the next boundary
+    rather than a fixed 15 minutes.
+
+    Callers `acquire` a slot before sending a request and `release` it once
+    the response is back. Requests that are in flight count against the budget
+    so concurrent workers can't collectively overshoot the limit reported in the
+    last response.
+
+    With a `coordinator` the scheduler state lives in a file shared by every
+    tap process on the host, so separate processes using the same application
+    stay under the limit together too.
+    """
+
+    _registry: Dict[Optional[str], "RateLimitScheduler"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        pacing_threshold: float = DEFAULT_PACING_THRESHOLD,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+        coordinator: Optional[RateLimitCoordinator] = None,
+        key: str = "",
+    ) -> None:
+        self.logger = logger or logging.getLogger(__name__)
+        self.pacing_threshold = pacing_threshold
+        self.clock = clock
+        self.sleep = sleep
+        self.short_limit: Optional[int] = None
+        self.daily_limit: Optional[int] = None
+        self._short_usage = 0
+        self._daily_usage = 0
+        self._updated_at = 0.0
+        self._in_flight = 0
+        self._other_in_flight = 0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+        self.coordinator = coordinator
+        self.key = key
+
+    @classmethod
+    def for_config(
+        cls, config: Mapping[str, Any], logger: Optional[logging.Logger] = None
+    ) -> "RateLimitScheduler":
+        """
+        Return the shared scheduler for the application in `config`, creating
+        it on first use
+        """
+
+        key = config.get("client_id")
+        with cls._registry_lock:
+            scheduler = cls._registry.get(key)
+            if scheduler is None:
+                coordinator_path = config.get("rate_limit_coordinator_path")
+                scheduler = cls(
+                    logger=logger,
+                    pacing_threshold=config.get(
+                        "rate_limit_pacing_threshold", DEFAULT_PACING_THRESHOLD
+                    ),
+                    coordinator=RateLimitCoordinator(coordinator_path, logger=logger)
+                    if coordinator_path
+                    else None,
+                    key=str(key),
+                )
+                cls._registry[key] = scheduler
+        return scheduler
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forget every shared scheduler (mostly useful in tests)"""
+        with cls._registry_lock:
+            cls._registry.clear()
+
+    @staticmethod
+    def next_boundary(now: float, window: int) -> float:
+        """Epoch time at which the window containing `now` rolls over"""
+        return (now // window + 1) * window
+
+    @property
+    def short_usage(self) -> int:
+        """Short term usage, zeroed once the window it was reported in is over"""
+        if self._updated_at and self.clock() >= self.next_boundary(
+            self._updated_at, SHORT_WINDOW_SECONDS
+        ):
+            return 0
+        return self._short_usage
+
+    @property
+    def daily_usage(self) -> int:
+        """Daily usage, zeroed once the UTC day it was reported in is over"""
+        if self._updated_at and self.clock() >= self.next_boundary(
+            self._updated_at, DAILY_WINDOW_SECONDS
+        ):
+            return 0
+        return self._daily_usage
+
+    @contextmanager
+    def _state(self) -> Iterator[None]:
+        """
+        Hold the scheduler state for a decision, synced with the other
+        processes through the coordinator when there is one
+        """
+
+        with self._lock:
+            if self.coordinator is None:
+                yield
+                return
+            with self.coordinator.locked(self.key) as shared:
+                self._load(shared)
+                yield
+                self._dump(shared)
+
+    def _load(self, shared: Dict[str, Any]) -> None:
+        self.short_limit = shared.get("short_limit", self.short_limit)
+        self.daily_limit = shared.get("daily_limit", self.daily_limit)
+        self._short_usage = shared.get("short_usage", self._short_usage)
+        self._daily_usage = shared.get("daily_usage", self._daily_usage)
+        self._updated_at = shared.get("updated_at", self._updated_at)
+        self._next_slot = shared.get("next_slot", self._next_slot)
+        me = str(os.getpid())
+        self._other_in_flight = sum(
+            count
+            for pid, count in shared.get("in_flight", {}).items()
+            if pid != me and _process_alive(int(pid))
+        )
+
+    def _dump(self, shared: Dict[str, Any]) -> None:
+        shared.update(
+            short_limit=self.short_limit,
+            daily_limit=self.daily_limit,
+            short_usage=self._short_usage,
+            daily_usage=self._daily_usage,
+            updated_at=self._updated_at,
+            next_slot=self._next_slot,
+        )
+        in_flight = {
+            pid: count
+            for pid, count in shared.get("in_flight", {}).items()
+            if count and _process_alive(int(pid))
+        }
+        in_flight[str(os.getpid())] = self._in_flight
+        shared["in_flight"] = in_flight
+
+    def reserve(self) -> float:
+        """
+        Reserve a slot for one request and return how many seconds the caller
+        should wait before sending it
+        """
+
+        with self._state():
+            now = self.clock()
+            slot = max(now, self._next_slot)
+            if self.short_limit is not None:
+                in_flight = self._in_flight + self._other_in_flight
+                remaining = self.short_limit - self.short_usage - in_flight
+                boundary = self.next_boundary(now, SHORT_WINDOW_SECONDS)
+                if remaining <= 0:
+                    # Nothing left in this window: queue up behind the
+                    # rollover, spread at the pace the next window allows
+                    if self._next_slot < boundary:
+                        slot = max(slot, boundary)
+                    else:
+                        interval = SHORT_WINDOW_SECONDS / max(self.short_limit, 1)
+                        slot = self._next_slot + interval
+                elif self.short_usage >= self.short_limit * self.pacing_threshold:
+                    paced = self._next_slot + (boundary - now) / remaining
+                    slot = max(slot, min(paced, boundary))
+            self._next_slot = slot
+            self._in_flight += 1
+            return slot - now
+
+    def acquire(self) -> None:
+        """
+        Block until this request's slot comes up
+        """
+
+        wait = self.reserve()
+        if wait > 1:
+            self.logger.info(
+                f"Pacing requests to stay under the rate limit, waiting {wait:.1f} seconds"
+            )
+        if wait > 0:
+            self.sleep(wait)
+
+    def release(self) -> None:
+        """Give back the slot reserved by `acquire` once the response is in"""
+        with self._state():
+            self._in_flight = max(self._in_flight - 1, 0)
+
+    def update(self, limits: Tuple, usage: Tuple) -> None:
+        """
+        Record the (short term, daily) limits and usage reported by Strava in
+        the latest response. Responses can come back out of order, so usage
+        only ever grows within a window.
+        """
+
+        with self._state():
+            short_usage, daily_usage = (int(value) for value in usage)
+            self.short_limit, self.daily_limit = (int(value) for value in limits)
+            self._short_usage = max(short_usage, self.short_usage)
+            self._daily_usage = max(daily_usage, self.daily_usage)
+            self._updated_at = self.clock()
+
+    def daily_exhausted(self) -> bool:
+        """True once the daily allocation reported by Strava is used up"""
+        with self._state():
+            return self.daily_limit is not None and self.daily_usage >= self.daily_limit
+
+    def check_daily_quota(self, response: Optional[requests.Response] = None) -> None:
+        """Stop before spending a request once the daily allocation is used up"""
+
+        if self.daily_exhausted():
+            hours_left = self.seconds_until_daily_reset() / 3600
+            raise DailyQuotaExhausted(
+                f"Daily rate limit exceeded, it resets in {hours_left:.1f} hours",
+                response,
+            )
+
+    def seconds_until_daily_reset(self) -> float:
+        """Seconds until Strava resets the daily allocation at midnight UTC"""
+        now = self.clock()
+        return self.next_boundary(now, DAILY_WINDOW_SECONDS) - now
@@ -0,0 +1,138 @@
+import itertools
+import json
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Iterator, NamedTuple, Optional
+
+import requests
+
+from tap_strava.projection import Projection
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - only without orjson installed
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - only without ijson installed
+    ijson = None
+
+
+def json_loads(content: bytes) -> Any:
+    """Decode a JSON body, with orjson when it is available"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class PageInfo(NamedTuple):
+    """
+    What pagination needs to know about a page, captured when the body is
+    decoded and before the SDK gets a chance to mutate any of its records
+    """
+
+    size: int
+    last_cursor: Optional[str]
+
+
+@dataclass
+class ResponseInfo:
+    """
+    What the tap knows about one response beyond what `requests` does: how
+    it was fetched and, once read, its decoded body and page summary
+    """
+
+    #: The body is still on the socket, to be parsed as it is read
+    streamed: bool = False
+    #: Served from the response cache rather than by Strava
+    cached: bool = False
+    decoded: Any = None
+    is_decoded: bool = False
+    page: Optional[PageInfo] = None
+
+
+# Kept beside the responses rather than on them, and gone along with them
+_infos: "weakref.WeakKeyDictionary[requests.Response, ResponseInfo]" = (
+    weakref.WeakKeyDictionary()
+)
+_infos_lock = threading.Lock()
+
+
+def response_info(response: requests.Response) -> ResponseInfo:
+    """The tap's record of `response`, empty until something is noted in it"""
+
+    with _infos_lock:
+        info = _infos.get(response)
+        if info is None:
+            info = _infos[response] = ResponseInfo()
+        return info
+
+
+def decode_response(response: requests.Response) -> Any:
+    """
+    Decode the response body once, so pagination and record parsing share a
+    single decode, and summarize the page on the way
+    """
+
+    info = response_info(response)
+    if not info.is_decoded:
+        info.decoded = json_loads(response.content)
+        info.page = summarize_page(info.decoded)
+        info.is_decoded = True
+    return info.decoded
+
+
+def page_info(response: requests.Response) -> PageInfo:
+    """Size and last cursor of the page in `response`"""
+
+    info = response_info(response)
+    if info.page is None:
+        decode_response(response)
+    assert info.page is not None
+    return info.page
+
+
+def summarize_page(decoded: Any) -> PageInfo:
+    if not isinstance(decoded, list):
+        return PageInfo(size=int(bool(decoded)), last_cursor=None)
+    last_cursor = None
+    if decoded and isinstance(decoded[-1], dict):
+        last_cursor = decoded[-1].get("cursor")
+    return PageInfo(size=len(decoded), last_cursor=last_cursor)
+
+
+def stream_records(
+    response: requests.Response, projection: Optional[Projection]
+) -> Iterator[Any]:
+    """
+    Yield records one by one as they are parsed from the response body, so
+    only a single record of the page is ever held in memory. The page size
+    and last cursor are tallied on the way for pagination. Subtrees the
+    catalog deselects are skipped by the parser and never built.
+    """
+
+    size = 0
+    last_cursor = None
+    response.raw.decode_content = True
+    events = ijson.parse(response.raw, use_float=True)
+    try:
+        first = next(events, None)
+        if first is not None and first[1] == "start_map":
+            # A single object is one record, nothing to gain from streaming
+            for record in ijson.items(itertools.chain([first], events), ""):
+                size += 1
+                yield record if projection is None else projection.prune(record)
+        elif first is not None:
+            events = itertools.chain([first], events)
+            if projection is not None:
+                events = projection.filter_events(events)
+            for record in ijson.items(events, "item"):
+                size += 1
+                if isinstance(record, dict):
+                    last_cursor = record.get("cursor")
+                yield record
+    finally:
+        response.close()
+    response_info(response).page = PageInfo(size=size, last_cursor=last_cursor)
@@ -0,0 +1,135 @@
+import os
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+from urllib.parse import unquote, urlparse
+
+# pyarrow, imported by `_import_pyarrow` the first time a file is written
+pa: Any = None
+pc: Any = None
+pq: Any = None
+
+#: Series the activity streams endpoint can return
+SERIES_TYPES = (
+    "time",
+    "distance",
+    "latlng",
+    "altitude",
+    "velocity_smooth",
+    "heartrate",
+    "cadence",
+    "watts",
+    "temp",
+    "moving",
+    "grade_smooth",
+)
+
+# Columns whose samples are whole numbers or flags, every other one is a float.
+# `latlng` is split into separate latitude and longitude columns
+INTEGER_COLUMNS = frozenset(("time", "heartrate", "cadence", "watts", "temp"))
+BOOLEAN_COLUMNS = frozenset(("moving",))
+
+# A missing sample, which a double array can hold where None can't
+MISSING = float("nan")
+
+Columns = Dict[str, array]
+
+
+def _column(samples: List[Any]) -> array:
+    try:
+        return array("d", samples)
+    except TypeError:
+        # A few samples are missing (e.g. watts when the power meter dropped)
+        return array("d", (MISSING if value is None else value for value in samples))
+
+
+def series_columns(body: Any) -> Columns:
+    """
+    Columns of samples from a streams response, as compact arrays of doubles
+    rather than lists of Python objects. Accepts the response keyed by type or
+    as a list of streams.
+    """
+
+    if isinstance(body, list):
+        body = {series.get("type"): series for series in body}
+    columns: Columns = {}
+    for series_type, series in body.items():
+        samples = series.get("data") or []
+        if series_type == "latlng":
+            columns["latitude"] = _column([point[0] for point in samples])
+            columns["longitude"] = _column([point[1] for point in samples])
+        else:
+            columns[series_type] = _column(samples)
+    return columns
+
+
+def column_values(name: str, column: array) -> List[Any]:
+    """A column as a JSON friendly list, with None for missing samples"""
+
+    values = column.tolist()
+    if name in INTEGER_COLUMNS:
+        return [None if value != value else int(value) for value in values]
+    if name in BOOLEAN_COLUMNS:
+        return [None if value != value else bool(value) for value in values]
+    if any(value != value for value in values):
+        return [None if value != value else value for value in values]
+    return values
+
+
+def _import_pyarrow() -> None:
+    global pa, pc, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:  # pragma: no cover - only without pyarrow installed
+        raise RuntimeError(
+            "activity_streams_output: parquet needs pyarrow, install it with "
+            "`pip install pyarrow`"
+        ) from None
+    pa, pc, pq = pyarrow, pyarrow.compute, pyarrow.parquet
+
+
+def series_batch_dir(config: Mapping[str, Any]) -> Optional[Path]:
+    """
+    The directory activity series Parquet files go to: the configured one,
+    or `activity_streams` under the batch storage root when that is a local
+    directory. None when neither is set.
+    """
+
+    if config.get("activity_streams_batch_dir"):
+        return Path(config["activity_streams_batch_dir"])
+    root = ((config.get("batch_config") or {}).get("storage") or {}).get("root")
+    if root:
+        url = urlparse(root)
+        if url.scheme in ("", "file"):
+            return Path(unquote(url.netloc + url.path)) / "activity_streams"
+    return None
+
+
+def write_parquet(columns: Mapping[str, array], path: Path) -> None:
+    """
+    Write the columns as a Parquet file with one row per sample. The arrays
+    are handed to Arrow without copying them into Python objects first.
+    """
+
+    _import_pyarrow()
+    arrow_columns = {}
+    for name, column in columns.items():
+        values = pa.Array.from_buffers(
+            pa.float64(), len(column), [None, pa.py_buffer(column)]
+        )
+        values = pc.if_else(pc.is_nan(values), pa.scalar(None, pa.float64()), values)
+        if name in INTEGER_COLUMNS:
+            values = values.cast(pa.int64())
+        elif name in BOOLEAN_COLUMNS:
+            values = values.cast(pa.bool_())
+        arrow_columns[name] = values
+
+    # Write then rename, a loader must never pick up a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    pq.write_table(pa.table(arrow_columns), tmp_path)
+    tmp_path.replace(path)
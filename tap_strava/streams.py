@@ -1,10 +1,93 @@
-from typing import Optional, Union, Dict, Any
+from typing import Deque, Generator, Iterable, List, Optional, Tuple, Union, Dict, Any
+from collections import deque
+from datetime import datetime, timezone
+from dateutil import parser as date_parser
+from dateutil.relativedelta import relativedelta
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+import re
+from urllib.parse import urljoin, urlparse
 import requests
-from tap_strava.client import StravaStream
+from singer_sdk import metrics
+from singer_sdk._singerlib import MetadataMapping, RecordMessage
+from tap_strava.client import StravaStream, epoch_seconds
+from tap_strava.polyline import add_polyline_fields
+from tap_strava.rate_limit import DailyQuotaExhausted
+from tap_strava.responses import json_loads
+from tap_strava.series import (
+    SERIES_TYPES,
+    column_values,
+    series_batch_dir,
+    series_columns,
+    write_parquet,
+)
+from tap_strava.webhooks import (
+    DELETED_AT,
+    ActivityChange,
+    activity_changes,
+    read_events,
+    tombstone,
+)
 
 SCHEMAS_DIR = Path(__file__).parent / Path("./schemas")
 
+# A single activity, as fetched for the push events naming it
+ACTIVITY_PATH = re.compile(r"/activities/\d+$")
+
+# Context state key of how far the webhook events file has been synced
+EVENTS_OFFSET = "webhook_events_offset"
+
+BACKFILL_SLICES = {
+    "week": relativedelta(weeks=1),
+    "month": relativedelta(months=1),
+    "year": relativedelta(years=1),
+}
+
+
+def backfill_slices(
+    start_date: str, end_date: Optional[str], slice_unit: str
+) -> List[dict]:
+    """
+    Split the sync range into consecutive calendar slices. Slices after the
+    first start on a week, month or year boundary. Without an end date the last
+    slice is left open ended so new activities still land in it.
+    """
+
+    start = date_parser.parse(start_date)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    end = date_parser.parse(end_date) if end_date else None
+    if end is not None and end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+
+    step = BACKFILL_SLICES[slice_unit]
+    midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    if slice_unit == "week":
+        boundary = midnight - relativedelta(days=midnight.weekday())
+    elif slice_unit == "month":
+        boundary = midnight.replace(day=1)
+    else:
+        boundary = midnight.replace(month=1, day=1)
+
+    slices = []
+    slice_start = start
+    now = datetime.now(timezone.utc)
+    while True:
+        boundary = boundary + step
+        if (end is not None and boundary >= end) or (end is None and boundary > now):
+            break
+        slices.append(
+            {"slice_start": slice_start.isoformat(), "slice_end": boundary.isoformat()}
+        )
+        slice_start = boundary
+    slices.append(
+        {
+            "slice_start": slice_start.isoformat(),
+            "slice_end": end.isoformat() if end is not None else None,
+        }
+    )
+    return slices
+
 
 class ActivitiesStream(StravaStream):
     name = "activities"
@@ -12,13 +95,631 @@ class ActivitiesStream(StravaStream):
     primary_keys = ["id"]
     replication_key = "start_date"
     schema_filepath = SCHEMAS_DIR / "activities.json"
+    _partition_executor: Optional[ThreadPoolExecutor] = None
+    _resume_points: Optional[Dict[Tuple, Optional[dict]]] = None
+    _progress: Optional[dict] = None
+    _event_changes: Optional[Dict[Tuple, List[ActivityChange]]] = None
+    _partitions: Optional[List[dict]] = None
+    _partitions_computed = False
+    _stopped_by_quota = False
+
+    @property
+    def required_properties(self) -> Tuple[str, ...]:  # type: ignore[override]
+        """
+        The counts feed the child contexts, and the polyline is decoded even
+        when only the derived fields are selected
+        """
+
+        required: Tuple[str, ...] = ("kudos_count", "comment_count")
+        if self.config.get("decode_polylines"):
+            required += ("map.summary_polyline",)
+        return required
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """
+        With `decode_polylines`, decode the polylines of the whole page in one
+        batch before its activities are yielded
+        """
+
+        output = self.config.get("decode_polylines")
+        if not output:
+            yield from super().parse_response(response)
+            return
+        page = list(super().parse_response(response))
+        add_polyline_fields(page, output)
+        yield from page
 
     def get_child_context(self, record: dict, context: Optional[dict]) -> dict:
         """
         This is how we pass activity_id to all relevant substreams that inherit
-        from the Activities Stream class
+        from the Activities Stream class. The kudos and comment counts ride
+        along so the substreams can skip activities with nothing new, and the
+        athlete so they authenticate as the activity's owner.
         """
-        return {"activity_id": record["id"]}
+        child_context = {
+            "activity_id": record["id"],
+            "kudos_count": record.get("kudos_count"),
+            "comment_count": record.get("comment_count"),
+        }
+        if record.get(DELETED_AT):
+            child_context["deleted"] = True
+        if context and "athlete" in context:
+            child_context["athlete"] = context["athlete"]
+        return child_context
+
+    def request_records(self, context: Optional[dict]) -> Iterable[dict]:
+        """
+        Request activity pages, optionally keeping `page_prefetch_window` pages
+        in flight at once.
+
+        Activity pages are plain page numbers, so the pages after the current
+        one are known before it comes back. Pages are still parsed and yielded
+        strictly in order, and once a short or empty page marks the end any
+        pages fetched beyond it are cancelled or discarded. Discarded pages
+        still count against the Strava quota, at most `page_prefetch_window - 1`
+        of them per sync.
+        """
+
+        if self.webhook_events_path:
+            yield from self._request_changed_activities(context)
+            return
+
+        window = int(self.config.get("page_prefetch_window", 1))
+        if window <= 1:
+            yield from super().request_records(context)
+            return
+
+        engine = self.async_engine
+        executor = None
+        if engine:
+            decorated_async_request = self.request_decorator(self._request_async)
+        else:
+            decorated_request = self.request_decorator(self._request)
+            executor = ThreadPoolExecutor(
+                max_workers=window, thread_name_prefix=f"{self.name}-pages"
+            )
+
+        def fetch(page: int) -> tuple:
+            prepared_request = self.prepare_request(context, next_page_token=page)
+            if engine:
+                future = engine.submit(
+                    decorated_async_request(prepared_request, context)
+                )
+            else:
+                assert executor is not None
+                future = executor.submit(decorated_request, prepared_request, context)
+            return prepared_request, future
+
+        pending: Deque[tuple] = deque()
+        next_page = 1
+        with metrics.http_request_counter(self.name, self.path) as request_counter:
+            request_counter.context = context
+            try:
+                for _ in range(window):
+                    pending.append(fetch(next_page))
+                    next_page += 1
+
+                while pending:
+                    prepared_request, future = pending.popleft()
+                    resp = future.result()
+                    request_counter.increment()
+                    self.update_sync_costs(prepared_request, resp, context)
+                    yield from self.parse_response(resp)
+                    if self.is_last_page(resp):
+                        break
+                    pending.append(fetch(next_page))
+                    next_page += 1
+            finally:
+                for _, future in pending:
+                    if not future.cancel():
+                        future.add_done_callback(self._discard_page)
+                if executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
+
+    def _request_changed_activities(self, context: Optional[dict]) -> Iterable[dict]:
+        """
+        Fetch each activity the push events name, a request apiece, and stand
+        a tombstone in for the deleted ones. An activity that is gone by the
+        time it is fetched is deleted too, its delete event just hasn't come
+        in yet.
+        """
+
+        changes = (self._event_changes or {}).get(self._prefetch_key(context or {}))
+        decorated_request = self.request_decorator(self._request)
+        with metrics.http_request_counter(self.name, self.path) as request_counter:
+            request_counter.context = context
+            for change in changes or []:
+                if change.deleted_at:
+                    yield tombstone(change)
+                    continue
+                prepared_request = self.prepare_request(
+                    {**(context or {}), "activity_id": change.activity_id}, None
+                )
+                resp = decorated_request(prepared_request, context)
+                request_counter.increment()
+                self.update_sync_costs(prepared_request, resp, context)
+                if resp.status_code == 404:
+                    deleted_at = datetime.now(timezone.utc).isoformat()
+                    yield tombstone(change._replace(deleted_at=deleted_at))
+                    continue
+                yield from self.parse_response(resp)
+
+    def get_url(self, context: Optional[dict]) -> str:
+        """A single activity when the context names one"""
+
+        if context and "activity_id" in context:
+            return urljoin(self.url_base, f"activities/{context['activity_id']}")
+        return super().get_url(context)
+
+    def validate_response(self, response: requests.Response) -> None:
+        """A single activity may have been deleted since its push event"""
+
+        if response.status_code == 404 and ACTIVITY_PATH.search(
+            urlparse(response.url).path
+        ):
+            self.check_rate_limit(response)
+            return
+        super().validate_response(response)
+
+    @staticmethod
+    def _discard_page(future: Future) -> None:
+        """Release the connection of a page fetched past the end"""
+        if not future.cancelled() and future.exception() is None:
+            future.result().close()
+
+    @property
+    def partitions(self) -> Optional[List[dict]]:
+        """
+        One partition per athlete when `athletes` is set, split further into
+        time slices of the sync range when `backfill_slice` is set. The SDK
+        keeps a separate bookmark for every partition, so each athlete has
+        their own state and an interrupted backfill only resumes the slices it
+        hadn't finished. Syncs driven by push events only split by athlete.
+
+        An open ended backfill's last slice ends at the current time, so the
+        list is worked out once and kept for the whole sync: the SDK loops
+        over the first list it gets, and a slice boundary passing mid-sync
+        must not change it under the prefetching.
+        """
+
+        if not self._partitions_computed:
+            self._partitions = self._compute_partitions()
+            self._partitions_computed = True
+        return self._partitions
+
+    def _compute_partitions(self) -> Optional[List[dict]]:
+        slices = None
+        slice_unit = self.config.get("backfill_slice")
+        start_date = self.config.get("start_date")
+        if slice_unit and self.webhook_events_path:
+            self.logger.warning("backfill_slice is ignored with webhook_events_path")
+        elif slice_unit and not start_date:
+            self.logger.warning("backfill_slice is ignored without a start_date")
+        elif slice_unit:
+            slices = backfill_slices(
+                start_date, self.config.get("end_date"), slice_unit
+            )
+
+        athletes = self.config.get("athletes")
+        if not athletes:
+            return slices
+        return [
+            {"athlete": athlete["name"], **slice_context}
+            for athlete in athletes
+            for slice_context in slices or [{}]
+        ]
+
+    def get_url_params(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Dict[str, Any]:
+        """
+        Bound each backfill slice by its own start and end, picking up after
+        the slice's bookmark if it was partially synced before
+        """
+
+        if context and "activity_id" in context:
+            return {}
+        params = super().get_url_params(context, next_page_token)
+        if not context or "slice_start" not in context:
+            return self._resume_params(params, context)
+
+        after = self._datetime_to_epoch_time(context["slice_start"])
+        start_value = self.get_starting_replication_key_value(context)
+        if start_value:
+            after = max(after, self._datetime_to_epoch_time(start_value))
+        params["after"] = after
+        params.pop("before", None)
+        if context["slice_end"]:
+            params["before"] = self._datetime_to_epoch_time(context["slice_end"])
+        return self._resume_params(params, context)
+
+    def _resume_params(
+        self, params: Dict[str, Any], context: Optional[dict]
+    ) -> Dict[str, Any]:
+        """Pick the listing up past the activities a stopped run synced"""
+
+        resume = self.resume_point(context)
+        for cursor in ("after", "before"):
+            if resume and resume.get(cursor):
+                params[cursor] = resume[cursor]
+        return params
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """
+        Yield activities for the context, keeping a checkpoint of how far they
+        got in the state, then persist the child fingerprints recorded while
+        they were synced and report the cache, connection pool and runtime
+        metrics
+        """
+
+        if self._stopped_by_quota:
+            # Out of daily quota, every partition left waits for the next run
+            return
+        try:
+            if not context:
+                records = self._get_records_with_children(context)
+            else:
+                records = self._get_partition_records(context)
+            if self.webhook_events_path:
+                records = self._event_checkpointed(records, context)
+            yield from self._checkpointed(records, context)
+        finally:
+            store = self.fingerprints
+            if store is not None:
+                store.save()
+            cache = self.http_cache
+            if cache is not None:
+                cache.log_stats()
+            if not self.async_engine:
+                self.http_pool.log_stats()
+            self.telemetry.flush()
+
+    @property
+    def webhook_events_path(self) -> Optional[str]:
+        """
+        The file of Strava push events the sync is driven by, in place of
+        listing activities, when `webhook_events_path` is set
+        """
+
+        return self.config.get("webhook_events_path")
+
+    def _event_owner_ids(self, context: Optional[dict]) -> Optional[List[int]]:
+        """The athlete whose events the context syncs, None for every event"""
+
+        if not context or "athlete" not in context:
+            return None
+        return [int(self.athlete_config(context)["id"])]
+
+    def _event_checkpointed(
+        self, records: Iterable[Dict[str, Any]], context: Optional[dict]
+    ) -> Iterable[Dict[str, Any]]:
+        """
+        Read the push events received since the context's checkpoint, have
+        the activities they name synced, and move the checkpoint past each
+        activity's events once it has been synced along with its children
+        """
+
+        state = self.get_context_state(context)
+        events, end_offset = read_events(
+            self.webhook_events_path,  # type: ignore[arg-type]
+            state.get(EVENTS_OFFSET, 0),
+            self.logger,
+        )
+        changes = activity_changes(
+            events, end_offset, self._event_owner_ids(context), self.logger
+        )
+        self.logger.info(
+            f"{len(events)} webhook events to sync, naming {len(changes)} activities"
+        )
+        key = self._prefetch_key(context or {})
+        if self._event_changes is None:
+            self._event_changes = {}
+        self._event_changes[key] = changes
+        checkpoints = {change.activity_id: change.checkpoint for change in changes}
+        try:
+            for record in records:
+                yield record
+                state[EVENTS_OFFSET] = checkpoints[record["id"]]
+        finally:
+            self._event_changes.pop(key, None)
+        state[EVENTS_OFFSET] = end_offset
+
+    def resume_point(self, context: Optional[dict]) -> Optional[dict]:
+        """
+        The checkpoint a run stopped by the daily quota left for the context.
+        It is set aside when the context starts, so requests keep resuming
+        from it while the state moves on with this run's progress.
+        """
+
+        key = self._prefetch_key(context or {})
+        if self._resume_points is not None and key in self._resume_points:
+            return self._resume_points[key]
+        return self.saved_context_state(context).get("resume")
+
+    def _checkpointed(
+        self, records: Iterable[Dict[str, Any]], context: Optional[dict]
+    ) -> Iterable[Dict[str, Any]]:
+        """
+        Keep a checkpoint in the context's state as activities are synced: a
+        cursor just past the last activity synced along with its children,
+        and the child streams still pending for the activity in progress. A
+        run stopped by the daily quota writes it out, and the next run lists
+        activities from the cursor and only syncs the children still pending.
+        """
+
+        state = self.get_context_state(context)
+        resume_from = state.pop("resume", None)
+        if self._resume_points is None:
+            self._resume_points = {}
+        self._resume_points[self._prefetch_key(context or {})] = resume_from
+
+        # Listings starting `after` a date run oldest first, others newest first.
+        # Activities named by push events come in no order, the events file
+        # keeps its own checkpoint
+        cursor = None
+        if not self.webhook_events_path:
+            params = self.get_url_params(context, None)
+            cursor = "after" if "after" in params else "before"
+        pending_from = (resume_from or {}).get("pending")
+        if resume_from and resume_from.get("replication_key_value"):
+            # The stopped run's progress, which the SDK reset at the start
+            self._increment_stream_state(
+                {self.replication_key: resume_from["replication_key_value"]},
+                context=context,
+            )
+        children = [
+            child.name
+            for child in self.child_streams
+            if child.selected or child.has_selected_descendents
+        ]
+
+        progress = {
+            key: value for key, value in (resume_from or {}).items() if key != "pending"
+        }
+        self._progress = progress
+        try:
+            for record in records:
+                streams = children
+                if pending_from and pending_from["activity_id"] == record["id"]:
+                    streams = [
+                        name for name in children if name in pending_from["streams"]
+                    ]
+                progress["pending"] = {
+                    "activity_id": record["id"],
+                    "streams": list(streams),
+                }
+                state["resume"] = progress
+                yield record
+                if self._stopped_by_quota:
+                    # Its children ran out of quota, the activity stays pending
+                    break
+                # The SDK has synced the children and written the record by now
+                del progress["pending"]
+                start = record.get(self.replication_key)
+                if start and cursor:
+                    progress[cursor] = epoch_seconds(start)
+                markers = state.get("progress_markers") or {}
+                progress["replication_key_value"] = markers.get("replication_key_value")
+        except DailyQuotaExhausted as ex:
+            self._stop_for_quota(ex)
+        finally:
+            self._progress = None
+        if self._stopped_by_quota:
+            # The SDK finalizes the bookmark next, leave it where the last run
+            # did: this run's progress is in the checkpoint
+            state.pop("progress_markers", None)
+            return
+        state.pop("resume", None)
+
+    def _stop_for_quota(self, ex: DailyQuotaExhausted) -> None:
+        """
+        End the sync cleanly once the daily quota runs out, the SDK writes the
+        state with the checkpoint the next run resumes from
+        """
+
+        if not self._stopped_by_quota:
+            self.logger.warning(
+                f"{ex}, stopping here. The next run resumes from this checkpoint"
+            )
+        self._stopped_by_quota = True
+
+    def synced_before_stop(self, child_name: str, child_context: dict) -> bool:
+        for resume in (self._resume_points or {}).values():
+            pending = (resume or {}).get("pending")
+            if (
+                pending
+                and pending["activity_id"] == child_context.get("activity_id")
+                and child_name not in pending["streams"]
+            ):
+                return True
+        return False
+
+    def child_synced(self, child_name: str, child_context: dict) -> None:
+        pending = (self._progress or {}).get("pending")
+        if (
+            pending
+            and pending["activity_id"] == child_context.get("activity_id")
+            and child_name in pending["streams"]
+        ):
+            pending["streams"].remove(child_name)
+
+    def _sync_children(self, child_context: dict) -> None:
+        """
+        A deleted activity has no kudoers, comments or series left to sync.
+        Running out of daily quota partway through an activity's children
+        stops the sync, the activity itself is then left for the next run.
+        """
+
+        if child_context.get("deleted") or self._stopped_by_quota:
+            return
+        try:
+            super()._sync_children(child_context)
+        except DailyQuotaExhausted as ex:
+            self._stop_for_quota(ex)
+
+    def _generate_record_messages(
+        self, record: dict
+    ) -> Generator[RecordMessage, None, None]:
+        """Nothing for an activity whose children were stopped by the quota"""
+        if not self._stopped_by_quota:
+            yield from super()._generate_record_messages(record)
+
+    def _increment_stream_state(
+        self, latest_record: Dict[str, Any], *, context: Optional[dict] = None
+    ) -> None:
+        """
+        Tombstones have no start date to move the bookmark with, and neither
+        does an activity the quota stopped partway
+        """
+
+        if not latest_record.get(DELETED_AT) and not self._stopped_by_quota:
+            super()._increment_stream_state(latest_record, context=context)
+
+    def _get_partition_records(self, context: dict) -> Iterable[Dict[str, Any]]:
+        """
+        Yield activities for an athlete and/or backfill slice. Slices that a
+        previous run finished are skipped outright, and later partitions are
+        fetched ahead on `partition_workers` threads while this one is being
+        emitted.
+        """
+
+        state = self.get_context_state(context)
+        if state.get("backfill_complete"):
+            self.logger.info(f"Backfill slice {context} already synced, skipping")
+            return
+
+        try:
+            self._prefetch_partitions(context)
+            yield from self._get_records_with_children(context)
+        except BaseException:
+            self._stop_partition_prefetch()
+            raise
+
+        if context.get("slice_end"):
+            # Closed slices can't gain new activities, don't revisit them
+            state["backfill_complete"] = True
+        if self._prefetch_key(context) == self._prefetch_key(self.partitions[-1]):
+            self._stop_partition_prefetch()
+
+    @property
+    def partition_workers(self) -> int:
+        """
+        Partitions fetched at once: `athlete_workers` athletes, each with
+        `backfill_workers` of their slices when backfilling
+        """
+
+        workers = int(self.config.get("backfill_workers", 1))
+        if self.config.get("athletes"):
+            workers *= int(self.config.get("athlete_workers", 1))
+        return workers
+
+    def _prefetch_partitions(self, context: dict) -> None:
+        """
+        Make sure this partition and the next few unfinished ones are being
+        fetched in the background
+        """
+
+        workers = self.partition_workers
+        if workers <= 1 or self.webhook_events_path:
+            # Push event partitions only know their activities once started
+            return
+        if self._partition_executor is None and not self.async_engine:
+            self._partition_executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix=f"{self.name}-partitions"
+            )
+
+        partitions = self.partitions or []
+        keys = [self._prefetch_key(partition) for partition in partitions]
+        key = self._prefetch_key(context)
+        if key not in keys:
+            self.logger.warning(
+                f"{context} isn't a known partition, not fetching ahead"
+            )
+            return
+        upcoming = partitions[keys.index(key) :]
+        queued = 0
+        for partition in upcoming:
+            if queued >= workers:
+                break
+            if self._is_backfill_complete(partition):
+                continue
+            queued += 1
+            if self._prefetched and self._prefetch_key(partition) in self._prefetched:
+                continue
+            self.prefetch(partition, self._partition_executor)
+
+    def _is_backfill_complete(self, partition: dict) -> bool:
+        """
+        Whether a previous run finished the partition. Unlike
+        `get_context_state` this doesn't add state for partitions that
+        haven't started yet.
+        """
+
+        return bool(self.saved_context_state(partition).get("backfill_complete"))
+
+    def _stop_partition_prefetch(self) -> None:
+        """Drop partitions fetched ahead that won't be emitted and stop the pool"""
+
+        for partition in self.partitions or []:
+            self.discard_prefetch(partition)
+        if self._partition_executor is not None:
+            self._partition_executor.shutdown(wait=False, cancel_futures=True)
+            self._partition_executor = None
+
+    def _get_records_with_children(
+        self, context: Optional[dict]
+    ) -> Iterable[Dict[str, Any]]:
+        """
+        Yield activities, fetching the selected child streams for the next few
+        activities on a worker pool (or the async engine, when enabled) while
+        earlier ones are being emitted.
+
+        Records are still handed to the SDK one at a time and in API order, so
+        parent and child messages come out exactly as in a serial sync. Only
+        the child HTTP requests overlap, and they all draw from the shared rate
+        limit budget.
+        """
+
+        children = [
+            child
+            for child in self.child_streams
+            if child.selected or child.has_selected_descendents
+        ]
+        engine = self.async_engine
+        if engine:
+            workers = engine.concurrency
+        else:
+            workers = int(self.config.get("child_stream_workers", 1))
+        if workers <= 1 or not children:
+            yield from super().get_records(context)
+            return
+
+        # Keep enough activities queued up that every worker stays busy
+        window_size = workers * 2
+        window: Deque[tuple] = deque()
+        executor = None
+        if not engine:
+            executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix=f"{self.name}-children"
+            )
+        try:
+            for record in super().get_records(context):
+                child_context = self.get_child_context(record, context)
+                for child in children:
+                    if not child_context.get("deleted"):
+                        child.prefetch(child_context, executor)
+                window.append((record, child_context))
+                if len(window) > window_size:
+                    yield window.popleft()[0]
+            while window:
+                yield window.popleft()[0]
+        finally:
+            # Abandoned early (e.g. --test or an error), drop outstanding work
+            for _, child_context in window:
+                for child in children:
+                    child.discard_prefetch(child_context)
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
 
 
 class ActivityKudoersStream(StravaStream):
@@ -29,6 +730,8 @@ class ActivityKudoersStream(StravaStream):
     name = "activity_kudoers"
     parent_stream_type = ActivitiesStream
     ignore_parent_replication_keys = True
+    state_partitioning_keys = ["activity_id"]
+    parent_count_key = "kudos_count"
     path = "/activities/{activity_id}/kudos"
     schema_filepath = SCHEMAS_DIR / "activity_kudoers.json"
 
@@ -41,8 +744,11 @@ class ActivityCommentsStream(StravaStream):
     name = "activity_comments"
     parent_stream_type = ActivitiesStream
     ignore_parent_replication_keys = True
+    state_partitioning_keys = ["activity_id"]
+    parent_count_key = "comment_count"
     primary_keys = ["id"]
     replication_key = "created_at"
+    required_properties = ("cursor",)
     path = "/activities/{activity_id}/comments"
     schema_filepath = SCHEMAS_DIR / "activity_comments.json"
 
@@ -55,12 +761,11 @@ class ActivityCommentsStream(StravaStream):
         than the other API endpoints
         """
 
-        response_json = response.json()
-        if not response.json():
+        if self.is_last_page(response):
             return None
 
         # We only need the last item in the list to get the cursor value
-        next_page_token = response_json[-1].get("cursor", None)
+        next_page_token = self.page_info(response).last_cursor
         self.logger.debug(f"Next page token is {next_page_token}")
 
         return next_page_token
@@ -71,8 +776,7 @@ class ActivityCommentsStream(StravaStream):
         """Return a dictionary of values to be used in URL parameterization."""
 
         params = {
-            "acccess_token": self.authenticator.access_token,
-            "per_page": self.config.get("results_per_page", 30),
+            "per_page": self.page_size,
             "after_cursor": next_page_token,
         }
 
@@ -85,3 +789,86 @@ class ActivityCommentsStream(StravaStream):
             params["before"] = self._datetime_to_epoch_time(end_date)
 
         return params
+
+
+class ActivityStreamsStream(StravaStream):
+    """
+    Sub stream with the time series recorded for a given activity (time,
+    position, heart rate, power...), one record per activity.
+
+    A series can run to tens of thousands of samples, so they are held as
+    compact arrays rather than lists of Python objects while fetching, and
+    with `activity_streams_output: parquet` each activity's series are
+    written to a Parquet file that the record points to instead of riding
+    along in one huge RECORD message.
+    """
+
+    name = "activity_streams"
+    parent_stream_type = ActivitiesStream
+    ignore_parent_replication_keys = True
+    state_partitioning_keys = ["activity_id"]
+    primary_keys = ["activity_id"]
+    path = "/activities/{activity_id}/streams"
+    schema_filepath = SCHEMAS_DIR / "activity_streams.json"
+
+    @property
+    def metadata(self) -> MetadataMapping:
+        """
+        One extra request per activity is too costly to make by default. The
+        stream is left out of discovered catalogs unless selected, and without
+        a catalog it only syncs when `activity_stream_types` is set.
+        """
+
+        first_use = self._metadata is None
+        metadata = super().metadata
+        if first_use:
+            metadata.root.selected_by_default = False
+            if self._tap_input_catalog is None:
+                metadata.root.selected = bool(self.config.get("activity_stream_types"))
+        return metadata
+
+    def get_next_page_token(
+        self, response: requests.Response, current_value: int
+    ) -> Union[None, int]:
+        """Every series of an activity comes back in a single response"""
+        return None
+
+    def get_url_params(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Dict[str, Any]:
+        types = self.config.get("activity_stream_types") or SERIES_TYPES
+        return {"keys": ",".join(types), "key_by_type": "true"}
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """
+        Turn the series into columns straight away, so the lists of decoded
+        samples are released before the record is queued for emission
+        """
+
+        body = json_loads(response.content)
+        columns = series_columns(body)
+        first = next(iter(body.values() if isinstance(body, dict) else body), {})
+        yield {
+            "series_type": first.get("series_type"),
+            "resolution": first.get("resolution"),
+            "original_size": first.get("original_size"),
+            "point_count": max((len(column) for column in columns.values()), default=0),
+            "columns": columns,
+        }
+
+    def post_process(self, row: dict, context: Optional[dict] = None) -> dict:
+        """Put the columns in the record as arrays, or in a Parquet file"""
+
+        row = dict(row)
+        columns = row.pop("columns")
+        row["activity_id"] = context["activity_id"] if context else None
+        if self.config.get("activity_streams_output") == "parquet":
+            batch_dir = series_batch_dir(self.config)
+            assert batch_dir is not None, "checked by the tap's config validation"
+            batch_path = batch_dir / f"{row['activity_id']}.parquet"
+            write_parquet(columns, batch_path)
+            row["batch_file"] = str(batch_path.resolve())
+        else:
+            for name, column in columns.items():
+                row[name] = column_values(name, column)
+        return row
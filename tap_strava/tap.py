@@ -1,14 +1,25 @@
-from typing import List
+from typing import List, Tuple
 
 from singer_sdk import Tap, Stream
 from singer_sdk import typing as th  # JSON schema typing helpers
+from singer_sdk.exceptions import ConfigValidationError
+from singer_sdk.helpers.capabilities import CapabilitiesEnum, PluginCapabilities
+from singer_sdk.helpers._classproperty import classproperty
+from tap_strava.polyline import POLYLINE_OUTPUTS
 from tap_strava.streams import (
     ActivitiesStream,
     ActivityKudoersStream,
     ActivityCommentsStream,
+    ActivityStreamsStream,
 )
+from tap_strava.series import SERIES_TYPES, series_batch_dir
 
-STREAM_TYPES = [ActivitiesStream, ActivityKudoersStream, ActivityCommentsStream]
+STREAM_TYPES = [
+    ActivitiesStream,
+    ActivityKudoersStream,
+    ActivityCommentsStream,
+    ActivityStreamsStream,
+]
 
 
 class TapStrava(Tap):
@@ -32,8 +43,21 @@ class TapStrava(Tap):
         th.Property(
             "refresh_token",
             th.StringType,
-            required=True,
-            description="Scoped refresh token obtained from the Strava oauth flow",
+            required=False,
+            description="Scoped refresh token obtained from the Strava oauth flow, required unless athletes is set",
+        ),
+        th.Property(
+            "athletes",
+            th.ArrayType(
+                th.ObjectType(
+                    th.Property("name", th.StringType, required=True),
+                    th.Property("refresh_token", th.StringType, required=True),
+                    th.Property("token_cache_path", th.StringType),
+                    th.Property("id", th.IntegerType),
+                )
+            ),
+            required=False,
+            description="Credentials of several athletes to sync in one run, each with a unique name and their own refresh token. Their Strava id is needed with webhook_events_path",
         ),
         th.Property(
             "start_date",
@@ -47,8 +71,275 @@ class TapStrava(Tap):
             required=False,
             description="End date for the data sync in YYYY-MM-DD format",
         ),
+        th.Property(
+            "api_url",
+            th.StringType,
+            required=False,
+            default="https://www.strava.com/api/v3/",
+            description="Base URL of the Strava API, the token endpoint is /oauth/token on the same host",
+        ),
+        th.Property(
+            "results_per_page",
+            th.IntegerType,
+            required=False,
+            description="Records requested per page, defaults to the largest page Strava allows (200)",
+        ),
+        th.Property(
+            "stop_on_short_page",
+            th.BooleanType,
+            required=False,
+            default=True,
+            description="Stop paginating as soon as a page comes back with fewer records than requested",
+        ),
+        th.Property(
+            "page_prefetch_window",
+            th.IntegerType,
+            required=False,
+            default=1,
+            description="Number of activity pages fetched ahead concurrently, 1 disables prefetching",
+        ),
+        th.Property(
+            "backfill_slice",
+            th.StringType,
+            required=False,
+            allowed_values=["week", "month", "year"],
+            description="Split the range from start_date into time slices with their own bookmarks",
+        ),
+        th.Property(
+            "athlete_workers",
+            th.IntegerType,
+            required=False,
+            default=1,
+            description="Number of athletes whose activities are fetched concurrently",
+        ),
+        th.Property(
+            "backfill_workers",
+            th.IntegerType,
+            required=False,
+            default=1,
+            description="Number of backfill slices fetched concurrently",
+        ),
+        th.Property(
+            "fingerprint_store_path",
+            th.StringType,
+            required=False,
+            description="Optional file recording each activity's kudos and comment counts so unchanged activities aren't re-fetched",
+        ),
+        th.Property(
+            "http_cache_path",
+            th.StringType,
+            required=False,
+            description="Optional sqlite file caching API responses between runs, revalidated with their ETag",
+        ),
+        th.Property(
+            "http_cache_max_mb",
+            th.NumberType,
+            required=False,
+            default=100,
+            description="Size cap of the response cache, least recently used responses are evicted first",
+        ),
+        th.Property(
+            "http_cache_ttls",
+            th.ObjectType(additional_properties=th.IntegerType),
+            required=False,
+            description="Seconds each stream reuses a cached response without asking Strava, keyed by stream name",
+        ),
+        th.Property(
+            "metrics_textfile_path",
+            th.StringType,
+            required=False,
+            description="Optional file where runtime metrics are written in the Prometheus text format",
+        ),
+        th.Property(
+            "token_cache_path",
+            th.StringType,
+            required=False,
+            description="Optional file used to persist the latest access and refresh token between runs",
+        ),
+        th.Property(
+            "child_stream_workers",
+            th.IntegerType,
+            required=False,
+            default=1,
+            description="Number of worker threads fetching activity kudoers and comments concurrently",
+        ),
+        th.Property(
+            "http_engine",
+            th.StringType,
+            required=False,
+            default="requests",
+            allowed_values=["requests", "async"],
+            description="HTTP engine used for API requests, 'async' needs httpx installed",
+        ),
+        th.Property(
+            "async_concurrency",
+            th.IntegerType,
+            required=False,
+            default=16,
+            description="Maximum number of requests the async engine keeps in flight",
+        ),
+        th.Property(
+            "stream_responses",
+            th.BooleanType,
+            required=False,
+            default=False,
+            description="Parse pages incrementally as they arrive instead of loading whole pages into memory, needs ijson installed",
+        ),
+        th.Property(
+            "decode_polylines",
+            th.StringType,
+            required=False,
+            allowed_values=list(POLYLINE_OUTPUTS),
+            description="Decode each activity's map.summary_polyline into latitude and longitude arrays plus a bounding box ('coordinates') or just the bounding box ('bounds'), needs numpy installed",
+        ),
+        th.Property(
+            "activity_stream_types",
+            th.ArrayType(th.StringType),
+            required=False,
+            description=f"Time series fetched for the activity_streams stream, any of {', '.join(SERIES_TYPES)}. All of them by default. Without a catalog, setting this is what turns the stream on",
+        ),
+        th.Property(
+            "activity_streams_output",
+            th.StringType,
+            required=False,
+            default="records",
+            allowed_values=["records", "parquet"],
+            description="Emit activity time series as arrays in the records, or write each activity's series to a Parquet file (needs pyarrow) referenced by its record",
+        ),
+        th.Property(
+            "activity_streams_batch_dir",
+            th.StringType,
+            required=False,
+            description="Directory the activity_streams Parquet files are written to. Defaults to activity_streams under a local batch_config storage root",
+        ),
+        th.Property(
+            "batch_config",
+            th.ObjectType(
+                th.Property(
+                    "encoding",
+                    th.ObjectType(
+                        th.Property(
+                            "format",
+                            th.StringType,
+                            allowed_values=["jsonl", "parquet"],
+                        ),
+                        th.Property("compression", th.StringType),
+                    ),
+                ),
+                th.Property(
+                    "storage",
+                    th.ObjectType(
+                        th.Property("root", th.StringType),
+                        th.Property("prefix", th.StringType),
+                    ),
+                ),
+            ),
+            required=False,
+            description="Write records to batch files and emit BATCH messages pointing to them instead of RECORD messages. Parquet needs pyarrow installed",
+        ),
+        th.Property(
+            "batch_size",
+            th.IntegerType,
+            required=False,
+            default=10000,
+            description="Records per batch file before it is rotated",
+        ),
+        th.Property(
+            "batch_max_mb",
+            th.NumberType,
+            required=False,
+            description="Uncompressed size at which a JSON lines batch file is rotated",
+        ),
+        th.Property(
+            "buffered_output",
+            th.BooleanType,
+            required=False,
+            default=False,
+            description="Serialize messages with orjson (when installed) into a reusable buffer written to stdout in large chunks, flushed after every STATE message",
+        ),
+        th.Property(
+            "output_buffer_kb",
+            th.IntegerType,
+            required=False,
+            default=1024,
+            description="Size of the buffered_output buffer",
+        ),
+        th.Property(
+            "http_pool_size",
+            th.IntegerType,
+            required=False,
+            description="Connections kept open to Strava and shared by every stream and token refresh. By default enough for child_stream_workers and the backfill and athlete workers",
+        ),
+        th.Property(
+            "http2",
+            th.BooleanType,
+            required=False,
+            default=False,
+            description="Multiplex requests over HTTP/2 with http_engine: async, needs httpx[http2] installed",
+        ),
+        th.Property(
+            "webhook_events_path",
+            th.StringType,
+            required=False,
+            description="JSON lines file of Strava push subscription events. When set, only the activities these events name are synced instead of listing activities, and deleted ones come through as tombstone records",
+        ),
+        th.Property(
+            "rate_limit_coordinator_path",
+            th.StringType,
+            required=False,
+            description="Optional file through which every tap process on the host shares one rate limit budget",
+        ),
+        th.Property(
+            "rate_limit_pacing_threshold",
+            th.NumberType,
+            required=False,
+            default=0.5,
+            description="Share of the 15 minute limit used at full speed before requests are spread across the rest of the window",
+        ),
     ).to_dict()
 
+    @classproperty
+    def capabilities(self) -> List[CapabilitiesEnum]:
+        """The SDK's tap capabilities, plus BATCH messages"""
+        return [*super().capabilities, PluginCapabilities.BATCH]
+
+    def _validate_config(
+        self, raise_errors: bool = True, warnings_as_errors: bool = False
+    ) -> Tuple[List[str], List[str]]:
+        """
+        On top of the schema, make sure there is exactly one way to get
+        credentials: a single refresh token or a list of uniquely named athletes,
+        and that Parquet activity series have somewhere to go
+        """
+
+        warnings, errors = super()._validate_config(raise_errors, warnings_as_errors)
+        athletes = self.config.get("athletes")
+        if bool(athletes) == bool(self.config.get("refresh_token")):
+            errors.append("Set either refresh_token or athletes, but not both")
+        elif athletes:
+            names = [athlete["name"] for athlete in athletes]
+            if len(set(names)) != len(names):
+                errors.append("Every athlete needs a unique name")
+            if self.config.get("webhook_events_path") and any(
+                athlete.get("id") is None for athlete in athletes
+            ):
+                errors.append("Every athlete needs their id with webhook_events_path")
+        if (
+            self.config.get("activity_streams_output") == "parquet"
+            and series_batch_dir(self.config) is None
+        ):
+            errors.append(
+                "activity_streams_output: parquet needs activity_streams_batch_dir, "
+                "or a local batch_config storage root"
+            )
+        if self.config.get("http2") and self.config.get("http_engine") != "async":
+            warnings.append("http2 only applies to http_engine: async")
+        if errors and raise_errors:
+            raise ConfigValidationError(
+                f"Config validation failed: {'; '.join(errors)}"
+            )
+        return warnings, errors
+
     def discover_streams(self) -> List[Stream]:
         """Return a list of discovered streams."""
         return [stream_class(tap=self) for stream_class in STREAM_TYPES]
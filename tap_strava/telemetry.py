@@ -0,0 +1,242 @@
+import logging
+import os
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, DefaultDict, Dict, List, Mapping, Optional, Tuple, cast
+
+from singer_sdk import metrics
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Labels of a series, sorted so they can key a dict
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels: str) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+class Histogram:
+    """Cumulative latency histogram with Prometheus style buckets"""
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(`le`, count) pairs, each bucket counting every faster request too"""
+
+        pairs = []
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), self.buckets):
+            total += count
+            pairs.append(("+Inf" if bound == float("inf") else str(bound), total))
+        return pairs
+
+
+class SyncTelemetry:
+    """
+    Runtime metrics for every stream syncing with the same Strava application:
+    request latency, retries and bytes received per stream and endpoint,
+    records emitted and time spent waiting on the rate limit per stream, and
+    the headroom left in the 15 minute and daily quotas.
+
+    `flush` emits the counters and timers counted since the previous flush as
+    Singer METRIC messages on the SDK's metrics logger, like the SDK's own
+    counters do, so summing the points of a run gives its totals. The Singer
+    spec has no histograms or gauges, so the latency histogram and the quota
+    headroom only go to the Prometheus textfile: when `textfile_path` is set,
+    `flush` also writes every running total there in the Prometheus text
+    format for node_exporter's textfile collector.
+    """
+
+    _registry: Dict[Optional[str], "SyncTelemetry"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        textfile_path: Optional[str] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.textfile_path = Path(textfile_path) if textfile_path else None
+        self.logger = logger or logging.getLogger(__name__)
+        self.latency: DefaultDict[Labels, Histogram] = defaultdict(Histogram)
+        self.retries: DefaultDict[Labels, int] = defaultdict(int)
+        self.bytes_received: DefaultDict[Labels, int] = defaultdict(int)
+        self.records: DefaultDict[Labels, int] = defaultdict(int)
+        self.rate_limit_sleep: DefaultDict[Labels, float] = defaultdict(float)
+        self.quota_remaining: Dict[Labels, int] = {}
+        # What the previous flushes emitted, keyed by metric name and labels
+        self._emitted: Dict[Tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_config(
+        cls, config: Mapping[str, Any], logger: Optional[logging.Logger] = None
+    ) -> "SyncTelemetry":
+        """
+        Return the shared metrics for the application in `config`, creating
+        them on first use
+        """
+
+        key = config.get("client_id")
+        with cls._registry_lock:
+            telemetry = cls._registry.get(key)
+            if telemetry is None:
+                telemetry = cls(config.get("metrics_textfile_path"), logger=logger)
+                cls._registry[key] = telemetry
+        return telemetry
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forget every collector (mostly useful in tests)"""
+        with cls._registry_lock:
+            cls._registry.clear()
+
+    def observe_response(
+        self, stream: str, endpoint: str, seconds: float, size: int
+    ) -> None:
+        labels = _labels(stream=stream, endpoint=endpoint)
+        with self._lock:
+            self.latency[labels].observe(seconds)
+            self.bytes_received[labels] += size
+
+    def count_retry(self, stream: str, endpoint: str) -> None:
+        with self._lock:
+            self.retries[_labels(stream=stream, endpoint=endpoint)] += 1
+
+    def count_records(self, stream: str, count: int = 1) -> None:
+        with self._lock:
+            self.records[_labels(stream=stream)] += count
+
+    def add_rate_limit_sleep(self, stream: str, seconds: float) -> None:
+        with self._lock:
+            self.rate_limit_sleep[_labels(stream=stream)] += seconds
+
+    def set_quota_remaining(self, short: int, daily: int) -> None:
+        with self._lock:
+            self.quota_remaining[_labels(window="15m")] = short
+            self.quota_remaining[_labels(window="daily")] = daily
+
+    def flush(self) -> None:
+        """
+        Emit the increase since the last flush as METRIC messages and refresh
+        the textfile with the totals
+        """
+
+        with self._lock:
+            points = self._points()
+            textfile = self._textfile() if self.textfile_path else None
+
+        metrics_logger = metrics.get_metrics_logger()
+        for point in points:
+            metrics.log(metrics_logger, point)
+
+        if textfile is not None and self.textfile_path is not None:
+            # Write then rename, the collector must never read a partial file
+            tmp_path = self.textfile_path.with_name(
+                f".{self.textfile_path.name}.{os.getpid()}.tmp"
+            )
+            try:
+                self.textfile_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path.write_text(textfile)
+                tmp_path.replace(self.textfile_path)
+            except OSError as ex:
+                self.logger.warning(f"Could not write metrics textfile: {ex}")
+
+    def _points(self) -> List[metrics.Point]:
+        """Points for what changed since the last flush, which they now cover"""
+
+        points: List[metrics.Point] = []
+        counted: List[Tuple[str, str, Mapping[Labels, float]]] = [
+            ("counter", "http_request_retries", self.retries),
+            ("counter", "http_response_bytes", self.bytes_received),
+            ("counter", "records_emitted", self.records),
+            ("timer", "rate_limit_sleep", self.rate_limit_sleep),
+        ]
+        for kind, name, series in counted:
+            for labels, value in series.items():
+                increase = value - self._emitted.get((name, labels), 0)
+                if not increase:
+                    continue
+                self._emitted[(name, labels)] = value
+                # The SDK only types its own metric names
+                metric = cast(metrics.Metric, name)
+                points.append(metrics.Point(kind, metric, increase, dict(labels)))
+        return points
+
+    def _textfile(self) -> str:
+        lines: List[str] = []
+
+        def series(name: str, kind: str, help_text: str, values: Mapping) -> None:
+            if not values:
+                return
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(values.items()):
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        if self.latency:
+            name = "tap_strava_http_request_duration_seconds"
+            lines.append(f"# HELP {name} Latency of Strava API requests")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(self.latency.items()):
+                for le, count in histogram.cumulative():
+                    bucket_labels = labels + (("le", le),)
+                    lines.append(
+                        f"{name}_bucket{_format_labels(bucket_labels)} {count}"
+                    )
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        series(
+            "tap_strava_http_request_retries_total",
+            "counter",
+            "Requests retried after a transient failure",
+            self.retries,
+        )
+        series(
+            "tap_strava_http_response_bytes_total",
+            "counter",
+            "Response body bytes received",
+            self.bytes_received,
+        )
+        series(
+            "tap_strava_records_emitted_total",
+            "counter",
+            "Records emitted",
+            self.records,
+        )
+        series(
+            "tap_strava_rate_limit_sleep_seconds_total",
+            "counter",
+            "Time spent waiting for the rate limit",
+            self.rate_limit_sleep,
+        )
+        series(
+            "tap_strava_quota_remaining",
+            "gauge",
+            "Requests left in the rate limit window",
+            self.quota_remaining,
+        )
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels) -> str:
+    escaped = (
+        key
+        + '="'
+        + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        + '"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
@@ -0,0 +1,86 @@
+"""Shared fixtures for the offline test suite."""
+
+import json
+from unittest import mock
+
+import pytest
+
+from tap_strava.async_engine import AsyncHttpEngine
+from tap_strava.auth import StravaTokenManager
+from tap_strava.rate_limit import RateLimitScheduler
+from tap_strava.client import StravaStream
+from tap_strava.fingerprints import FingerprintStore
+from tap_strava.http_cache import ResponseCache
+from tap_strava.http_pool import HttpPool
+from tap_strava.output import BufferedMessageWriter
+from tap_strava.tap import TapStrava
+from tap_strava.telemetry import SyncTelemetry
+from tap_strava.tests.stub_server import StubStrava
+
+SAMPLE_CONFIG = {
+    "client_id": "12345",
+    "client_secret": "secret",
+    "refresh_token": "refresh",
+}
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_state():
+    """Process-wide registries must not leak between tests"""
+    StravaTokenManager.reset()
+    RateLimitScheduler.reset()
+    yield
+    StravaTokenManager.reset()
+    RateLimitScheduler.reset()
+    AsyncHttpEngine.reset()
+    FingerprintStore.reset()
+    ResponseCache.reset()
+    HttpPool.reset()
+    SyncTelemetry.reset()
+    BufferedMessageWriter.reset()
+
+
+@pytest.fixture
+def run_sync(capsys):
+    """Run a sync and return its RECORD and STATE messages without timestamps"""
+
+    def _run_sync(tap):
+        tap.sync_all()
+        messages = []
+        for line in capsys.readouterr().out.splitlines():
+            message = json.loads(line)
+            if message["type"] not in ("RECORD", "STATE"):
+                continue
+            message.pop("time_extracted", None)
+            for bookmark in message.get("value", {}).get("bookmarks", {}).values():
+                bookmark.pop("replication_key_signpost", None)
+                for partition in bookmark.get("partitions", []):
+                    partition.pop("replication_key_signpost", None)
+            messages.append(message)
+        return messages
+
+    return _run_sync
+
+
+@pytest.fixture
+def make_tap():
+    def _make_tap(state=None, **config):
+        """Build a tap on the sample config, dropping keys passed as None"""
+        merged = {**SAMPLE_CONFIG, **config}
+        return TapStrava(
+            config={k: v for k, v in merged.items() if v is not None}, state=state
+        )
+
+    return _make_tap
+
+
+@pytest.fixture
+def strava_stub():
+    """Point every stream at a local stub API with a pre-issued access token"""
+    manager = StravaTokenManager.for_config(SAMPLE_CONFIG, auth_endpoint="unused")
+    manager.access_token = "stub-token"
+    with StubStrava() as stub, mock.patch.object(
+        StravaStream, "url_base", new_callable=mock.PropertyMock
+    ) as url_base_mock:
+        url_base_mock.return_value = stub.api_url
+        yield stub
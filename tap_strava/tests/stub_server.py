@@ -0,0 +1,291 @@
+"""
+A synthetic Strava API served locally, for the offline tests and benchmarks.
+
+Activities are generated on demand, so the stub can serve anything from a
+handful to hundreds of thousands of them without holding them in memory.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+FIRST_ACTIVITY = datetime(2022, 1, 1, 8, tzinfo=timezone.utc)
+
+ATHLETE_ID_STRIDE = 1_000_000
+
+
+class StubStrava:
+    """
+    Serves `activities` synthetic activities, each with `kudos_per_activity`
+    kudoers and (every other activity) `comments_per_activity` comments, plus
+    the OAuth token endpoint. Tokens issued for the nth refresh token in
+    `athletes` see activities with ids starting at n * `ATHLETE_ID_STRIDE`,
+    any other token sees the ids from 0. Every activity has `stream_points`
+    samples of each time series, with the odd watts samples missing. Activities
+    in `deleted` are gone, fetching one on its own is a 404.
+
+    Responses carry `x-ratelimit-*` headers counting the requests served so
+    far against `rate_limits`, and an ETag that is honoured with a 304. Past
+    the daily limit, requests are refused with a 429. Every
+    request can be delayed by `latency` seconds to mimic a real round trip.
+    """
+
+    def __init__(
+        self,
+        activities: int = 5,
+        kudos_per_activity: int = 1,
+        comments_per_activity: int = 1,
+        activity_spacing: timedelta = timedelta(days=10),
+        latency: float = 0.0,
+        rate_limits: Tuple[int, int] = (600, 30000),
+        athletes: Sequence[str] = (),
+        stream_points: int = 20,
+    ) -> None:
+        self.activities = activities
+        self.kudos_per_activity = kudos_per_activity
+        self.comments_per_activity = comments_per_activity
+        self.activity_spacing = activity_spacing
+        self.latency = latency
+        self.rate_limits = rate_limits
+        self.requests: Counter = Counter()
+        self.athletes = list(athletes)
+        self.stream_points = stream_points
+        self.deleted: set = set()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "The stub isn't running"
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/api/v3/"
+
+    def start(self) -> "StubStrava":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self  # type: ignore[attr-defined]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StubStrava":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def count(self, endpoint: str) -> int:
+        """Count a request to `endpoint` and return the total served so far"""
+        with self._lock:
+            self.requests[endpoint] += 1
+            return sum(self.requests.values())
+
+    def activity_start(self, index: int) -> datetime:
+        return FIRST_ACTIVITY + self.activity_spacing * index
+
+    def athlete_for(self, access_token: Optional[str]) -> int:
+        """Index of the athlete a token was issued to, 0 for unknown tokens"""
+        prefix = "stub-token-"
+        if access_token and access_token.startswith(prefix):
+            refresh_token = access_token[len(prefix) :]
+            if refresh_token in self.athletes:
+                return self.athletes.index(refresh_token)
+        return 0
+
+    def activity(self, index: int, athlete: int = 0) -> dict:
+        return {
+            "id": athlete * ATHLETE_ID_STRIDE + index,
+            "name": f"activity {index}",
+            "kudos_count": self.kudos_per_activity,
+            "comment_count": self.comments_per_activity * (index % 2),
+            "start_date": self.activity_start(index).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "athlete": {"id": athlete, "resource_state": 1},
+            "map": {
+                "id": f"a{index}",
+                "summary_polyline": "_p~iF~ps|U_ulLnnqC_mqNvxq`@",
+                "resource_state": 2,
+            },
+            "start_latlng": [38.5, -120.2],
+        }
+
+    def activity_detail(self, activity_id: int) -> Optional[dict]:
+        """A single activity, None when there is no such activity"""
+
+        athlete, index = divmod(activity_id, ATHLETE_ID_STRIDE)
+        if index >= self.activities or activity_id in self.deleted:
+            return None
+        return {**self.activity(index, athlete), "description": "", "laps": []}
+
+    def activity_page(self, query: Dict[str, List[str]], athlete: int) -> List[dict]:
+        """The page of activities strictly between `after` and `before`"""
+
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["30"])[0])
+        spacing = self.activity_spacing.total_seconds()
+        first = FIRST_ACTIVITY.timestamp()
+        low = 0
+        high = self.activities
+        if "after" in query:
+            low = max(low, int((int(query["after"][0]) - first) // spacing) + 1)
+        if "before" in query:
+            before = int(query["before"][0])
+            high = min(high, max(0, -int((first - before) // spacing)))
+        start = low + (page - 1) * per_page
+        return [
+            self.activity(i, athlete) for i in range(start, min(start + per_page, high))
+        ]
+
+    def kudos_page(self, activity_id: int, query: Dict[str, List[str]]) -> List[dict]:
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["30"])[0])
+        start = (page - 1) * per_page
+        return [
+            {"firstname": f"kudoer-{activity_id}-{j}", "lastname": "x"}
+            for j in range(start, min(start + per_page, self.kudos_per_activity))
+        ]
+
+    def comments_page(
+        self, activity_id: int, query: Dict[str, List[str]]
+    ) -> List[dict]:
+        per_page = int(query.get("per_page", ["30"])[0])
+        start = int(query.get("after_cursor", ["c0"])[0][1:])
+        total = self.comments_per_activity * (activity_id % 2)
+        return [
+            {
+                "id": activity_id * self.comments_per_activity + j,
+                "text": "nice",
+                "created_at": "2022-02-01T08:00:00Z",
+                "cursor": f"c{j + 1}",
+            }
+            for j in range(start, min(start + per_page, total))
+        ]
+
+    def activity_streams(self, query: Dict[str, List[str]]) -> dict:
+        """The requested time series keyed by type, like `key_by_type=true`"""
+
+        points = range(self.stream_points)
+        series = {
+            "time": list(points),
+            "distance": [i * 3.5 for i in points],
+            "latlng": [[38.5 + i * 1e-5, -120.2 - i * 1e-5] for i in points],
+            "altitude": [100.0 + i % 7 for i in points],
+            "heartrate": [120 + i % 30 for i in points],
+            "watts": [None if i % 2 else 200 + i for i in points],
+            "moving": [i % 5 != 0 for i in points],
+        }
+        keys = query.get("keys", [",".join(series)])[0].split(",")
+        return {
+            key: {
+                "type": key,
+                "data": series[key],
+                "series_type": "distance",
+                "original_size": self.stream_points,
+                "resolution": "high",
+            }
+            for key in keys
+            if key in series
+        }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: ThreadingHTTPServer
+
+    # Keep connections alive between requests, like the real API. Headers and
+    # body are separate writes, which Nagle's algorithm would hold back
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    @property
+    def stub(self) -> StubStrava:
+        return self.server.stub  # type: ignore[attr-defined]
+
+    def do_GET(self):
+        stub = self.stub
+        if stub.latency:
+            time.sleep(stub.latency)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+        status = 200
+        if url.path.endswith("/athlete/activities"):
+            endpoint = "activities"
+            token = query.get("access_token", [None])[0]
+            body = stub.activity_page(query, stub.athlete_for(token))
+        elif parts[-1] == "kudos":
+            endpoint = "kudos"
+            body = stub.kudos_page(int(parts[-2]), query)
+        elif parts[-1] == "comments":
+            endpoint = "comments"
+            body = stub.comments_page(int(parts[-2]), query)
+        elif parts[-1] == "streams":
+            endpoint = "streams"
+            body = stub.activity_streams(query)
+        elif parts[-2] == "activities" and parts[-1].isdigit():
+            endpoint = "activity"
+            body = stub.activity_detail(int(parts[-1]))
+            if body is None:
+                body = {"message": "Record Not Found", "errors": []}
+                status = 404
+        else:
+            self.send_error(404)
+            return
+        used = stub.count(endpoint)
+        if used > stub.rate_limits[1]:
+            body = {"message": "Rate Limit Exceeded", "errors": []}
+            self._send_json(body, used=used, status=429)
+            return
+        self._send_json(body, used=used, status=status)
+
+    def do_POST(self):
+        stub = self.stub
+        if urlparse(self.path).path != "/oauth/token":
+            self.send_error(404)
+            return
+        stub.count("token")
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        refresh_token = form.get("refresh_token", [""])[0]
+        self._send_json(
+            {
+                "token_type": "Bearer",
+                "access_token": f"stub-token-{refresh_token}",
+                "refresh_token": refresh_token,
+                "expires_at": int(time.time()) + 21600,
+                "expires_in": 21600,
+            }
+        )
+
+    def _send_json(self, body, used: Optional[int] = None, status: int = 200) -> None:
+        payload = json.dumps(body).encode()
+        etag = f'"{hashlib.md5(payload).hexdigest()}"'
+        not_modified = self.headers.get("If-None-Match") == etag
+        self.send_response(304 if not_modified else status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        if used is not None:
+            short_limit, daily_limit = self.stub.rate_limits
+            self.send_header("x-ratelimit-limit", f"{short_limit},{daily_limit}")
+            self.send_header("x-ratelimit-usage", f"{used},{used}")
+        if not_modified:
+            self.end_headers()
+            return
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,98 @@
+"""Activity time series, as arrays in records or as Parquet files."""
+
+from array import array
+
+import pytest
+from singer_sdk.exceptions import ConfigValidationError
+
+from tap_strava.series import column_values, series_columns
+
+
+def stream_records(messages):
+    return [
+        m["record"]
+        for m in messages
+        if m["type"] == "RECORD" and m["stream"] == "activity_streams"
+    ]
+
+
+def test_series_columns_split_latlng_and_keep_missing_samples():
+    body = [
+        {"type": "latlng", "data": [[1.5, 2.5], [3.5, 4.5]]},
+        {"type": "watts", "data": [200, None]},
+        {"type": "moving", "data": [True, False]},
+    ]
+    columns = series_columns(body)
+    assert set(columns) == {"latitude", "longitude", "watts", "moving"}
+    assert all(isinstance(column, array) for column in columns.values())
+    assert column_values("latitude", columns["latitude"]) == [1.5, 3.5]
+    assert column_values("watts", columns["watts"]) == [200, None]
+    assert column_values("moving", columns["moving"]) == [True, False]
+
+
+def test_not_synced_by_default(make_tap, strava_stub, run_sync):
+    messages = run_sync(make_tap())
+    assert not stream_records(messages)
+    assert strava_stub.requests["streams"] == 0
+
+
+def test_series_emitted_as_arrays(make_tap, strava_stub, run_sync):
+    tap = make_tap(activity_stream_types=["time", "latlng", "watts", "moving"])
+    records = stream_records(run_sync(tap))
+
+    assert len(records) == strava_stub.activities
+    record = records[0]
+    points = strava_stub.stream_points
+    assert record["activity_id"] == 0
+    assert record["point_count"] == points
+    assert record["series_type"] == "distance"
+    assert record["time"] == list(range(points))
+    assert record["latitude"][1] == 38.5 + 1e-5
+    assert record["watts"][:2] == [200, None]
+    assert record["moving"][:2] == [False, True]
+    assert "heartrate" not in record
+
+
+def test_series_written_to_parquet(make_tap, strava_stub, run_sync, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    tap = make_tap(
+        activity_stream_types=["time", "latlng", "watts", "moving"],
+        activity_streams_output="parquet",
+        activity_streams_batch_dir=str(tmp_path),
+    )
+    records = stream_records(run_sync(tap))
+
+    assert len(records) == strava_stub.activities
+    for record in records:
+        assert "time" not in record
+        assert record["batch_file"] == str(
+            tmp_path / f"{record['activity_id']}.parquet"
+        )
+    table = pq.read_table(records[1]["batch_file"])
+    assert table.num_rows == strava_stub.stream_points
+    assert table.column_names == ["time", "latitude", "longitude", "watts", "moving"]
+    assert table.column("time").type == "int64"
+    assert table.column("watts").to_pylist()[:2] == [200, None]
+    assert table.column("moving").to_pylist()[:2] == [False, True]
+
+
+def test_series_default_under_the_batch_root(make_tap, strava_stub, run_sync, tmp_path):
+    pytest.importorskip("pyarrow")
+    tap = make_tap(
+        activity_stream_types=["time"],
+        activity_streams_output="parquet",
+        batch_config={
+            "encoding": {"format": "jsonl"},
+            "storage": {"root": f"file://{tmp_path}"},
+        },
+    )
+    run_sync(tap)
+
+    assert len(list((tmp_path / "activity_streams").glob("*.parquet"))) == (
+        strava_stub.activities
+    )
+
+
+def test_series_parquet_needs_a_directory(make_tap):
+    with pytest.raises(ConfigValidationError):
+        make_tap(activity_streams_output="parquet")
@@ -0,0 +1,21 @@
+"""The async engine must produce exactly what the requests engine does."""
+
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("httpx")
+
+
+def test_async_engine_matches_requests_engine(make_tap, strava_stub, run_sync):
+    expected = run_sync(make_tap())
+    actual = run_sync(make_tap(http_engine="async", async_concurrency=4))
+
+    assert len(expected) > 10
+    assert actual == expected
+
+
+def test_httpx_is_only_imported_by_the_engine():
+    check = "import sys, tap_strava.tap; sys.exit('httpx' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", check]).returncode == 0
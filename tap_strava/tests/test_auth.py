@@ -0,0 +1,117 @@
+"""Offline tests for the shared OAuth token manager."""
+
+import json
+import time
+import threading
+from unittest import mock
+
+import requests
+
+from tap_strava.auth import StravaTokenManager
+
+AUTH_ENDPOINT = "https://www.strava.com/oauth/token"
+
+
+def token_response(access_token: str, refresh_token: str, expires_in: int = 21600):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(
+        {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "expires_at": int(time.time()) + expires_in,
+            "expires_in": expires_in,
+        }
+    ).encode()
+    return response
+
+
+def test_token_manager_is_shared_per_credentials():
+    config = {"client_id": "1", "client_secret": "s", "refresh_token": "r"}
+    first = StravaTokenManager.for_config(config, auth_endpoint=AUTH_ENDPOINT)
+    second = StravaTokenManager.for_config(dict(config), auth_endpoint=AUTH_ENDPOINT)
+    other = StravaTokenManager.for_config(
+        {**config, "refresh_token": "other"}, auth_endpoint=AUTH_ENDPOINT
+    )
+
+    assert first is second
+    assert first is not other
+
+
+def test_token_is_refreshed_once_and_rotated():
+    manager = StravaTokenManager(AUTH_ENDPOINT, "1", "s", "r0")
+    with mock.patch(
+        "tap_strava.auth.requests.post", return_value=token_response("a1", "r1")
+    ) as post:
+        assert manager.get_access_token() == "a1"
+        assert manager.get_access_token() == "a1"
+
+    assert post.call_count == 1
+    assert post.call_args.kwargs["data"]["refresh_token"] == "r0"
+    assert manager.refresh_token == "r1"
+
+
+def test_token_refreshed_before_expiry():
+    manager = StravaTokenManager(AUTH_ENDPOINT, "1", "s", "r0", refresh_margin=300)
+    responses = [token_response("a1", "r1", expires_in=60), token_response("a2", "r2")]
+    with mock.patch("tap_strava.auth.requests.post", side_effect=responses):
+        assert manager.get_access_token() == "a1"
+        # Expires inside the refresh margin so the next call refreshes again
+        assert manager.get_access_token() == "a2"
+
+
+def test_concurrent_callers_share_one_refresh():
+    manager = StravaTokenManager(AUTH_ENDPOINT, "1", "s", "r0")
+
+    def slow_post(*args, **kwargs):
+        time.sleep(0.05)
+        return token_response("a1", "r1")
+
+    with mock.patch("tap_strava.auth.requests.post", side_effect=slow_post) as post:
+        threads = [threading.Thread(target=manager.get_access_token) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert post.call_count == 1
+
+
+def test_token_cache_round_trip(tmp_path):
+    cache_path = tmp_path / "token.json"
+    manager = StravaTokenManager(
+        AUTH_ENDPOINT, "1", "s", "r0", cache_path=str(cache_path)
+    )
+    with mock.patch(
+        "tap_strava.auth.requests.post", return_value=token_response("a1", "r1")
+    ):
+        manager.get_access_token()
+
+    warm = StravaTokenManager(AUTH_ENDPOINT, "1", "s", "r0", cache_path=str(cache_path))
+    with mock.patch("tap_strava.auth.requests.post") as post:
+        assert warm.get_access_token() == "a1"
+    post.assert_not_called()
+    assert warm.refresh_token == "r1"
+
+
+def test_token_cache_is_ignored_for_a_new_refresh_token(tmp_path):
+    cache_path = tmp_path / "token.json"
+    manager = StravaTokenManager(
+        AUTH_ENDPOINT, "1", "s", "r0", cache_path=str(cache_path)
+    )
+    with mock.patch(
+        "tap_strava.auth.requests.post", return_value=token_response("a1", "r1")
+    ):
+        manager.get_access_token()
+
+    # Another athlete's token, or one the user authorized again
+    other = StravaTokenManager(
+        AUTH_ENDPOINT, "1", "s", "x0", cache_path=str(cache_path)
+    )
+    assert other.access_token is None
+    with mock.patch(
+        "tap_strava.auth.requests.post", return_value=token_response("b1", "x1")
+    ) as post:
+        assert other.get_access_token() == "b1"
+    assert post.call_args.kwargs["data"]["refresh_token"] == "x0"
+    assert post.call_args.kwargs["timeout"] == other.timeout
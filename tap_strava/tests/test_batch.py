@@ -0,0 +1,92 @@
+"""BATCH messages pointing at batch files instead of RECORD messages."""
+
+import gzip
+import json
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import pytest
+
+
+def sync_messages(tap, capsys):
+    tap.sync_all()
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def records_by_stream(messages):
+    records = defaultdict(list)
+    for message in messages:
+        if message["type"] == "RECORD":
+            records[message["stream"]].append(message["record"])
+    return records
+
+
+def read_jsonl(url):
+    with gzip.open(urlparse(url).path) as batch_file:
+        return [json.loads(line) for line in batch_file]
+
+
+def test_jsonl_batches_match_records(make_tap, strava_stub, capsys, tmp_path):
+    strava_stub.activities = 9
+    expected = records_by_stream(sync_messages(make_tap(), capsys))
+
+    batch_config = {
+        "encoding": {"format": "jsonl", "compression": "gzip"},
+        "storage": {"root": f"file://{tmp_path}", "prefix": "strava-"},
+    }
+    messages = sync_messages(make_tap(batch_config=batch_config, batch_size=4), capsys)
+
+    assert not [m for m in messages if m["type"] == "RECORD"]
+    batched = defaultdict(list)
+    files = defaultdict(int)
+    for message in messages:
+        if message["type"] == "BATCH":
+            (url,) = message["manifest"]
+            assert urlparse(url).path.rsplit("/", 1)[1].startswith("strava-")
+            records = read_jsonl(url)
+            assert 0 < len(records) <= 4
+            batched[message["stream"]].extend(records)
+            files[message["stream"]] += 1
+    assert batched == expected
+    # Kudoers for many activities share a file, not one file per activity
+    assert files["activity_kudoers"] < strava_stub.activities
+
+
+def test_state_follows_the_batches_it_covers(make_tap, strava_stub, capsys, tmp_path):
+    batch_config = {
+        "encoding": {"format": "jsonl"},
+        "storage": {"root": f"file://{tmp_path}"},
+    }
+    messages = sync_messages(make_tap(batch_config=batch_config, batch_size=3), capsys)
+
+    # Batches are written as a group right before the STATE covering them
+    types = [m["type"] for m in messages]
+    assert types.count("BATCH") > 1
+    for index, message_type in enumerate(types):
+        if message_type == "BATCH":
+            assert types[index + 1] in ("BATCH", "STATE")
+    for message in messages:
+        if message["type"] == "BATCH":
+            (url,) = message["manifest"]
+            with open(urlparse(url).path) as batch_file:
+                assert 0 < len(batch_file.readlines()) <= 3
+
+
+def test_parquet_batches(make_tap, strava_stub, capsys, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    batch_config = {
+        "encoding": {"format": "parquet"},
+        "storage": {"root": f"file://{tmp_path}"},
+    }
+    messages = sync_messages(make_tap(batch_config=batch_config), capsys)
+
+    rows = defaultdict(int)
+    for message in messages:
+        if message["type"] == "BATCH":
+            assert message["encoding"]["format"] == "parquet"
+            (url,) = message["manifest"]
+            rows[message["stream"]] += pq.read_table(urlparse(url).path).num_rows
+    assert rows["activities"] == strava_stub.activities
+    assert rows["activity_kudoers"] == (
+        strava_stub.activities * strava_stub.kudos_per_activity
+    )
@@ -0,0 +1,17 @@
+"""Smoke test keeping the benchmark harness in working order."""
+
+from scripts.benchmark import run_benchmark
+
+
+def test_benchmark_reports_every_stream():
+    result = run_benchmark(10, kudos_per_activity=3, comments_per_activity=2)
+
+    streams = result["streams"]
+    assert streams["activities"]["records"] == 10
+    assert streams["activity_kudoers"]["records"] == 30
+    assert streams["activity_comments"]["records"] == 10
+    # One page of kudoers per activity, one page of comments per commented one
+    assert streams["activity_kudoers"]["requests_per_record"] == 10 / 30
+    assert streams["activity_comments"]["requests_per_record"] == 5 / 10
+    assert result["peak_rss_mb"] > 0
+    assert all(s["time_to_first_record"] is not None for s in streams.values())
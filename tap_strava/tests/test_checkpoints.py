@@ -0,0 +1,77 @@
+"""Checkpoints left when the daily quota runs out, and resuming from them."""
+
+import json
+
+import pytest
+
+from tap_strava.rate_limit import RateLimitScheduler
+
+
+def records_of(messages):
+    return [
+        (message["stream"], json.dumps(message["record"], sort_keys=True))
+        for message in messages
+        if message["type"] == "RECORD"
+    ]
+
+
+# Listing from a date onwards, as incremental syncs do, goes oldest first
+START_DATE = "2021-12-01T00:00:00Z"
+
+
+def new_day(stub, daily_limit=30000):
+    stub.rate_limits = (600, daily_limit)
+    RateLimitScheduler.reset()
+
+
+def test_quota_stop_leaves_a_checkpoint(make_tap, strava_stub, run_sync):
+    new_day(strava_stub, daily_limit=3)
+    tap = make_tap(start_date=START_DATE)
+    # Stops cleanly rather than failing the sync
+    messages = run_sync(tap)
+
+    states = [message["value"] for message in messages if message["type"] == "STATE"]
+    resume = states[-1]["bookmarks"]["activities"]["resume"]
+    # Activity 0 is done, activity 1 was being synced when the quota ran out
+    assert resume["pending"]["activity_id"] == 1
+    assert resume["after"] > 0
+    assert sum(strava_stub.requests.values()) == 3
+    # The stopped activity is only emitted once its children are synced
+    activities = [
+        stream for stream, _ in records_of(messages) if stream == "activities"
+    ]
+    assert len(activities) == 1
+    # The bookmark stays put, the run's progress is in the checkpoint
+    assert "replication_key_value" not in states[-1]["bookmarks"]["activities"]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_resumed_sync_finishes_the_stopped_one(
+    make_tap, strava_stub, run_sync, workers
+):
+    full_tap = make_tap(start_date=START_DATE, child_stream_workers=workers)
+    full = run_sync(full_tap)
+    full_requests = sum(strava_stub.requests.values())
+    strava_stub.requests.clear()
+
+    new_day(strava_stub, daily_limit=3)
+    stopped_tap = make_tap(start_date=START_DATE, child_stream_workers=workers)
+    stopped = run_sync(stopped_tap)
+    new_day(strava_stub)
+    resumed_tap = make_tap(
+        start_date=START_DATE, state=stopped_tap.state, child_stream_workers=workers
+    )
+    resumed = run_sync(resumed_tap)
+
+    assert set(records_of(stopped) + records_of(resumed)) == set(records_of(full))
+    bookmark = resumed_tap.state["bookmarks"]["activities"]
+    assert "resume" not in bookmark
+    assert (
+        bookmark["replication_key_value"]
+        == full_tap.state["bookmarks"]["activities"]["replication_key_value"]
+    )
+    if workers == 1:
+        # Nothing synced before the stop is synced again, only the page of
+        # activities is listed once more
+        assert len(records_of(stopped) + records_of(resumed)) == len(records_of(full))
+        assert sum(strava_stub.requests.values()) == full_requests + 1
@@ -0,0 +1,111 @@
+"""The tap-strava entry point and its prebuilt bundle."""
+
+import json
+import shutil
+from unittest import mock
+
+import pytest
+from click.testing import CliRunner
+
+from scripts.build_bundle import build_bundle
+from tap_strava import cli
+from tap_strava.tap import TapStrava
+
+
+@pytest.fixture(scope="module", autouse=True)
+def bundle(tmp_path_factory):
+    """A bundle freshly built from the sources, as a release would have it"""
+
+    path = tmp_path_factory.mktemp("bundle") / "bundle.json"
+    path.write_text(json.dumps(build_bundle()))
+    with mock.patch.object(cli, "BUNDLE_PATH", path):
+        yield path
+
+
+def test_fresh_bundle_is_used():
+    assert cli.load_bundle() is not None
+
+
+def test_missing_bundle_goes_to_the_sdk(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "BUNDLE_PATH", tmp_path / "bundle.json")
+    assert cli.bundled_output(["--about"]) is None
+
+
+def test_fingerprint_only_covers_what_the_output_depends_on(tmp_path, monkeypatch):
+    package = tmp_path / "tap_strava"
+    shutil.copytree(cli.PACKAGE_DIR, package, ignore=shutil.ignore_patterns("tests"))
+    monkeypatch.setattr(cli, "PACKAGE_DIR", package)
+    fingerprint = cli.source_fingerprint()
+
+    with open(package / "client.py", "a") as client:
+        client.write("\n# unrelated change\n")
+    assert cli.source_fingerprint() == fingerprint
+    with open(package / "schemas" / "activities.json", "a") as schema:
+        schema.write("\n")
+    assert cli.source_fingerprint() != fingerprint
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--version"],
+        ["--about"],
+        ["--about", "--format=json"],
+        ["--about", "--format", "markdown"],
+        ["--discover"],
+    ],
+)
+def test_bundled_output_matches_sdk(args):
+    result = CliRunner().invoke(TapStrava.cli, args)
+    assert result.exit_code == 0, result.output
+    assert cli.bundled_output(args) == result.stdout
+
+
+def test_activity_streams_config_picks_its_catalog(tmp_path):
+    def selected_streams(args):
+        catalog = json.loads(cli.bundled_output(args))
+        return {
+            entry["tap_stream_id"]
+            for entry in catalog["streams"]
+            for metadata in entry["metadata"]
+            if not metadata["breadcrumb"] and metadata["metadata"].get("selected")
+        }
+
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"activity_stream_types": ["time"]}))
+    assert "activity_streams" in selected_streams(
+        ["--discover", "--config", str(config_path)]
+    )
+    config_path.write_text(json.dumps({"client_id": "12345"}))
+    assert "activity_streams" not in selected_streams(
+        ["--discover", "--config", str(config_path)]
+    )
+
+
+@pytest.mark.parametrize(
+    "args,config",
+    [
+        (["--discover", "--config", "{config}"], {"flattening_enabled": True}),
+        (["--discover", "--config", "missing.json"], None),
+        (["--config", "{config}"], {}),
+        (["--about", "--format", "yaml"], None),
+        (["--discover", "--catalog", "catalog.json"], None),
+        (["--test"], None),
+    ],
+)
+def test_everything_else_goes_to_the_sdk(tmp_path, args, config):
+    config_path = tmp_path / "config.json"
+    if config is not None:
+        config_path.write_text(json.dumps(config))
+    args = [arg.format(config=config_path) for arg in args]
+    assert cli.bundled_output(args) is None
+
+
+def test_stale_bundle_is_ignored(tmp_path, monkeypatch, bundle):
+    bundle = json.loads(bundle.read_text())
+    bundle["fingerprint"] = "stale"
+    stale_path = tmp_path / "bundle.json"
+    stale_path.write_text(json.dumps(bundle))
+    monkeypatch.setattr(cli, "BUNDLE_PATH", stale_path)
+
+    assert cli.bundled_output(["--about"]) is None
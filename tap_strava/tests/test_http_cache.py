@@ -0,0 +1,51 @@
+"""Tests for the persistent response cache."""
+
+from tap_strava.http_cache import ResponseCache
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    now = [0.0]
+    cache = ResponseCache(
+        str(tmp_path / "cache.sqlite"), max_bytes=10, clock=lambda: now[0]
+    )
+
+    cache.put("a", None, {}, b"aaaa")
+    now[0] += 1
+    cache.put("b", '"b"', {}, b"bbbb")
+    now[0] += 1
+    assert cache.get("a").body == b"aaaa"
+    now[0] += 1
+    cache.put("c", None, {}, b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a").body == b"aaaa"
+    assert cache.get("c").body == b"cccc"
+
+
+def test_unchanged_pages_are_revalidated(make_tap, strava_stub, run_sync, tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    expected = run_sync(make_tap(http_cache_path=cache_path))
+    first = ResponseCache.for_config({"http_cache_path": cache_path})
+    hits, misses, revalidated = first.stats
+    assert (hits, revalidated) == (0, 0) and misses > 0
+
+    ResponseCache.reset()
+    tap = make_tap(http_cache_path=cache_path)
+    assert run_sync(tap) == expected
+    assert ResponseCache.for_config({"http_cache_path": cache_path}).stats == (
+        0,
+        0,
+        misses,
+    )
+
+
+def test_fresh_entries_skip_the_request(make_tap, strava_stub, run_sync, tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    ttls = {"activity_kudoers": 3600}
+    expected = run_sync(make_tap(http_cache_path=cache_path, http_cache_ttls=ttls))
+
+    ResponseCache.reset()
+    tap = make_tap(http_cache_path=cache_path, http_cache_ttls=ttls)
+    assert run_sync(tap) == expected
+    kudoers_costs = tap.streams["activity_kudoers"]._sync_costs
+    assert kudoers_costs == {"cache_hits": 5}
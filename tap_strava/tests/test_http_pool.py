@@ -0,0 +1,46 @@
+"""The connection pool shared by streams and token refreshes."""
+
+from unittest import mock
+
+from tap_strava.auth import StravaTokenManager
+from tap_strava.http_pool import DEFAULT_POOL_SIZE, HttpPool, pool_size_for
+from tap_strava.tests.conftest import SAMPLE_CONFIG
+
+
+def test_pool_size_follows_concurrency():
+    assert pool_size_for({}) == DEFAULT_POOL_SIZE
+    assert pool_size_for({"child_stream_workers": 16}) == 18
+    assert (
+        pool_size_for(
+            {
+                "child_stream_workers": 8,
+                "backfill_workers": 2,
+                "athletes": [{"name": "a"}, {"name": "b"}],
+                "athlete_workers": 2,
+            }
+        )
+        == 13
+    )
+    assert pool_size_for({"child_stream_workers": 16, "http_pool_size": 4}) == 4
+
+
+def test_streams_and_token_refreshes_share_one_session(make_tap):
+    tap = make_tap(child_stream_workers=4)
+    sessions = {id(stream.requests_session) for stream in tap.streams.values()}
+    manager = StravaTokenManager.for_config(
+        {**SAMPLE_CONFIG, "child_stream_workers": 4}, auth_endpoint="unused"
+    )
+
+    assert sessions == {id(manager.session)}
+
+
+def test_sync_reuses_connections(make_tap, strava_stub, run_sync):
+    tap = make_tap(child_stream_workers=4)
+    with mock.patch.object(HttpPool, "log_stats", autospec=True) as log_stats:
+        run_sync(tap)
+
+    requests_sent, connections = HttpPool.for_config(tap.config).stats
+    assert requests_sent == sum(strava_stub.requests.values())
+    # Never more connections than threads making requests at once
+    assert connections <= 5
+    log_stats.assert_called()
@@ -0,0 +1,49 @@
+"""Buffered message output."""
+
+import datetime
+import json
+
+from singer_sdk._singerlib import RecordMessage
+from singer_sdk._singerlib.messages import format_message
+
+from tap_strava.output import BufferedMessageWriter, dumps_message
+
+
+def test_serialization_matches_sdk():
+    message = RecordMessage(
+        stream="activities",
+        record={"id": 1, "name": "Ride", "distance": 1.5, "map": {"id": "a"}},
+        time_extracted=datetime.datetime(2022, 1, 1, 8, tzinfo=datetime.timezone.utc),
+    )
+    line = dumps_message(message.to_dict())
+    assert line.endswith(b"\n")
+    assert json.loads(line) == json.loads(format_message(message))
+
+
+def test_buffer_is_written_when_full_or_flushed(capsys):
+    writer = BufferedMessageWriter(buffer_size=256)
+    message = {"type": "RECORD", "stream": "s", "record": {"text": "x" * 50}}
+    line_size = len(dumps_message(message))
+
+    writer.write(message)
+    assert capsys.readouterr().out == ""
+
+    for _ in range(256 // line_size):
+        writer.write(message)
+    # The buffer filled up and went out in one go, the last line is pending
+    written = capsys.readouterr().out.splitlines()
+    assert len(written) == 256 // line_size
+
+    writer.flush()
+    assert [json.loads(line) for line in capsys.readouterr().out.splitlines()] == [
+        message
+    ]
+
+    writer.write({"type": "RECORD", "stream": "s", "record": {"text": "y" * 500}})
+    assert len(capsys.readouterr().out) > 500
+
+
+def test_buffered_sync_matches_default(make_tap, strava_stub, run_sync):
+    expected = run_sync(make_tap())
+    actual = run_sync(make_tap(buffered_output=True, output_buffer_kb=1))
+    assert actual == expected
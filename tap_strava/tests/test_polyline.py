@@ -0,0 +1,102 @@
+"""Batched polyline decoding."""
+
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from tap_strava.polyline import add_polyline_fields, decode_polylines  # noqa: E402
+
+# The example from Google's polyline format documentation
+EXAMPLE = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+EXAMPLE_POINTS = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+
+
+def encode(points):
+    """Reference encoder, one coordinate at a time"""
+
+    def encode_value(value):
+        value = ~(value << 1) if value < 0 else value << 1
+        chunks = []
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+        return "".join(chunks)
+
+    encoded = []
+    previous = (0, 0)
+    for latitude, longitude in points:
+        current = (round(latitude * 1e5), round(longitude * 1e5))
+        encoded.append(encode_value(current[0] - previous[0]))
+        encoded.append(encode_value(current[1] - previous[1]))
+        previous = current
+    return "".join(encoded)
+
+
+def points(decoded):
+    latitudes, longitudes = decoded
+    return list(zip(latitudes.tolist(), longitudes.tolist()))
+
+
+def test_decodes_documented_example():
+    assert points(decode_polylines([EXAMPLE])[0]) == EXAMPLE_POINTS
+
+
+def test_batch_matches_reference_encoder():
+    rng = random.Random(42)
+    routes = [
+        [
+            (round(rng.uniform(-90, 90), 5), round(rng.uniform(-180, 180), 5))
+            for _ in range(rng.randint(1, 50))
+        ]
+        for _ in range(100)
+    ]
+    for route, decoded in zip(routes, decode_polylines([encode(r) for r in routes])):
+        assert points(decoded) == route
+
+
+def test_empty_and_malformed_polylines():
+    batch = ["", None, "_p~iF", "_p~iF~ps|", "bad\x01", "é", EXAMPLE]
+    decoded = decode_polylines(batch)
+    assert points(decoded[0]) == [] and points(decoded[1]) == []
+    assert decoded[2:6] == [None, None, None, None]
+    assert points(decoded[6]) == EXAMPLE_POINTS
+
+
+def test_add_polyline_fields():
+    records = [{"map": {"summary_polyline": EXAMPLE}}, {"map": None}, {}]
+    add_polyline_fields(records, "bounds")
+    assert records[0]["summary_polyline_bounds"] == {
+        "min_latitude": 38.5,
+        "min_longitude": -126.453,
+        "max_latitude": 43.252,
+        "max_longitude": -120.2,
+    }
+    assert "summary_polyline_latitudes" not in records[0]
+    assert records[1]["summary_polyline_bounds"] is None
+
+    records = [{"map": {"summary_polyline": EXAMPLE}}]
+    add_polyline_fields(records, "coordinates")
+    assert records[0]["summary_polyline_latitudes"] == [38.5, 40.7, 43.252]
+    assert records[0]["summary_polyline_longitudes"] == [-120.2, -120.95, -126.453]
+
+
+@pytest.mark.parametrize("stream_responses", [False, True])
+def test_sync_adds_decoded_polylines(make_tap, strava_stub, run_sync, stream_responses):
+    if stream_responses:
+        pytest.importorskip("ijson")
+    tap = make_tap(decode_polylines="coordinates", stream_responses=stream_responses)
+    # Only the derived fields are wanted, not the encoded polyline itself
+    tap.streams["activities"].mask[("properties", "map")] = False
+    activities = [
+        m["record"]
+        for m in run_sync(tap)
+        if m["type"] == "RECORD" and m["stream"] == "activities"
+    ]
+    assert activities
+    for record in activities:
+        assert "map" not in record
+        assert record["summary_polyline_latitudes"] == [38.5, 40.7, 43.252]
+        assert record["summary_polyline_bounds"]["max_longitude"] == -120.2
@@ -0,0 +1,109 @@
+"""Deselected subtrees are dropped while pages are parsed."""
+
+import copy
+import io
+import json
+import logging
+
+import pytest
+from singer_sdk.helpers._catalog import pop_deselected_record_properties
+
+from tap_strava.projection import Projection
+
+RECORDS = [
+    {
+        "id": 1,
+        "athlete": {"id": 7, "resource_state": 1},
+        "map": {"id": "a1", "summary_polyline": "abc", "resource_state": 2},
+        "laps": [{"id": 1, "map": {"summary_polyline": "kept inside arrays"}}],
+        "item": {"summary_polyline": "not under map"},
+    },
+    {"id": 2, "map": None, "athlete": "not an object"},
+    {"id": 3},
+]
+
+DESELECTED = [
+    ("properties", "athlete"),
+    ("properties", "map", "properties", "summary_polyline"),
+    ("properties", "athlete", "properties", "id"),
+    ("properties", "kudos_count"),
+]
+
+
+class _Mask(dict):
+    def __missing__(self, key):
+        return True
+
+
+def mask(deselected=DESELECTED):
+    return {breadcrumb: False for breadcrumb in deselected}
+
+
+def expected_records():
+    records = copy.deepcopy(RECORDS)
+    for record in records:
+        pop_deselected_record_properties(
+            record, {}, _Mask(mask()), logging.getLogger("test")
+        )
+    return records
+
+
+def test_nothing_deselected():
+    assert Projection.from_mask({("properties", "id"): True}) is None
+
+
+def test_keep_overrides_top_level_deselection():
+    projection = Projection.from_mask(mask(), keep=["kudos_count"])
+    assert projection is not None
+    assert projection.paths == (("athlete",), ("map", "summary_polyline"))
+
+
+def test_prune_matches_sdk():
+    projection = Projection.from_mask(mask())
+    assert projection is not None
+    pruned = [projection.prune(record) for record in copy.deepcopy(RECORDS)]
+    assert pruned == expected_records()
+
+
+def test_parsed_events_match_sdk():
+    ijson = pytest.importorskip("ijson")
+    projection = Projection.from_mask(mask())
+    assert projection is not None
+    events = ijson.parse(io.BytesIO(json.dumps(RECORDS).encode()))
+    parsed = list(ijson.items(projection.filter_events(events), "item"))
+    assert parsed == expected_records()
+
+
+@pytest.mark.parametrize("stream_responses", [False, True])
+def test_sync_drops_deselected_subtrees(
+    make_tap, strava_stub, run_sync, stream_responses
+):
+    if stream_responses:
+        pytest.importorskip("ijson")
+    tap = make_tap(stream_responses=stream_responses)
+    activities = tap.streams["activities"]
+    for breadcrumb in (
+        ("properties", "athlete"),
+        ("properties", "map", "properties", "summary_polyline"),
+        ("properties", "kudos_count"),
+    ):
+        activities.mask[breadcrumb] = False
+    messages = run_sync(tap)
+
+    activities = [
+        m["record"]
+        for m in messages
+        if m["type"] == "RECORD" and m["stream"] == "activities"
+    ]
+    kudoers = [
+        m
+        for m in messages
+        if m["type"] == "RECORD" and m["stream"] == "activity_kudoers"
+    ]
+    assert activities
+    for record in activities:
+        assert "athlete" not in record
+        assert "kudos_count" not in record
+        assert record["map"] == {"id": record["map"]["id"], "resource_state": 2}
+    # The kudos count still drives the child stream while deselected
+    assert len(kudoers) == len(activities) * strava_stub.kudos_per_activity
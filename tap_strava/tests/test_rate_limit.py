@@ -0,0 +1,197 @@
+"""Offline tests for the rate limit scheduler."""
+
+import subprocess
+import sys
+from unittest import mock
+
+import requests
+import pytest
+from singer_sdk.exceptions import FatalAPIError
+
+from tap_strava.rate_limit import (
+    DailyQuotaExhausted,
+    RateLimitCoordinator,
+    RateLimitScheduler,
+)
+
+# 2023-01-01 10:14:30 UTC, thirty seconds before a quarter hour boundary
+NOW = 1672568070.0
+
+
+class FakeClock:
+    def __init__(self, now: float = NOW) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_waits_only_until_the_next_quarter_hour():
+    scheduler = RateLimitScheduler(clock=FakeClock())
+    scheduler.update((100, 1000), (100, 200))
+
+    assert scheduler.reserve() == pytest.approx(30)
+
+
+def test_usage_resets_after_boundary():
+    clock = FakeClock()
+    scheduler = RateLimitScheduler(clock=clock)
+    scheduler.update((100, 1000), (100, 200))
+    clock.now += 31
+
+    assert scheduler.short_usage == 0
+    assert scheduler.daily_usage == 200
+    assert scheduler.reserve() == 0
+
+
+def test_paces_requests_past_threshold():
+    scheduler = RateLimitScheduler(clock=FakeClock(), pacing_threshold=0.5)
+    scheduler.update((100, 1000), (70, 200))
+
+    waits = [scheduler.reserve() for _ in range(3)]
+
+    # 30 seconds left for the last 30 requests: roughly one per second
+    assert waits[0] == 0
+    assert waits[1] == pytest.approx(30 / 29)
+    assert waits[2] == pytest.approx(30 / 29 + 30 / 28)
+
+
+def test_waiters_are_spread_after_the_window_rolls_over():
+    scheduler = RateLimitScheduler(clock=FakeClock())
+    scheduler.update((100, 1000), (100, 200))
+
+    waits = [scheduler.reserve() for _ in range(3)]
+
+    # One every 900 / 100 seconds from the boundary, not all at once
+    assert waits == pytest.approx([30, 39, 48])
+
+
+def test_pacing_never_goes_past_the_boundary():
+    scheduler = RateLimitScheduler(clock=FakeClock(), pacing_threshold=0.5)
+    scheduler.update((100, 1000), (97, 200))
+
+    waits = [scheduler.reserve() for _ in range(4)]
+
+    # The third slot would be 45 seconds out, past the rollover at 30
+    assert waits == pytest.approx([0, 15, 30, 39])
+
+
+def test_no_pacing_below_threshold():
+    scheduler = RateLimitScheduler(clock=FakeClock(), pacing_threshold=0.5)
+    scheduler.update((100, 1000), (10, 200))
+
+    assert [scheduler.reserve() for _ in range(5)] == [0] * 5
+
+
+def make_response(headers: dict) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers.update(headers)
+    return response
+
+
+def test_missing_headers_are_ignored(make_tap):
+    stream = make_tap().streams["activities"]
+
+    assert stream.check_rate_limit(make_response({})) is None
+
+
+def test_tighter_read_limit_wins(make_tap):
+    stream = make_tap().streams["activities"]
+    response = make_response(
+        {
+            "x-ratelimit-limit": "200,2000",
+            "x-ratelimit-usage": "10,1900",
+            "x-readratelimit-limit": "100,1000",
+            "x-readratelimit-usage": "95,100",
+        }
+    )
+
+    limits = stream.check_rate_limit(response)
+
+    assert limits["short_limit"] == 100 and limits["short_usage"] == 95
+    assert limits["daily_limit"] == 2000 and limits["daily_usage"] == 1900
+
+
+def test_daily_limit_is_fatal(make_tap):
+    stream = make_tap().streams["activities"]
+    response = make_response(
+        {"x-ratelimit-limit": "100,1000", "x-ratelimit-usage": "10,1000"}
+    )
+    response.status_code = 429
+
+    with pytest.raises(FatalAPIError):
+        stream.check_rate_limit(response)
+
+
+def test_last_request_of_the_day_is_kept(make_tap):
+    stream = make_tap().streams["activities"]
+    response = make_response(
+        {"x-ratelimit-limit": "100,1000", "x-ratelimit-usage": "10,1000"}
+    )
+
+    assert stream.check_rate_limit(response)["daily_usage"] == 1000
+    # The next request is never sent
+    prepared_request = requests.Request("GET", stream.get_url(None)).prepare()
+    with mock.patch.object(stream.requests_session, "send") as send:
+        with pytest.raises(DailyQuotaExhausted):
+            stream._request(prepared_request, None)
+    send.assert_not_called()
+
+
+def shared_scheduler(path, **kwargs) -> RateLimitScheduler:
+    return RateLimitScheduler(
+        coordinator=RateLimitCoordinator(str(path)), key="12345", **kwargs
+    )
+
+
+def test_coordinator_shares_usage(tmp_path):
+    path = tmp_path / "rate_limit.json"
+    first = shared_scheduler(path, clock=FakeClock())
+    second = shared_scheduler(path, clock=FakeClock())
+
+    first.update((100, 1000), (100, 200))
+
+    assert second.reserve() == pytest.approx(30)
+
+
+RESERVE_IN_CHILD = """
+import sys
+from tap_strava.rate_limit import (
+    DailyQuotaExhausted,
+    RateLimitCoordinator,
+    RateLimitScheduler,
+)
+scheduler = RateLimitScheduler(
+    coordinator=RateLimitCoordinator(sys.argv[1]), key="12345", pacing_threshold=1
+)
+scheduler.reserve()
+scheduler.reserve()
+print("reserved", flush=True)
+sys.stdin.readline()
+"""
+
+
+@pytest.mark.parametrize("child_alive", [True, False])
+def test_coordinator_counts_other_processes_in_flight(tmp_path, child_alive):
+    path = tmp_path / "rate_limit.json"
+    scheduler = shared_scheduler(path, pacing_threshold=1)
+    scheduler.update((10, 1000), (8, 0))
+
+    child = subprocess.Popen(
+        [sys.executable, "-c", RESERVE_IN_CHILD, str(path)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert child.stdout.readline().strip() == "reserved"
+        if not child_alive:
+            child.communicate("\n")
+        wait = scheduler.reserve()
+    finally:
+        if child.poll() is None:
+            child.communicate("\n")
+
+    # A live child holds the last two requests of the window, a dead one doesn't
+    assert (wait > 0) == child_alive
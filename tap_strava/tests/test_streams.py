@@ -0,0 +1,309 @@
+"""Offline tests for stream behaviour that doesn't need the Strava API."""
+
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+import requests
+
+from tap_strava.client import epoch_seconds
+from tap_strava.responses import json_loads
+from tap_strava.fingerprints import FingerprintStore
+from tap_strava.streams import (
+    ActivitiesStream,
+    ActivityCommentsStream,
+    ActivityKudoersStream,
+    backfill_slices,
+)
+
+
+def fake_kudoers(self, context):
+    # Finish out of order to prove emission order doesn't depend on timing
+    time.sleep(random.random() / 100)
+    yield {"firstname": f"kudoer-{context['activity_id']}"}
+
+
+def test_child_fan_out_keeps_serial_order(make_tap):
+    tap = make_tap(child_stream_workers=4)
+    activities = tap.streams["activities"]
+    kudoers = tap.streams["activity_kudoers"]
+    comments = tap.streams["activity_comments"]
+
+    parent_records = [{"id": i} for i in range(20)]
+    emitted = []
+    with mock.patch.object(
+        ActivitiesStream, "request_records", return_value=iter(parent_records)
+    ), mock.patch.object(
+        ActivityKudoersStream, "request_records", fake_kudoers
+    ), mock.patch.object(
+        ActivityCommentsStream, "request_records", lambda self, context: iter([])
+    ):
+        for record in activities.get_records(None):
+            # Mirrors the SDK syncing children right after each parent record
+            child_context = activities.get_child_context(record, None)
+            emitted.append(record["id"])
+            emitted.extend(r["firstname"] for r in kudoers.get_records(child_context))
+            emitted.extend(comments.get_records(child_context))
+
+    expected = []
+    for i in range(20):
+        expected.extend([i, f"kudoer-{i}"])
+    assert emitted == expected
+    assert not kudoers._prefetched
+    assert not comments._prefetched
+
+
+def test_child_fan_out_disabled_by_default(make_tap):
+    tap = make_tap()
+    activities = tap.streams["activities"]
+    with mock.patch.object(
+        ActivitiesStream, "request_records", return_value=iter([{"id": 1}])
+    ), mock.patch.object(ActivityCommentsStream, "prefetch") as prefetch:
+        assert list(activities.get_records(None)) == [{"id": 1}]
+    prefetch.assert_not_called()
+
+
+def make_page(body, url="https://www.strava.com/api/v3/athlete/activities?page=3"):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(body).encode()
+    response.request = requests.Request("GET", url).prepare()
+    return response
+
+
+def test_each_page_is_decoded_once(make_tap):
+    activities = make_tap().streams["activities"]
+    response = make_page([{"id": 1}, {"id": 2}])
+
+    with mock.patch("tap_strava.responses.json_loads", wraps=json_loads) as loads:
+        records = list(activities.parse_response(response))
+        next_page = activities.get_next_page_token(response, 3)
+
+    assert loads.call_count == 1
+    assert records == [{"id": 1}, {"id": 2}]
+    assert next_page == 4
+
+
+def test_comment_cursor_survives_record_mutation(make_tap):
+    comments = make_tap().streams["activity_comments"]
+    response = make_page([{"id": 1, "cursor": "a"}, {"id": 2, "cursor": "b"}])
+
+    for record in comments.parse_response(response):
+        # The SDK pops deselected properties from records in place
+        record.pop("cursor")
+
+    assert comments.get_next_page_token(response, None) == "b"
+
+
+def test_streamed_responses_match_buffered(make_tap, strava_stub, run_sync):
+    pytest.importorskip("ijson")
+    expected = run_sync(make_tap())
+    actual = run_sync(make_tap(stream_responses=True))
+
+    assert len(expected) > 10
+    assert actual == expected
+
+
+def test_pagination_stops_on_short_page(make_tap, strava_stub, run_sync):
+    tap = make_tap(results_per_page=2)
+    run_sync(tap)
+
+    # 5 activities over pages of 2, 2 and 1, no trailing empty page
+    assert tap.streams["activities"]._sync_costs["requests"] == 3
+
+
+def test_pagination_until_empty_page(make_tap, strava_stub, run_sync):
+    tap = make_tap(results_per_page=2, stop_on_short_page=False)
+    run_sync(tap)
+
+    assert tap.streams["activities"]._sync_costs["requests"] == 4
+
+
+def test_page_size_defaults_to_endpoint_maximum(make_tap):
+    assert make_tap().streams["activities"].page_size == 200
+    assert make_tap(results_per_page=500).streams["activities"].page_size == 200
+
+
+def test_page_prefetch_matches_serial_sync(make_tap, strava_stub, run_sync):
+    expected = run_sync(make_tap(results_per_page=2))
+    actual = run_sync(make_tap(results_per_page=2, page_prefetch_window=4))
+
+    assert actual == expected
+
+
+def test_backfill_slices_follow_calendar_boundaries():
+    slices = backfill_slices("2022-01-15", "2022-03-10", "month")
+
+    assert [s["slice_start"][:10] for s in slices] == [
+        "2022-01-15",
+        "2022-02-01",
+        "2022-03-01",
+    ]
+    assert slices[-1]["slice_end"][:10] == "2022-03-10"
+    assert backfill_slices("2022-01-15", None, "year")[-1]["slice_end"] is None
+
+
+def activity_ids(messages):
+    return [
+        m["record"]["id"]
+        for m in messages
+        if m["type"] == "RECORD" and m["stream"] == "activities"
+    ]
+
+
+def test_sliced_backfill_matches_single_scan(make_tap, strava_stub, run_sync):
+    dates = {"start_date": "2022-01-01T00:00:00Z", "end_date": "2022-03-01T00:00:00Z"}
+    expected = activity_ids(run_sync(make_tap(**dates)))
+    tap = make_tap(backfill_slice="month", backfill_workers=2, **dates)
+    actual = activity_ids(run_sync(tap))
+
+    assert actual == expected == [0, 1, 2, 3, 4]
+    partitions = tap.state["bookmarks"]["activities"]["partitions"]
+    assert len(partitions) == 2
+    assert all(p["backfill_complete"] for p in partitions)
+
+
+def test_finished_slices_are_not_requested_again(make_tap, strava_stub, run_sync):
+    dates = {"start_date": "2022-01-01T00:00:00Z", "end_date": "2022-03-01T00:00:00Z"}
+    first = make_tap(backfill_slice="month", **dates)
+    run_sync(first)
+
+    resumed = make_tap(state=first.state, backfill_slice="month", **dates)
+    assert activity_ids(run_sync(resumed)) == []
+    assert "requests" not in resumed.streams["activities"]._sync_costs
+
+
+def test_open_backfill_keeps_its_slices_for_the_sync(make_tap, strava_stub, run_sync):
+    tap = make_tap(
+        start_date="2022-01-01T00:00:00Z", backfill_slice="year", backfill_workers=2
+    )
+    stream = tap.streams["activities"]
+    now = datetime.now(timezone.utc)
+    calls = []
+
+    def clock(tz=None):
+        # A year boundary passes right after the slices are first worked out
+        calls.append(tz)
+        return now if len(calls) == 1 else now + timedelta(days=366)
+
+    with mock.patch("tap_strava.streams.datetime") as fake_datetime:
+        fake_datetime.now.side_effect = clock
+        partitions = stream.partitions
+        messages = run_sync(tap)
+
+    assert stream.partitions is partitions
+    assert activity_ids(messages) == [0, 1, 2, 3, 4]
+    # The last slice was recognised, so the prefetch pool was shut down
+    assert stream._partition_executor is None
+
+
+def test_prefetch_ahead_looks_partitions_up_by_key(make_tap):
+    tap = make_tap(
+        start_date="2022-01-01T00:00:00Z",
+        end_date="2022-03-01T00:00:00Z",
+        backfill_slice="month",
+        backfill_workers=2,
+    )
+    stream = tap.streams["activities"]
+    with mock.patch.object(ActivitiesStream, "prefetch") as prefetch:
+        # Same partition, different dict
+        stream._prefetch_partitions(dict(reversed(stream.partitions[0].items())))
+        assert prefetch.call_count == 2
+        prefetch.reset_mock()
+        stream._prefetch_partitions({"slice_start": "2021-01-01", "slice_end": None})
+        prefetch.assert_not_called()
+    stream._stop_partition_prefetch()
+
+
+def test_slice_bounds_ignore_the_host_timezone(make_tap, monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        tap = make_tap(
+            start_date="2022-01-01T00:00:00Z",
+            end_date="2022-03-01T00:00:00Z",
+            backfill_slice="month",
+        )
+        stream = tap.streams["activities"]
+        params = stream.get_url_params(stream.partitions[1], None)
+
+        assert epoch_seconds("2022-01-01") == 1640995200
+        assert epoch_seconds("2022-01-01T00:00:00-05:00") == 1641013200
+        # 2022-02-01 and 2022-03-01 at midnight UTC
+        assert (params["after"], params["before"]) == (1643673600, 1646092800)
+    finally:
+        monkeypatch.delenv("TZ")
+        time.tzset()
+
+
+def child_record_count(messages, stream_name):
+    return sum(
+        1 for m in messages if m["type"] == "RECORD" and m["stream"] == stream_name
+    )
+
+
+def test_children_skipped_for_zero_counts(make_tap, strava_stub, run_sync):
+    tap = make_tap()
+    messages = run_sync(tap)
+
+    # Only the odd activities have comments, even ones cost no request
+    assert child_record_count(messages, "activity_comments") == 2
+    assert tap.streams["activity_comments"]._sync_costs["requests"] == 2
+
+
+def test_children_skipped_for_unchanged_counts(
+    make_tap, strava_stub, run_sync, tmp_path
+):
+    store_path = str(tmp_path / "fingerprints.json")
+    first = make_tap(fingerprint_store_path=store_path)
+    assert child_record_count(run_sync(first), "activity_kudoers") == 5
+
+    FingerprintStore.reset()
+    second = make_tap(fingerprint_store_path=store_path)
+    messages = run_sync(second)
+
+    assert child_record_count(messages, "activity_kudoers") == 0
+    assert "requests" not in second.streams["activity_kudoers"]._sync_costs
+
+
+ATHLETES = [
+    {"name": "alice", "refresh_token": "alice-refresh"},
+    {"name": "bob", "refresh_token": "bob-refresh"},
+]
+
+
+def test_athletes_are_partitioned(make_tap, strava_stub, run_sync):
+    strava_stub.athletes = [athlete["refresh_token"] for athlete in ATHLETES]
+    tap = make_tap(refresh_token=None, athletes=ATHLETES)
+    messages = run_sync(tap)
+
+    activity_ids = [
+        m["record"]["id"]
+        for m in messages
+        if m["type"] == "RECORD" and m["stream"] == "activities"
+    ]
+    assert activity_ids == [*range(5), *range(1_000_000, 1_000_005)]
+    partitions = messages[-1]["value"]["bookmarks"]["activities"]["partitions"]
+    assert [p["context"] for p in partitions] == [
+        {"athlete": "alice"},
+        {"athlete": "bob"},
+    ]
+    assert all(p["replication_key_value"] for p in partitions)
+
+
+def test_athletes_synced_concurrently_match_serial(make_tap, strava_stub, run_sync):
+    strava_stub.athletes = [athlete["refresh_token"] for athlete in ATHLETES]
+    expected = run_sync(make_tap(refresh_token=None, athletes=ATHLETES))
+    actual = run_sync(
+        make_tap(
+            refresh_token=None,
+            athletes=ATHLETES,
+            athlete_workers=2,
+            child_stream_workers=4,
+        )
+    )
+
+    assert actual == expected
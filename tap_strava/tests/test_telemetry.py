@@ -0,0 +1,63 @@
+"""Tests for the runtime metrics."""
+
+from unittest import mock
+
+from tap_strava import telemetry
+
+
+def test_metrics_cover_every_stream(make_tap, strava_stub, run_sync, tmp_path):
+    textfile = tmp_path / "tap_strava.prom"
+
+    with mock.patch.object(telemetry.metrics, "log") as log:
+        run_sync(make_tap(metrics_textfile_path=str(textfile)))
+
+    points = [
+        (call.args[1] if len(call.args) > 1 else call.kwargs["point"]).__dict__
+        for call in log.call_args_list
+    ]
+    records = {
+        p["tags"]["stream"]: p["value"]
+        for p in points
+        if p["metric"] == "records_emitted"
+    }
+    assert records == {"activities": 5, "activity_kudoers": 5, "activity_comments": 2}
+    # Only the metric types the Singer spec defines go on the log
+    assert {p["metric_type"] for p in points} <= {"counter", "timer"}
+
+    prometheus = textfile.read_text()
+    assert "# TYPE tap_strava_http_request_duration_seconds histogram" in prometheus
+    for endpoint in (
+        "/athlete/activities",
+        "/activities/{activity_id}/kudos",
+        "/activities/{activity_id}/comments",
+    ):
+        assert f'{{endpoint="{endpoint}",stream=' in prometheus
+    assert 'tap_strava_records_emitted_total{stream="activities"} 5' in prometheus
+    assert 'tap_strava_quota_remaining{window="daily"}' in prometheus
+
+
+def test_points_add_up_across_partitions(make_tap, strava_stub, run_sync):
+    athletes = [
+        {"name": "alice", "refresh_token": "alice-refresh"},
+        {"name": "bob", "refresh_token": "bob-refresh"},
+    ]
+    strava_stub.athletes = [athlete["refresh_token"] for athlete in athletes]
+
+    tap = make_tap(refresh_token=None, athletes=athletes)
+    with mock.patch.object(telemetry.metrics, "log") as log:
+        run_sync(tap)
+
+    points = [
+        (call.args[1] if len(call.args) > 1 else call.kwargs["point"]).__dict__
+        for call in log.call_args_list
+    ]
+    emitted = [
+        p["value"]
+        for p in points
+        if p["metric"] == "records_emitted" and p["tags"]["stream"] == "activities"
+    ]
+    # Flushed once per athlete, each time with that athlete's activities only
+    assert emitted == [5, 5]
+    received = sum(p["value"] for p in points if p["metric"] == "http_response_bytes")
+    totals = telemetry.SyncTelemetry.for_config(tap.config).bytes_received
+    assert received == sum(totals.values())
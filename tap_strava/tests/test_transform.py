@@ -0,0 +1,49 @@
+"""The compiled transform must match the SDK's generic record handling."""
+
+import copy
+import datetime
+import logging
+
+import pytest
+from singer_sdk.helpers._catalog import pop_deselected_record_properties
+from singer_sdk.helpers._typing import conform_record_data_types
+
+from tap_strava.transform import compile_transformer
+
+RECORDS = [
+    {
+        "id": 1,
+        "name": "Morning ride",
+        "distance": 20123.4,
+        "commute": 0,
+        "trainer": 1,
+        "private": None,
+        "manual": False,
+        "map": {"id": "a1", "summary_polyline": "abc"},
+        "athlete": {"id": 7, "resource_state": 1},
+        "start_latlng": [43.6, -79.4],
+        "not_in_schema": "dropped",
+    },
+    {"id": 2, "flagged": True, "start_date": datetime.datetime(2022, 1, 1)},
+    {},
+]
+
+
+@pytest.mark.parametrize("record", RECORDS)
+@pytest.mark.parametrize("deselect", [False, True])
+def test_matches_sdk(make_tap, record, deselect):
+    stream = make_tap().streams["activities"]
+    if deselect:
+        stream.mask[("properties", "map")] = False
+    logger = logging.getLogger("test")
+    expected_record = copy.deepcopy(record)
+    pop_deselected_record_properties(
+        expected_record, stream.schema, stream.mask, logger
+    )
+    expected = conform_record_data_types(
+        "activities", expected_record, stream.schema, logger
+    )
+
+    transform = compile_transformer("activities", stream.schema, stream.mask, logger)
+
+    assert transform(copy.deepcopy(record)) == expected
@@ -0,0 +1,199 @@
+"""Syncs driven by Strava push subscription events."""
+
+import json
+import threading
+
+import pytest
+import requests
+from singer_sdk.exceptions import ConfigValidationError
+
+from scripts.webhook_receiver import EventReceiver
+from tap_strava.rate_limit import RateLimitScheduler
+from tap_strava.webhooks import DELETED_AT, activity_changes, append_event, read_events
+
+
+def event(aspect_type, object_id, event_time=1650000000, **extra):
+    return {
+        "aspect_type": aspect_type,
+        "event_time": event_time,
+        "object_id": object_id,
+        "object_type": "activity",
+        "owner_id": 0,
+        "subscription_id": 1,
+        "updates": {},
+        **extra,
+    }
+
+
+def write_events(path, *events):
+    for item in events:
+        append_event(str(path), item)
+
+
+def activity_records(messages, stream="activities"):
+    return [
+        message["record"]
+        for message in messages
+        if message["type"] == "RECORD" and message["stream"] == stream
+    ]
+
+
+def test_events_are_merged_per_activity(tmp_path):
+    path = tmp_path / "events.jsonl"
+    write_events(
+        path,
+        event("create", 1),
+        event("create", 2),
+        event("update", 1, updates={"title": "Morning ride"}),
+        event("delete", 2, event_time=1650000100),
+        {"object_type": "athlete", "object_id": 0, "updates": {"authorized": "false"}},
+        event("create", 3, owner_id=7),
+    )
+    with open(path, "a") as events_file:
+        events_file.write('{"aspect_type": "create", "obj')
+
+    events, end_offset = read_events(str(path))
+    changes = activity_changes(events, end_offset, owner_ids=[0])
+
+    assert [change.activity_id for change in changes] == [1, 2]
+    assert changes[0].deleted_at is None
+    assert changes[1].deleted_at == "2022-04-15T05:21:40+00:00"
+    # Activity 2's first event is still needed until 1 has been synced
+    assert changes[0].checkpoint == events[1][0]
+    # The half written event is left for the next read
+    assert changes[1].checkpoint == end_offset < path.stat().st_size
+
+
+def test_only_activities_named_by_events_are_synced(
+    make_tap, strava_stub, run_sync, tmp_path
+):
+    path = tmp_path / "events.jsonl"
+    strava_stub.deleted.add(3)
+    write_events(
+        path,
+        event("create", 1),
+        event("update", 1),
+        event("create", 4),
+        event("delete", 3),
+    )
+    tap = make_tap(webhook_events_path=str(path))
+    messages = run_sync(tap)
+
+    records = activity_records(messages)
+    assert [record["id"] for record in records] == [1, 4, 3]
+    assert records[-1][DELETED_AT]
+    assert all(not record.get(DELETED_AT) for record in records[:2])
+    # One request per live activity and its children, no listing at all
+    assert strava_stub.requests["activity"] == 2
+    assert "activities" not in strava_stub.requests
+    assert {
+        record["activity_id"]
+        for record in activity_records(messages, "activity_kudoers")
+    } == {1, 4}
+    bookmark = tap.state["bookmarks"]["activities"]
+    assert bookmark["webhook_events_offset"] == path.stat().st_size
+    assert bookmark["replication_key_value"].startswith("2022-02-10")
+
+    # Nothing new, nothing to do
+    strava_stub.requests.clear()
+    again = run_sync(make_tap(state=tap.state, webhook_events_path=str(path)))
+    assert activity_records(again) == []
+    assert sum(strava_stub.requests.values()) == 0
+
+
+@pytest.mark.parametrize("stream_responses", [False, True])
+def test_fetched_activities_are_parsed_like_listed_ones(
+    make_tap, strava_stub, run_sync, tmp_path, stream_responses
+):
+    if stream_responses:
+        pytest.importorskip("ijson")
+    path = tmp_path / "events.jsonl"
+    write_events(path, event("create", 1))
+    tap = make_tap(webhook_events_path=str(path), stream_responses=stream_responses)
+    tap.streams["activities"].mask[("properties", "map")] = False
+
+    (record,) = activity_records(run_sync(tap))
+    assert record["id"] == 1
+    assert "map" not in record
+
+
+def test_activity_gone_before_its_delete_event(
+    make_tap, strava_stub, run_sync, tmp_path
+):
+    path = tmp_path / "events.jsonl"
+    strava_stub.deleted.add(2)
+    write_events(path, event("update", 2))
+    messages = run_sync(make_tap(webhook_events_path=str(path)))
+
+    (record,) = activity_records(messages)
+    assert record["id"] == 2 and record[DELETED_AT]
+    assert activity_records(messages, "activity_kudoers") == []
+
+
+def test_quota_stop_resumes_from_the_events_checkpoint(
+    make_tap, strava_stub, run_sync, tmp_path
+):
+    path = tmp_path / "events.jsonl"
+    write_events(path, *(event("create", i) for i in range(4)))
+    # Activity 0 and its kudoers, then activity 1 before the quota runs out
+    strava_stub.rate_limits = (600, 3)
+    stopped_tap = make_tap(webhook_events_path=str(path))
+    stopped = run_sync(stopped_tap)
+    assert [record["id"] for record in activity_records(stopped)] == [0]
+
+    strava_stub.rate_limits = (600, 30000)
+    RateLimitScheduler.reset()
+    strava_stub.requests.clear()
+    resumed_tap = make_tap(state=stopped_tap.state, webhook_events_path=str(path))
+    resumed = run_sync(resumed_tap)
+
+    assert [record["id"] for record in activity_records(resumed)] == [1, 2, 3]
+    assert strava_stub.requests["activity"] == 3
+    bookmark = resumed_tap.state["bookmarks"]["activities"]
+    assert bookmark["webhook_events_offset"] == path.stat().st_size
+    assert "resume" not in bookmark
+
+
+def test_events_are_routed_to_their_athlete(make_tap, strava_stub, run_sync, tmp_path):
+    path = tmp_path / "events.jsonl"
+    athletes = [
+        {"name": "alice", "refresh_token": "alice-refresh", "id": 0},
+        {"name": "bob", "refresh_token": "bob-refresh", "id": 1},
+    ]
+    strava_stub.athletes = [athlete["refresh_token"] for athlete in athletes]
+    write_events(path, event("create", 1_000_002, owner_id=1), event("create", 1))
+    tap = make_tap(refresh_token=None, athletes=athletes, webhook_events_path=str(path))
+    messages = run_sync(tap)
+
+    assert [record["id"] for record in activity_records(messages)] == [1, 1_000_002]
+    partitions = tap.state["bookmarks"]["activities"]["partitions"]
+    assert [p["webhook_events_offset"] for p in partitions] == [path.stat().st_size] * 2
+
+    with pytest.raises(ConfigValidationError):
+        make_tap(
+            refresh_token=None,
+            athletes=[{"name": "a", "refresh_token": "a"}],
+            webhook_events_path=str(path),
+        )
+
+
+def test_receiver_validates_and_appends_events(tmp_path):
+    path = tmp_path / "events.jsonl"
+    server = EventReceiver(("127.0.0.1", 0), str(path), verify_token="secret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    try:
+        challenge = {"hub.mode": "subscribe", "hub.challenge": "abc"}
+        response = requests.get(url, params={**challenge, "hub.verify_token": "x"})
+        assert response.status_code == 403
+        response = requests.get(url, params={**challenge, "hub.verify_token": "secret"})
+        assert response.json() == {"hub.challenge": "abc"}
+
+        assert requests.post(url, json=event("create", 5)).status_code == 200
+        assert requests.post(url, data="not json").status_code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    lines = path.read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [event("create", 5)]
@@ -0,0 +1,67 @@
+import logging
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+from singer_sdk._singerlib import SelectionMask
+from singer_sdk.helpers._catalog import pop_deselected_record_properties
+from singer_sdk.helpers._typing import (
+    _warn_unmapped_properties,
+    conform_record_data_types,
+    is_boolean_type,
+)
+
+# Values the SDK passes through untouched when conforming a record. A decoded
+# JSON body never holds anything else, so these skip the generic type checks
+PASSTHROUGH_TYPES = frozenset((str, int, float, bool, list, dict, type(None)))
+
+Transformer = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def compile_transformer(
+    stream_name: str,
+    schema: dict,
+    mask: SelectionMask,
+    logger: logging.Logger,
+) -> Transformer:
+    """
+    Build the record transform for one stream's schema and selection.
+
+    Produces exactly what the SDK's `pop_deselected_record_properties`
+    followed by `conform_record_data_types` would, but everything that only
+    depends on the schema is worked out here, once, instead of for every
+    record: which properties exist, which are booleans, and whether any
+    property is deselected at all. Values the fast path can't vouch for (a
+    datetime or bytes a subclass may have put in a record) are handed to the
+    SDK's own conform.
+    """
+
+    properties: FrozenSet[str] = frozenset(schema["properties"])
+    booleans: FrozenSet[str] = frozenset(
+        name
+        for name, property_schema in schema["properties"].items()
+        if is_boolean_type(property_schema)
+    )
+    any_deselected = any(
+        not selected for breadcrumb, selected in mask.items() if len(breadcrumb) >= 2
+    )
+
+    def transform(record: Dict[str, Any]) -> Dict[str, Any]:
+        if any_deselected:
+            pop_deselected_record_properties(record, schema, mask, logger)
+        conformed: Dict[str, Any] = {}
+        unmapped: Optional[list] = None
+        for name, value in record.items():
+            if name not in properties:
+                if unmapped is None:
+                    unmapped = []
+                unmapped.append(name)
+            elif type(value) not in PASSTHROUGH_TYPES:
+                return conform_record_data_types(stream_name, record, schema, logger)
+            elif name in booleans and value is not None:
+                conformed[name] = False if value == 0 else True
+            else:
+                conformed[name] = value
+        if unmapped:
+            _warn_unmapped_properties(stream_name, tuple(unmapped), logger)
+        return conformed
+
+    return transform
@@ -0,0 +1,136 @@
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Collection, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+#: Property marking a tombstone, the record of an activity deleted on Strava
+DELETED_AT = "_sdc_deleted_at"
+
+_append_lock = threading.Lock()
+
+
+class ActivityChange(NamedTuple):
+    """
+    What the push events read in one run say about one activity: it was
+    deleted (`deleted_at` is set) or it has to be fetched again. Once it is
+    synced, the events file only needs reading again from `checkpoint`.
+    """
+
+    activity_id: int
+    owner_id: Optional[int]
+    deleted_at: Optional[str]
+    checkpoint: int
+
+
+def append_event(path: str, event: Mapping[str, Any]) -> None:
+    """
+    Append a push event to the events file as one JSON line. The line goes out
+    in a single write so a reader never sees half of it.
+    """
+
+    line = json.dumps(event, separators=(",", ":")) + "\n"
+    with _append_lock, open(path, "a", encoding="utf-8") as events_file:
+        events_file.write(line)
+        events_file.flush()
+
+
+def read_events(
+    path: str, offset: int = 0, logger: Optional[logging.Logger] = None
+) -> Tuple[List[Tuple[int, dict]], int]:
+    """
+    Read the push events in the file from byte `offset` onwards, each with the
+    offset of its line, and return them with the offset just past the last
+    line read. A line still being written is left for the next read, and a
+    file shorter than `offset` has been rotated and is read from the start.
+    """
+
+    logger = logger or logging.getLogger(__name__)
+    events: List[Tuple[int, dict]] = []
+    try:
+        events_file = open(path, "rb")
+    except FileNotFoundError:
+        logger.info(f"No webhook events file at {path} yet")
+        return events, offset
+    with events_file:
+        events_file.seek(0, 2)
+        if events_file.tell() < offset:
+            logger.warning(f"{path} is shorter than the last run left it, rereading it")
+            offset = 0
+        events_file.seek(offset)
+        position = offset
+        for line in events_file:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                event = json.loads(line)
+            except ValueError:
+                event = None
+            if isinstance(event, dict):
+                events.append((position, event))
+            elif line.strip():
+                logger.warning(f"Skipping malformed webhook event at byte {position}")
+            position += len(line)
+    return events, position
+
+
+def activity_changes(
+    events: List[Tuple[int, dict]],
+    end_offset: int,
+    owner_ids: Optional[Collection[int]] = None,
+    logger: Optional[logging.Logger] = None,
+) -> List[ActivityChange]:
+    """
+    Merge the events into one change per activity, in the order the
+    activities first appear. The latest event wins, so an activity created
+    and then edited is fetched once and one deleted in the end is only a
+    tombstone. Only activities owned by `owner_ids` are kept when given.
+
+    The checkpoint of each change is where the next activity's first event
+    starts: every event before it belongs to an activity synced by then.
+    """
+
+    logger = logger or logging.getLogger(__name__)
+    first_seen: Dict[int, int] = {}
+    latest: Dict[int, dict] = {}
+    for position, event in events:
+        if event.get("object_type") == "athlete":
+            if str((event.get("updates") or {}).get("authorized")) == "false":
+                logger.warning(
+                    f"Athlete {event.get('owner_id')} revoked access to the application"
+                )
+            continue
+        if event.get("object_type") != "activity" or "object_id" not in event:
+            continue
+        if owner_ids is not None and event.get("owner_id") not in owner_ids:
+            continue
+        activity_id = int(event["object_id"])
+        first_seen.setdefault(activity_id, position)
+        latest[activity_id] = event
+
+    ordered = sorted(first_seen, key=first_seen.__getitem__)
+    changes = []
+    for index, activity_id in enumerate(ordered):
+        event = latest[activity_id]
+        deleted_at = None
+        if event.get("aspect_type") == "delete":
+            deleted_at = datetime.fromtimestamp(
+                int(event.get("event_time", 0)), timezone.utc
+            ).isoformat()
+        if index + 1 < len(ordered):
+            checkpoint = first_seen[ordered[index + 1]]
+        else:
+            checkpoint = end_offset
+        changes.append(
+            ActivityChange(activity_id, event.get("owner_id"), deleted_at, checkpoint)
+        )
+    return changes
+
+
+def tombstone(change: ActivityChange) -> dict:
+    """The record standing in for a deleted activity"""
+
+    record: Dict[str, Any] = {"id": change.activity_id, DELETED_AT: change.deleted_at}
+    if change.owner_id is not None:
+        record["athlete"] = {"id": change.owner_id}
+    return record